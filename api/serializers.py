@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from courses.models import Course, Subject, Resource, Stream, Notification, SpecialPage, Year, EducationalYear
+from courses.pdf_watermark import serves_watermarked_variant
+from courses.og_images import og_image_url
+from courses.previews import preview_urls
 from accounts.models import Profile, SavedResource, Subscription, StudentProfile
 from core.models import SEODetail, Banner
 from django.contrib.auth.models import User
@@ -171,9 +174,7 @@ class StreamForCourseSerializer(serializers.ModelSerializer):
         ]
     
     def get_og_image_url(self, obj):
-        if obj.og_image:
-            return self.context['request'].build_absolute_uri(obj.og_image.url)
-        return None
+        return og_image_url(obj, self.context.get('request'))
 
 class CourseSerializer(serializers.ModelSerializer):
     streams = StreamForCourseSerializer(many=True, read_only=True)
@@ -191,9 +192,7 @@ class CourseSerializer(serializers.ModelSerializer):
         ]
     
     def get_og_image_url(self, obj):
-        if obj.og_image:
-            return self.context['request'].build_absolute_uri(obj.og_image.url)
-        return None
+        return og_image_url(obj, self.context.get('request'))
 
     def get_description(self, obj):
         return obj.description or f"Explore the {obj.name} course, its streams, and available years."
@@ -217,9 +216,7 @@ class StreamSerializer(serializers.ModelSerializer):
         ]
 
     def get_og_image_url(self, obj):
-        if obj.og_image:
-            return self.context['request'].build_absolute_uri(obj.og_image.url)
-        return None
+        return og_image_url(obj, self.context.get('request'))
 
     def get_description(self, obj):
         return obj.description or f"Explore the {obj.name} stream and its available academic years."
@@ -243,9 +240,7 @@ class SubjectForSpecialPageSerializer(serializers.ModelSerializer):
         ]
     
     def get_og_image_url(self, obj):
-        if obj.og_image:
-            return self.context['request'].build_absolute_uri(obj.og_image.url)
-        return None
+        return og_image_url(obj, self.context.get('request'))
 
     def get_last_updated_info(self, obj):
         updated_info = obj.get_last_updated_resource()
@@ -334,6 +329,7 @@ class ResourceSerializer(serializers.ModelSerializer):
     download_url = serializers.SerializerMethodField()
     educational_year = EducationalYearSerializer(read_only=True)
     og_image_url = serializers.SerializerMethodField()
+    preview_urls = serializers.SerializerMethodField()
 
 
     class Meta:
@@ -342,7 +338,7 @@ class ResourceSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'resource_type', 'resource_type_display', 'file', 'privacy',
             'embed_link', 'resource_link', 'content', 'subject','subject_slug', 'subject_name', 'educational_year', 'created_at', 'updated_at',
             'description', 'meta_description', 'og_image_url', 'is_saved', 'status',
-            'view_url', 'download_url',
+            'view_url', 'download_url', 'preview_urls',
         ]
         read_only_fields = ['created_at', 'updated_at', 'resource_type_display', 'is_saved', 'view_url']
 
@@ -356,9 +352,13 @@ class ResourceSerializer(serializers.ModelSerializer):
         return False
 
     def get_og_image_url(self, obj):
-        if obj.og_image:
-            return self.context['request'].build_absolute_uri(obj.og_image.url)
-        return None
+        return og_image_url(obj, self.context.get('request'))
+
+    def get_preview_urls(self, obj):
+        # Same rule as the file URL: no previews of resources that can't be viewed
+        if 'view' not in obj.privacy:
+            return {}
+        return preview_urls(obj)
 
 
     def get_view_url(self, obj):
@@ -367,6 +367,10 @@ class ResourceSerializer(serializers.ModelSerializer):
         # Priority 1: If file exists and view is allowed (uploaded PDFs, images, etc.)
         if obj.file and hasattr(obj.file, 'url') and 'view' in obj.privacy:
             try:
+                # Watermarked variants are rendered by the file endpoint on first
+                # request, never while serializing
+                if serves_watermarked_variant(obj):
+                    return request.build_absolute_uri(reverse('resource-file', kwargs={'slug': obj.slug}))
                 # If it's a private file, this generates a presigned URL.
                 # If public, it's the direct URL.
                 return request.build_absolute_uri(obj.file.url)
@@ -398,6 +402,8 @@ class ResourceSerializer(serializers.ModelSerializer):
         # Download URL is only provided if user is authenticated AND resource allows download
         if request and request.user.is_authenticated and obj.file and 'download' in obj.privacy:
             # This uses the 'download' action URL from the ResourceViewSet
+            if serves_watermarked_variant(obj):
+                return request.build_absolute_uri(reverse('resource-download', kwargs={'slug': obj.slug}))
             return obj.file.url
         
         return None
@@ -414,6 +420,8 @@ class ResourceSimpleSerializer(serializers.ModelSerializer):
     # download_url = serializers.SerializerMethodField()
     educational_year = EducationalYearSerializer(read_only=True)
     # og_image_url = serializers.SerializerMethodField()
+    # First-page WebP thumbnails by width, so cards don't need the PDF
+    preview_urls = serializers.SerializerMethodField()
 
 
     class Meta:
@@ -421,7 +429,7 @@ class ResourceSimpleSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'slug', 'resource_type', 'resource_type_display',
              'subject','subject_slug', 'subject_name', 'educational_year', 'created_at', 'updated_at',
-            'description', 'meta_description', 'is_saved'
+            'description', 'meta_description', 'is_saved', 'preview_urls'
 
         ]
         read_only_fields = ['created_at', 'updated_at', 'resource_type_display', 'is_saved', 'view_url']
@@ -435,6 +443,12 @@ class ResourceSimpleSerializer(serializers.ModelSerializer):
             ).exists()
         return False
 
+    def get_preview_urls(self, obj):
+        # Same rule as the file URL: no previews of resources that can't be viewed
+        if 'view' not in obj.privacy:
+            return {}
+        return preview_urls(obj)
+
     # def get_og_image_url(self, obj):
     #     if obj.og_image:
     #         return self.context['request'].build_absolute_uri(obj.og_image.url)
@@ -527,10 +541,7 @@ class SubjectSerializer(serializers.ModelSerializer):
         return obj.get_all_available_resource_types()
 
     def get_og_image_url(self, obj):
-        request = self.context.get('request')
-        if obj.og_image and hasattr(obj.og_image, 'url'):
-            return request.build_absolute_uri(obj.og_image.url)
-        return None
+        return og_image_url(obj, self.context.get('request'))
     
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
@@ -652,12 +663,7 @@ class BlogPostSerializer(TaggitSerializer, serializers.ModelSerializer):
         return None
     
     def get_og_image_url(self, obj):
-        if obj.og_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.og_image.url)
-            return obj.og_image.url
-        return None
+        return og_image_url(obj, self.context.get('request'))
     
     def get_featured_image_url(self, obj):
         if obj.featured_image:
@@ -722,12 +728,7 @@ class BlogPostSimpleSerializer(TaggitSerializer, serializers.ModelSerializer):
         return None
     
     def get_og_image_url(self, obj):
-        if obj.og_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.og_image.url)
-            return obj.og_image.url
-        return None
+        return og_image_url(obj, self.context.get('request'))
     
     def get_featured_image_url(self, obj):
         if obj.featured_image:
@@ -57,4 +57,5 @@ urlpatterns = [
     path("organizations/", include("organization.urls")),
     path("events/", include("event.urls")),
     path("tracking/", include("tracking.urls")), # Analytics API
+    path("results/", include("results.api_urls")),
 ]
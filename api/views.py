@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponseRedirect
 from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate
 from django.conf import settings
@@ -32,18 +33,21 @@ from courses.models import (
     Course,
     Subject,
     Resource,
+    ResourcePreview,
+    ResourceText,
     Stream,
     Notification,
     SpecialPage,
     Year  # Import Year model
 )
+from courses.downloads import serve_stored_file
+from courses.pdf_watermark import resource_served_file
 from core.models import Banner
 from accounts.models import Profile, SavedResource, Subscription, StudentProfile
 from blog.models import BlogPost, Category
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
-from django.http import HttpResponse
 from django.core.signing import TimestampSigner
 from tracking.permissions import IsVisitorAllowed
 from urllib.parse import quote
@@ -127,7 +131,8 @@ class ResourceViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = StandardResultsSetPagination  # Ensure pagination is set
 
     def get_queryset(self):
-        queryset = Resource.published.all()
+        # Preview thumbnails come along in the same query (see ResourcePreview.annotations)
+        queryset = Resource.published.annotate(**ResourcePreview.annotations())
         subject_slug = self.request.query_params.get("subject_slug", None)
         resource_type = self.request.query_params.get("resource_type", None)
         search_term = self.request.query_params.get("search", None)
@@ -147,11 +152,14 @@ class ResourceViewSet(viewsets.ReadOnlyModelViewSet):
                     SearchRank(F('search_vector'), search_query, cover_density=True, normalization=2),
                     TrigramSimilarity('name', search_term) * 0.5,
                     TrigramSimilarity('description', search_term) * 0.3,
+                    # Text extracted from the PDF itself (extract_resource_text)
+                    ResourceText.rank(search_query) * 0.8,
                     # If tags are stored as simple text or in a way TrigramSimilarity can be applied:
                     # TrigramSimilarity('tags_string_representation', search_term) * 0.2, 
                 )
             ).filter(
                 Q(search_vector=search_query) | Q(similarity__gt=0.05) # Adjust threshold
+                | Q(content_hash__in=ResourceText.matching_hashes(search_query))
             ).order_by('-similarity', '-updated_at', 'name') # Primary sort by similarity
         else:
             queryset = queryset.order_by('-updated_at', 'name') # Default ordering
@@ -179,6 +187,24 @@ class ResourceViewSet(viewsets.ReadOnlyModelViewSet):
 
     # Removed view_secure action as direct URL is now provided by serializer
 
+    @action(detail=True, methods=['get'], url_path='file', url_name='file')
+    def view_file(self, request, slug=None):
+        """
+        Redirects to the file to view, rendering its watermarked variant on
+        first request (view_url points here when WATERMARK_ON_DOWNLOAD is set).
+        """
+        resource = self.get_object()
+        if not resource.file:
+            return Response({"error": "File not found for this resource."}, status=status.HTTP_404_NOT_FOUND)
+        if 'view' not in resource.privacy and not request.user.is_staff:
+            return Response({"error": "You do not have permission to view this resource."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            storage, file_name = resource_served_file(resource)
+        except Exception as e:
+            logger.error(f"Error preparing file for viewing (slug: {slug}): {e}", exc_info=True)
+            return Response({"error": "Could not prepare the file."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return HttpResponseRedirect(storage.url(file_name))
+
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated], url_name='download')
     def download(self, request, slug=None):
         logger.info(f"Attempting to download resource with slug: {slug}")
@@ -198,22 +224,20 @@ class ResourceViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({"error": "You do not have permission to download this resource."}, status=status.HTTP_403_FORBIDDEN)
 
         try:
-            file_content = resource.file.read()
-            content_type = 'application/octet-stream'
-
-            response = HttpResponse(file_content, content_type=content_type)
+            # The watermarked variant when on-demand watermarking is on
+            storage, file_name = resource_served_file(resource)
 
             filename_base = resource.name  # Use resource name as base
-            filename_ext = os.path.splitext(resource.file.name)[1] if resource.file.name and '.' in os.path.basename(resource.file.name) else '.dat'  # Default extension
+            filename_ext = os.path.splitext(file_name)[1] if '.' in os.path.basename(file_name) else '.dat'  # Default extension
 
             # Sanitize filename_base to prevent issues, e.g., remove characters not suitable for filenames
             # For simplicity, this example doesn't include extensive sanitization.
             safe_filename_base = "".join(c if c.isalnum() or c in (' ', '.', '-') else '_' for c in filename_base).rstrip()
 
-            filename = quote(f"{safe_filename_base}{filename_ext}")
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            filename = f"{safe_filename_base}{filename_ext}"
             logger.info(f"Serving file {filename} for download.")
-            return response
+            # Streams with Range support, or redirects / hands off to nginx (RESOURCE_DOWNLOAD_MODE)
+            return serve_stored_file(request, storage, file_name, filename)
         except Exception as e:
             logger.error(f"Error serving file for download (slug: {slug}): {e}", exc_info=True)
             return Response({"error": "Could not serve the file for download."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -269,7 +293,7 @@ class SavedResourceViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ResourceSerializer  # Uses ResourceSerializer, so context is needed
 
     def get_queryset(self):
-        return Resource.published.filter(savedresource__user=self.request.user)
+        return Resource.published.filter(savedresource__user=self.request.user).annotate(**ResourcePreview.annotations())
 
     def get_serializer_context(self):  # Add context for serializers
         return {'request': self.request}
@@ -643,8 +667,12 @@ class GlobalSearchAPIView(APIView):
                     SearchRank(F("search_vector"), search_query_obj, cover_density=True, normalization=2),
                     TrigramSimilarity("name", query) * 0.4,
                     TrigramSimilarity("description", query) * 0.2,
+                    ResourceText.rank(search_query_obj) * 0.8,
                 )
-            ).filter(Q(search_vector=search_query_obj) | Q(similarity__gt=0.05)).order_by("-similarity").distinct()
+            ).filter(
+                Q(search_vector=search_query_obj) | Q(similarity__gt=0.05)
+                | Q(content_hash__in=ResourceText.matching_hashes(search_query_obj))
+            ).order_by("-similarity").distinct()
         else:
             courses_qs = courses_qs[:5] 
             subjects_qs = subjects_qs.order_by('-updated_at')
@@ -655,7 +683,7 @@ class GlobalSearchAPIView(APIView):
         
         subjects_data_with_resources = []
         for subj_instance in top_subjects_instances:
-            related_resources_qs = Resource.published.filter(subject=subj_instance)
+            related_resources_qs = Resource.published.filter(subject=subj_instance).annotate(**ResourcePreview.annotations())
             if query:
                  related_resources_qs = related_resources_qs.filter(
                      Q(name__icontains=query) | Q(description__icontains=query)
@@ -668,7 +696,9 @@ class GlobalSearchAPIView(APIView):
             subjects_data_with_resources.append(subj_data)
 
         course_serializer = CourseSerializer(courses_qs[:10], many=True, context=self.get_serializer_context())
-        resource_serializer = ResourceSimpleSerializer(resources_qs[:10], many=True, context=self.get_serializer_context())
+        resource_serializer = ResourceSimpleSerializer(
+            resources_qs.annotate(**ResourcePreview.annotations())[:10], many=True, context=self.get_serializer_context()
+        )
 
         return Response({
             "courses": course_serializer.data,
@@ -1,5 +1,3 @@
-import io
-import cairosvg
 from django.db import models
 from django.urls import reverse
 from django.utils.text import slugify
@@ -9,7 +7,7 @@ from gyanaangan.settings import PublicMediaStorage
 from taggit.managers import TaggableManager
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.template.loader import render_to_string
+from courses import og_images
 
 
 class BaseModel(models.Model):
@@ -50,34 +48,20 @@ class SEOModel(BaseModel):
 
     def generate_og_image_svg(self) -> str:
         """Generate the SVG for the Open Graph image as a string"""
-        template_name = f"og-image.html"
-        return render_to_string(template_name, {"item": self.name})
+        return og_images.render_og_svg(self)
 
     def delete_previous_og_image(self):
         """Delete the previous Open Graph image if it exists"""
         if self.og_image:
             self.og_image.delete(save=False)
 
-    def write_og_image(self) -> None:
-        """Write the Open Graph image to the storage as a PNG with versioning"""
-        if self.status == "published":
-            # Delete previous image
-            self.delete_previous_og_image()
-
-            # Generate new image
-            png_filelike = io.BytesIO()
-            cairosvg.svg2png(
-                bytestring=self.generate_og_image_svg().encode(),
-                write_to=png_filelike,
-                unsafe=True,
-            )
-            png_filelike.seek(0)
-
-            # Versioned filename
-            version = int(datetime.timestamp(datetime.now()))
-            filename = f"{self.slug}_v{version}.png"
-
-            self.og_image.save(filename, png_filelike, save=False)
+    def write_og_image(self, force=False) -> bool:
+        """
+        Write the Open Graph image to the storage as a PNG named after a hash
+        of the title and template, skipping it when that image already exists.
+        Returns True if a new image was written.
+        """
+        return og_images.write_og_image(self, force=force)
 
 
 class Category(models.Model):
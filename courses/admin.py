@@ -17,51 +17,33 @@ from .models import (
 )
 from .forms import CourseForm, StreamForm, SubjectForm, ResourceForm
 from django.utils.translation import gettext_lazy as _
-from .pdf_watermark import add_watermark_to_resources, add_logo_watermark_to_resources
+from .og_images import write_og_images
+from .pdf_watermark import enqueue_watermark
 
 
 def generate_og_images(modeladmin, request, queryset):
-    for obj in queryset:
-        obj.write_og_image()
-        obj.save(update_fields=["og_image"])
-    modeladmin.message_user(request, "OG images have been generated successfully.")
+    # Rendered inline: forking a process pool from a web worker isn't worth it here,
+    # full rebuilds go through `manage.py generate_og_images`
+    written, skipped = write_og_images(queryset, workers=1)
+    modeladmin.message_user(
+        request, f"OG images generated: {written} written, {skipped} already up to date, draft or custom."
+    )
 
 
 def add_pdf_watermark(modeladmin, request, queryset):
-    """Add GyanAangan branding watermark to PDF resources"""
+    """Queue GyanAangan branding watermark for PDF resources (for the watermark_resources command)"""
     from django.contrib import messages
     
-    stats = add_watermark_to_resources(queryset, request)
-    
-    # Prepare detailed message
-    message_parts = []
-    
-    if stats['processed'] > 0:
-        message_parts.append(f"✅ Successfully watermarked {stats['processed']} PDF(s)")
-    
-    if stats['backed_up'] > 0:
-        message_parts.append(f"💾 Backed up {stats['backed_up']} original file(s)")
-    
-    if stats['no_file'] > 0:
-        message_parts.append(f"⚠️ Skipped {stats['no_file']} resource(s) with no file")
-    
-    if stats['not_pdf'] > 0:
-        message_parts.append(f"⚠️ Skipped {stats['not_pdf']} non-PDF file(s)")
-    
-    if stats['failed'] > 0:
-        message_parts.append(f"❌ Failed to watermark {stats['failed']} file(s)")
-    
-    message = " | ".join(message_parts) if message_parts else "No resources were processed"
-    
-    # Determine message level
-    if stats['processed'] > 0 and stats['failed'] == 0:
-        level = messages.SUCCESS
-    elif stats['failed'] > 0:
-        level = messages.WARNING
+    queued = enqueue_watermark(queryset, "text")
+    if queued:
+        modeladmin.message_user(
+            request,
+            f"⏳ Queued {queued} PDF(s) for watermarking; `manage.py watermark_resources` processes the queue. "
+            "Track progress with the watermark status filter.",
+            level=messages.SUCCESS,
+        )
     else:
-        level = messages.INFO
-    
-    modeladmin.message_user(request, message, level=level)
+        modeladmin.message_user(request, "No PDF resources to queue (non-PDF, already queued or already watermarked)", level=messages.INFO)
 
 
 def restore_original_files(modeladmin, request, queryset):
@@ -85,9 +67,9 @@ def restore_original_files(modeladmin, request, queryset):
             # Get original filename
             original_filename = os.path.basename(resource.original_file.name)
             
-            # Delete current watermarked file
+            # Delete current watermarked file (unless another resource shares it)
             if resource.file:
-                resource.file.delete(save=False)
+                resource.release_file(resource.file)
             
             # Restore original file to main file field
             resource.file.save(
@@ -99,6 +81,7 @@ def restore_original_files(modeladmin, request, queryset):
             # Delete the backup (optional - keep it commented if you want to keep backups)
             # resource.original_file.delete(save=False)
             
+            resource.watermark_status = ""
             resource.save()
             restored += 1
             print(f"✅ Restored original file for: {resource.name}")
@@ -127,40 +110,19 @@ restore_original_files.short_description = _("Restore original files (remove wat
 
 
 def add_logo_watermark(modeladmin, request, queryset):
-    """Add GyanAangan logo watermark to PDF resources"""
+    """Queue GyanAangan logo watermark for PDF resources (for the watermark_resources command)"""
     from django.contrib import messages
     
-    stats = add_logo_watermark_to_resources(queryset, request)
-    
-    # Prepare detailed message
-    message_parts = []
-    
-    if stats['processed'] > 0:
-        message_parts.append(f"✅ Successfully added logo watermark to {stats['processed']} PDF(s)")
-    
-    if stats['backed_up'] > 0:
-        message_parts.append(f"💾 Backed up {stats['backed_up']} original file(s)")
-    
-    if stats['no_file'] > 0:
-        message_parts.append(f"⚠️ Skipped {stats['no_file']} resource(s) with no file")
-    
-    if stats['not_pdf'] > 0:
-        message_parts.append(f"⚠️ Skipped {stats['not_pdf']} non-PDF file(s)")
-    
-    if stats['failed'] > 0:
-        message_parts.append(f"❌ Failed to add logo watermark to {stats['failed']} file(s)")
-    
-    message = " | ".join(message_parts) if message_parts else "No resources were processed"
-    
-    # Determine message level
-    if stats['processed'] > 0 and stats['failed'] == 0:
-        level = messages.SUCCESS
-    elif stats['failed'] > 0:
-        level = messages.WARNING
+    queued = enqueue_watermark(queryset, "logo")
+    if queued:
+        modeladmin.message_user(
+            request,
+            f"⏳ Queued {queued} PDF(s) for logo watermarking; `manage.py watermark_resources` processes the queue. "
+            "Track progress with the watermark status filter.",
+            level=messages.SUCCESS,
+        )
     else:
-        level = messages.INFO
-    
-    modeladmin.message_user(request, message, level=level)
+        modeladmin.message_user(request, "No PDF resources to queue (non-PDF, already queued or already watermarked)", level=messages.INFO)
 
 
 add_logo_watermark.short_description = _("Add GyanAangan logo watermark (center)")
@@ -305,17 +267,29 @@ class SubjectAdmin(BaseModelAdmin):
 @admin.register(Resource)
 class ResourceAdmin(BaseModelAdmin):
     form = ResourceForm
-    list_display = ["name", "resource_type", "slug", "status", "educational_year", "created_at", "updated_at"]
-    list_filter = ["status", "resource_type", "subject", "educational_year", "created_at", "updated_at"]
+    list_display = ["name", "resource_type", "slug", "status", "watermark_status", "educational_year", "created_at", "updated_at"]
+    list_filter = ["status", "resource_type", "watermark_status", "subject", "educational_year", "created_at", "updated_at"]
     search_fields = ["name", "resource_type", "slug"]
     ordering = ["-created_at", "-updated_at"]
     actions = [
         make_published,
         make_draft,
-        # add_pdf_watermark,  # Add text watermark action
-        # add_logo_watermark,  # Add logo watermark action
+        add_pdf_watermark,  # Queue text watermark (watermark_resources command)
+        add_logo_watermark,  # Queue logo watermark (watermark_resources command)
         restore_original_files,  # Restore original action
     ]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        duplicates = getattr(form, 'duplicate_resources', [])
+        if duplicates:
+            from django.contrib import messages
+            names = ", ".join(resource.name for resource in duplicates)
+            self.message_user(
+                request,
+                f"⚠️ This file is identical to existing resource(s): {names}. The stored copy is shared.",
+                level=messages.WARNING,
+            )
     
     
     fieldsets = (
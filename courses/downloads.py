@@ -0,0 +1,184 @@
+"""
+Serving stored resource files without loading them into memory.
+
+Three modes, chosen by RESOURCE_DOWNLOAD_MODE:
+  stream   - Django streams the file in chunks with Range/If-Range, ETag and
+             Content-Length support, so downloads can be resumed
+  redirect - Django only authorizes and redirects to a short-lived presigned URL
+  accel    - Django only authorizes and hands the transfer to nginx via X-Accel-Redirect
+"""
+import hashlib
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _s3_object(storage, name):
+    """The boto3 Object behind a stored file, or None for non-S3 storages"""
+    from storages.backends.s3boto3 import S3Boto3Storage
+    from storages.utils import clean_name
+
+    if isinstance(storage, S3Boto3Storage):
+        return storage.bucket.Object(storage._normalize_name(clean_name(name)))
+    return None
+
+
+def stored_file_stat(storage, name):
+    """
+    Size, ETag and modification time of a stored file, in one HEAD request on S3.
+
+    Returns:
+        tuple: (size, etag, last_modified as a timestamp)
+    """
+    obj = _s3_object(storage, name)
+    if obj is not None:
+        obj.load()
+        return obj.content_length, obj.e_tag, obj.last_modified.timestamp()
+
+    size = storage.size(name)
+    modified = storage.get_modified_time(name).timestamp()
+    # Stored names are never overwritten, so name + size + mtime identifies the content
+    etag = '"%s"' % hashlib.md5(f'{name}:{size}:{modified}'.encode()).hexdigest()
+    return size, etag, modified
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header against a file of the given size.
+
+    Returns:
+        (start, end) inclusive, None to serve the whole file (no header, or a
+        form we don't support such as multiple ranges), or False when the
+        range can't be satisfied
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # bytes=-N: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or size == 0:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    """A Range is honoured only if If-Range (when sent) still matches the file"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(last_modified) <= since
+
+
+def _iter_stored_file(storage, name, start, end):
+    """Yields bytes start..end (inclusive) of a stored file in chunks"""
+    obj = _s3_object(storage, name)
+    if obj is not None:
+        body = obj.get(Range=f'bytes={start}-{end}')['Body']
+        try:
+            yield from body.iter_chunks(DOWNLOAD_CHUNK_SIZE)
+        finally:
+            body.close()
+        return
+
+    remaining = end - start + 1
+    with storage.open(name, 'rb') as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def content_disposition(filename, disposition='attachment'):
+    return f'{disposition}; filename="{quote(filename)}"'
+
+
+def stream_stored_file(request, storage, name, filename, content_type='application/octet-stream'):
+    """
+    Streaming response for a stored file with Range, If-Range, If-None-Match,
+    ETag and Content-Length handling.
+    """
+    size, etag, last_modified = stored_file_stat(storage, name)
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    if _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers.get('Range'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    response = StreamingHttpResponse(
+        _iter_stored_file(storage, name, start, end) if size else iter(()),
+        status=206 if byte_range else 200,
+        content_type=content_type,
+    )
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1 if size else 0)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Content-Disposition'] = content_disposition(filename)
+    return response
+
+
+def serve_stored_file(request, storage, name, filename, content_type='application/octet-stream'):
+    """
+    Response handing out a stored file according to RESOURCE_DOWNLOAD_MODE.
+
+    Args:
+        request: The authorized request
+        storage: Storage holding the file
+        name: Name of the file in storage
+        filename: Filename offered to the browser
+        content_type: Content-Type of the download
+    """
+    mode = getattr(settings, 'RESOURCE_DOWNLOAD_MODE', 'stream')
+
+    if mode == 'redirect':
+        if _s3_object(storage, name) is not None:
+            url = storage.url(name, parameters={
+                'ResponseContentDisposition': content_disposition(filename),
+                'ResponseContentType': content_type,
+            }, expire=getattr(settings, 'RESOURCE_DOWNLOAD_URL_EXPIRE', 300))
+        else:
+            url = storage.url(name)
+        return HttpResponseRedirect(url)
+
+    if mode == 'accel':
+        # nginx serves the bytes from an internal location mapped onto the bucket
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.RESOURCE_DOWNLOAD_ACCEL_PREFIX + quote(name)
+        response['Content-Disposition'] = content_disposition(filename)
+        return response
+
+    return stream_stored_file(request, storage, name, filename, content_type)
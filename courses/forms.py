@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from .models import Course, Stream, Subject, Resource
 from .custom_widget import DragAndDropFileWidget
+from .utils import sha256_file
 from ckeditor.widgets import CKEditorWidget
 from ckeditor.widgets import CKEditorWidget
 
@@ -46,6 +48,18 @@ class ResourceForm(UniqueSlugForm):
             'content': 'Rich text content (use this for text-based resources)',
         }
     
+    def clean_file(self):
+        file = self.cleaned_data.get('file')
+        self.duplicate_resources = []
+        if isinstance(file, UploadedFile):
+            # Hashed while still on local disk; Resource.save() reuses the digest
+            # to point duplicates at the already stored copy
+            duplicates = Resource.objects.filter(content_hash=sha256_file(file))
+            if self.instance.pk:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            self.duplicate_resources = list(duplicates[:5])
+        return file
+
     def clean(self):
         cleaned_data = super().clean()
         file = cleaned_data.get('file')
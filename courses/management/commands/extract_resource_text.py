@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models.functions import Left
+
+from courses.models import Resource, ResourceText
+from courses.pdf_watermark import pristine_file, resource_content_hash
+from courses.text_extraction import extract_pdf_pages
+from courses.utils import worker_process_context
+
+# to_tsvector() fails beyond 1MB of lexemes; the head of a document is plenty to find it
+SEARCH_BODY_CHARS = 500_000
+
+
+class Command(BaseCommand):
+    help = 'Extract text from PDF resources into ResourceText, skipping content hashes already extracted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Extraction processes')
+        parser.add_argument('--io-workers', type=int, default=None, help='Download threads (default: 2x workers)')
+        parser.add_argument('--force', action='store_true', help='Re-extract hashes that already have text')
+        parser.add_argument('--retry', action='store_true', help='Re-extract hashes whose extraction failed')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        io_workers = options['io_workers'] or workers * 2
+
+        pdfs = Resource.objects.filter(file__iendswith='.pdf')
+        for resource in pdfs.filter(content_hash=''):
+            try:
+                resource_content_hash(resource)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'❌ Could not hash {resource.name}: {e}'))
+
+        # One resource per content hash: duplicates share the extracted text
+        sources = {}
+        for resource in pdfs.exclude(content_hash='').order_by('pk'):
+            sources.setdefault(resource.content_hash, resource)
+        if not options['force']:
+            done = ResourceText.objects.filter(content_hash__in=sources)
+            if options['retry']:
+                done = done.filter(error='')
+            for content_hash in done.values_list('content_hash', flat=True):
+                del sources[content_hash]
+
+        if not sources:
+            self.stdout.write('Nothing to extract')
+            return
+
+        self.stdout.write(f'Extracting {len(sources)} document(s) with {workers} process(es), {io_workers} I/O thread(s)')
+        connections.close_all()
+        started = time.monotonic()
+        outcomes = {'done': 0, 'failed': 0}
+        pages = 0
+        cpu_pool = ProcessPoolExecutor(max_workers=workers, mp_context=worker_process_context())
+        with cpu_pool, ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+            for outcome, page_count in io_pool.map(lambda r: self.process(r, cpu_pool), sources.values()):
+                outcomes[outcome] += 1
+                pages += page_count
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {outcomes['done']} extracted, {outcomes['failed']} failed, {pages} pages in {elapsed:.1f}s "
+            f"({pages / elapsed if elapsed else 0:.1f} pages/s)"
+        ))
+
+    def process(self, resource, cpu_pool):
+        """
+        Runs in an I/O thread. Returns ('done' or 'failed', page count).
+        """
+        try:
+            with tempfile.TemporaryDirectory(prefix='extract-') as workdir:
+                path = os.path.join(workdir, 'source.pdf')
+                source = pristine_file(resource)
+                source.open('rb')
+                try:
+                    with open(path, 'wb') as f:
+                        shutil.copyfileobj(source, f, 1024 * 1024)
+                finally:
+                    source.close()
+                pages = cpu_pool.submit(extract_pdf_pages, path).result()
+        except Exception as e:
+            ResourceText.objects.update_or_create(
+                content_hash=resource.content_hash,
+                defaults={'pages': [], 'body': '', 'page_count': 0, 'error': str(e)[:1000], 'search_vector': None},
+            )
+            self.stdout.write(self.style.ERROR(f'❌ {resource.name}: {e}'))
+            return 'failed', 0
+
+        ResourceText.objects.update_or_create(
+            content_hash=resource.content_hash,
+            defaults={'pages': pages, 'body': '\n\n'.join(p for p in pages if p), 'page_count': len(pages), 'error': ''},
+        )
+        ResourceText.objects.filter(content_hash=resource.content_hash).update(
+            search_vector=SearchVector(Left('body', SEARCH_BODY_CHARS), config='english')
+        )
+        self.stdout.write(f'✅ {resource.name} ({len(pages)} pages)')
+        return 'done', len(pages)
@@ -0,0 +1,45 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.og_images import OG_MODELS, og_model, write_og_images
+
+
+class Command(BaseCommand):
+    help = 'Render missing or outdated OG images of published entities (rasterized in a process pool)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', nargs='+', choices=list(OG_MODELS), default=list(OG_MODELS),
+                            help='Models to render (default: all)')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render generated images even when up to date (uploaded images are kept)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Rasterizing processes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows loaded per batch')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        started = time.monotonic()
+        total_written = total_skipped = 0
+
+        for key in options['model']:
+            model = og_model(key)
+            queryset = model.objects.filter(status='published').only(
+                'pk', 'slug', 'status', 'og_image', 'title' if key == 'blogpost' else 'name'
+            )
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+            written = skipped = 0
+            for i in range(0, len(pks), batch_size):
+                batch = queryset.filter(pk__in=pks[i:i + batch_size]).order_by('pk')
+                w, s = write_og_images(batch, force=options['force'], workers=workers)
+                written += w
+                skipped += s
+            self.stdout.write(f'{model.__name__}: {written} written, {skipped} skipped')
+            total_written += written
+            total_skipped += skipped
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {total_written} OG image(s) written, {total_skipped} skipped in {elapsed:.1f}s'
+        ))
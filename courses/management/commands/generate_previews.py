@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from courses.models import Resource, ResourcePreview
+from courses.pdf_watermark import pristine_file, resource_content_hash
+from courses.previews import preview_name, preview_storage, preview_widths, render_previews
+from courses.utils import worker_process_context
+
+
+class Command(BaseCommand):
+    help = (
+        'Render first-page WebP previews of viewable PDF resources into public storage, once per content hash, '
+        'and remove the previews of documents that are no longer published and viewable'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Rendering processes')
+        parser.add_argument('--io-workers', type=int, default=None, help='Download/upload threads (default: 2x workers)')
+        parser.add_argument('--contact-sheet', type=int, default=None, metavar='WIDTH',
+                            help='Also render a contact sheet of the first pages at this width')
+        parser.add_argument('--force', action='store_true', help='Re-render hashes that already have previews')
+        parser.add_argument('--retry', action='store_true', help='Re-render hashes whose previews failed')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        io_workers = options['io_workers'] or workers * 2
+        self.widths = preview_widths()
+        self.contact_sheet = options['contact_sheet']
+        self.storage = preview_storage()
+
+        pdfs = Resource.objects.filter(file__iendswith='.pdf')
+        for resource in pdfs.filter(content_hash=''):
+            try:
+                resource_content_hash(resource)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'❌ Could not hash {resource.name}: {e}'))
+
+        # One resource per content hash: duplicates share the previews. Previews
+        # are public, so only documents some published resource lets everyone
+        # view get them; the others' previews are removed.
+        sources = {}
+        viewable = pdfs.exclude(content_hash='').filter(status='published', privacy__contains='view')
+        for resource in viewable.order_by('pk'):
+            sources.setdefault(resource.content_hash, resource)
+        self.unpublish(ResourcePreview.objects.exclude(content_hash__in=sources))
+        if not options['force']:
+            done = ResourcePreview.objects.filter(content_hash__in=sources)
+            if options['retry']:
+                done = done.filter(error='')
+            for content_hash in done.values_list('content_hash', flat=True):
+                del sources[content_hash]
+
+        if not sources:
+            self.stdout.write('Nothing to render')
+            return
+
+        self.stdout.write(f'Rendering previews for {len(sources)} document(s) with {workers} process(es), {io_workers} I/O thread(s)')
+        connections.close_all()
+        started = time.monotonic()
+        outcomes = {'done': 0, 'failed': 0}
+        cpu_pool = ProcessPoolExecutor(max_workers=workers, mp_context=worker_process_context())
+        with cpu_pool, ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+            for outcome in io_pool.map(lambda r: self.process(r, cpu_pool), sources.values()):
+                outcomes[outcome] += 1
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {outcomes['done']} rendered, {outcomes['failed']} failed in {elapsed:.1f}s "
+            f"({outcomes['done'] / elapsed if elapsed else 0:.2f} docs/s)"
+        ))
+
+    def unpublish(self, previews):
+        """Deletes the preview images and records of documents no published resource lets everyone view"""
+        removed = 0
+        for preview in previews:
+            names = [preview_name(preview.content_hash, 'page1', width) for width in preview.widths]
+            if preview.contact_sheet_width:
+                names.append(preview_name(preview.content_hash, 'sheet', preview.contact_sheet_width))
+            for name in names:
+                self.storage.delete(name)
+            preview.delete()
+            removed += 1
+        if removed:
+            self.stdout.write(f'Removed the previews of {removed} document(s) that are no longer viewable')
+
+    def process(self, resource, cpu_pool):
+        """
+        Runs in an I/O thread. Returns 'done' or 'failed'.
+        """
+        content_hash = resource.content_hash
+        try:
+            with tempfile.TemporaryDirectory(prefix='preview-') as workdir:
+                path = os.path.join(workdir, 'source.pdf')
+                source = pristine_file(resource)
+                source.open('rb')
+                try:
+                    with open(path, 'wb') as f:
+                        shutil.copyfileobj(source, f, 1024 * 1024)
+                finally:
+                    source.close()
+
+                outputs, page_count = cpu_pool.submit(
+                    render_previews, path, workdir, self.widths, self.contact_sheet
+                ).result()
+
+                sheet_width = None
+                for kind, width, output_path in outputs:
+                    name = preview_name(content_hash, kind, width)
+                    # Names are fixed per hash, so replace rather than get a suffixed copy
+                    if self.storage.exists(name):
+                        self.storage.delete(name)
+                    with open(output_path, 'rb') as f:
+                        self.storage.save(name, f)
+                    if kind == 'sheet':
+                        sheet_width = width
+        except Exception as e:
+            ResourcePreview.objects.update_or_create(
+                content_hash=content_hash,
+                defaults={'widths': [], 'contact_sheet_width': None, 'page_count': 0, 'error': str(e)[:1000]},
+            )
+            self.stdout.write(self.style.ERROR(f'❌ {resource.name}: {e}'))
+            return 'failed'
+
+        ResourcePreview.objects.update_or_create(
+            content_hash=content_hash,
+            defaults={'widths': list(self.widths), 'contact_sheet_width': sheet_width,
+                      'page_count': page_count, 'error': ''},
+        )
+        self.stdout.write(f'✅ {resource.name}')
+        return 'done'
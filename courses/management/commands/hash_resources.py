@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from courses.models import Resource
+from courses.pdf_watermark import pristine_file, resource_content_hash
+
+
+class Command(BaseCommand):
+    help = 'Fill Resource.content_hash for files uploaded before hashing and report (or merge) duplicate content'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--merge', action='store_true',
+                            help='Point duplicates at one stored copy and delete the redundant blobs')
+
+    def handle(self, *args, **options):
+        missing = Resource.objects.filter(content_hash="").exclude(file="").exclude(file__isnull=True)
+        hashed = failed = 0
+        for resource in missing.iterator(chunk_size=100):
+            try:
+                resource_content_hash(resource)
+                hashed += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'❌ {resource.name}: {e}'))
+
+        duplicated = (
+            Resource.objects.exclude(content_hash="")
+            .values('content_hash').annotate(n=Count('pk')).filter(n__gt=1)
+            .values_list('content_hash', flat=True)
+        )
+        groups = merged = 0
+        for content_hash in duplicated:
+            groups += 1
+            resources = list(Resource.objects.filter(content_hash=content_hash).order_by('pk'))
+            self.stdout.write(f'{content_hash[:12]}: ' + ', '.join(f'{r.name} (#{r.pk})' for r in resources))
+            if options['merge']:
+                merged += self.merge(resources)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Hashed {hashed} file(s), {failed} failed; {groups} duplicated content hash(es)'
+            + (f', {merged} resource(s) now share a stored copy' if options['merge'] else '')
+        ))
+
+    def merge(self, resources):
+        """
+        Repoints resources whose file is still the untouched upload at the
+        first resource's original. Files watermarked in place are left alone.
+        """
+        shared_name = pristine_file(resources[0]).name
+        merged = 0
+        for resource in resources[1:]:
+            if resource.original_file or resource.watermark_status == 'done' or resource.file.name == shared_name:
+                continue
+            old_file = resource.file
+            Resource.objects.filter(pk=resource.pk).update(file=shared_name)
+            resource.release_file(old_file)
+            merged += 1
+        return merged
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from courses.models import Resource
+from courses.pdf_watermark import (
+    WATERMARK_STYLES,
+    copy_stored_file,
+    enqueue_watermark,
+    pristine_file,
+    watermark_pdf_file,
+    watermarked_filename,
+)
+from courses.utils import worker_process_context
+
+
+class Command(BaseCommand):
+    help = (
+        'Watermark pending PDF resources in parallel (CPU in a process pool, storage I/O in threads). '
+        'Admin actions only queue resources; run this from cron to process them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', nargs='+', type=int, help='Queue these resource ids before processing')
+        parser.add_argument('--style', choices=list(WATERMARK_STYLES), default='text', help='Style used with --ids')
+        parser.add_argument('--force', action='store_true',
+                            help='With --ids, also re-watermark done resources (from their backup)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Watermarking processes')
+        parser.add_argument('--io-workers', type=int, default=None, help='Download/upload threads (default: 2x workers)')
+        parser.add_argument('--retry', action='store_true', help='Re-queue failed and interrupted (processing) resources')
+        parser.add_argument('--no-backup', action='store_true', help='Do not back up originals to original_file')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        io_workers = options['io_workers'] or workers * 2
+        self.backup_original = not options['no_backup']
+
+        if options['ids']:
+            enqueue_watermark(Resource.objects.filter(pk__in=options['ids']), options['style'], force=options['force'])
+        if options['retry']:
+            Resource.objects.filter(watermark_status__in=['failed', 'processing']).update(watermark_status='pending')
+
+        pending = list(
+            Resource.objects.filter(watermark_status='pending').order_by('pk').values_list('pk', flat=True)
+        )
+        if not pending:
+            self.stdout.write('No pending resources')
+            return
+
+        self.stdout.write(f'Watermarking {len(pending)} resource(s) with {workers} process(es), {io_workers} I/O thread(s)')
+
+        # Workers must not inherit open DB connections
+        connections.close_all()
+        self.stats = {'done': 0, 'failed': 0, 'skipped': 0, 'bytes_in': 0, 'bytes_out': 0}
+        self.stats_lock = threading.Lock()
+        started = time.monotonic()
+
+        cpu_pool = ProcessPoolExecutor(max_workers=workers, mp_context=worker_process_context())
+        with cpu_pool, ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+            # Each I/O thread downloads, hands the CPU work to the process pool and
+            # uploads the result, so at most io_workers documents are in flight.
+            for outcome in io_pool.map(lambda pk: self.process(pk, cpu_pool), pending):
+                with self.stats_lock:
+                    self.stats[outcome] += 1
+
+        elapsed = time.monotonic() - started
+        megabytes = self.stats['bytes_in'] / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {self.stats['done']} watermarked, {self.stats['failed']} failed, "
+            f"{self.stats['skipped']} skipped in {elapsed:.1f}s | "
+            f"{self.stats['done'] / elapsed if elapsed else 0:.2f} docs/s, "
+            f"{megabytes / elapsed if elapsed else 0:.2f} MB/s in, "
+            f"{self.stats['bytes_out'] / (1024 * 1024):.1f} MB written"
+        ))
+
+    def process(self, pk, cpu_pool):
+        """
+        Runs in an I/O thread. Returns 'done', 'failed' or 'skipped'.
+        """
+        try:
+            # Claim the row so concurrent runs never process the same resource
+            if not Resource.objects.filter(pk=pk, watermark_status='pending').update(watermark_status='processing'):
+                return 'skipped'
+            resource = Resource.objects.get(pk=pk)
+            style = resource.watermark_style or 'text'
+
+            # A re-watermark starts again from the backup, replacing the old watermarked copy
+            source = pristine_file(resource)
+            replaced = None
+            if resource.original_file and resource.file.name != resource.original_file.name:
+                replaced = resource.file.field.attr_class(resource, resource.file.field, resource.file.name)
+
+            # Documents go through temp files on disk, never whole into memory;
+            # the process pool gets paths, not bytes
+            with tempfile.TemporaryDirectory(prefix='watermark-') as workdir:
+                input_path = os.path.join(workdir, 'original.pdf')
+                output_path = os.path.join(workdir, 'watermarked.pdf')
+
+                source.open('rb')
+                try:
+                    with open(input_path, 'wb') as f:
+                        shutil.copyfileobj(source, f, 1024 * 1024)
+                finally:
+                    source.close()
+
+                cpu_pool.submit(watermark_pdf_file, style, input_path, output_path).result()
+
+                if self.backup_original and not resource.original_file:
+                    copy_stored_file(resource.file, resource.original_file, os.path.basename(resource.file.name))
+                with open(output_path, 'rb') as f:
+                    resource.file.save(
+                        watermarked_filename(source.name, WATERMARK_STYLES[style][2]), File(f), save=False
+                    )
+                resource.watermark_status = 'done'
+                # Only the columns this command owns, so concurrent admin edits survive
+                resource.save(update_fields=['file', 'original_file', 'watermark_status'])
+                if replaced:
+                    resource.release_file(replaced)
+
+                with self.stats_lock:
+                    self.stats['bytes_in'] += os.path.getsize(input_path)
+                    self.stats['bytes_out'] += os.path.getsize(output_path)
+            self.stdout.write(f'✅ {resource.name}')
+            return 'done'
+        except Exception as e:
+            Resource.objects.filter(pk=pk).update(watermark_status='failed')
+            self.stdout.write(self.style.ERROR(f'❌ Resource {pk}: {e}'))
+            return 'failed'
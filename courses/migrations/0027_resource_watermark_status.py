@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0026_subject_syllabus_text_alter_resource_file_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='watermark_status',
+            field=models.CharField(blank=True, choices=[('', 'Not watermarked'), ('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='watermark_style',
+            field=models.CharField(blank=True, choices=[('text', 'Text'), ('logo', 'Logo')], default='', max_length=10),
+        ),
+    ]
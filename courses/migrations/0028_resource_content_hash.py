@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0027_resource_watermark_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='SHA-256 of the original (un-watermarked) file', max_length=64),
+        ),
+    ]
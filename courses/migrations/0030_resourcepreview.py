@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-19 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0029_resourcetext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourcePreview',
+            fields=[
+                ('content_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('widths', models.JSONField(default=list, help_text='Widths of the first-page previews')),
+                ('contact_sheet_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,17 +1,17 @@
 from django.db import models
 from django.utils.text import slugify
-from django.db.models import Max
+from django.db.models import F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import datetime, timedelta
 from multiselectfield import MultiSelectField
 from ckeditor.fields import RichTextField
-import io
-import cairosvg
-from django.template.loader import render_to_string
 from gyanaangan.settings import PrivateMediaStorage, PublicMediaStorage
 from django.contrib.postgres.search import SearchVectorField
 from django.contrib.postgres.indexes import GinIndex
-from django.contrib.postgres.search import SearchVector
+from django.contrib.postgres.search import SearchRank, SearchVector
+from .utils import sha256_file
+from . import og_images
 
 class BaseModel(models.Model):
     STATUS_CHOICES = [
@@ -51,34 +51,20 @@ class SEOModel(BaseModel):
 
     def generate_og_image_svg(self) -> str:
         """Generate the SVG for the Open Graph image as a string"""
-        template_name = f"og-image.html"
-        return render_to_string(template_name, {"item": self.name})
+        return og_images.render_og_svg(self)
 
     def delete_previous_og_image(self):
         """Delete the previous Open Graph image if it exists"""
         if self.og_image:
             self.og_image.delete(save=False)
 
-    def write_og_image(self) -> None:
-        """Write the Open Graph image to the storage as a PNG with versioning"""
-        if self.status == "published":
-            # Delete previous image
-            self.delete_previous_og_image()
-
-            # Generate new image
-            png_filelike = io.BytesIO()
-            cairosvg.svg2png(
-                bytestring=self.generate_og_image_svg().encode(),
-                write_to=png_filelike,
-                unsafe=True,
-            )
-            png_filelike.seek(0)
-
-            # Versioned filename
-            version = int(datetime.timestamp(datetime.now()))
-            filename = f"{self.slug}_v{version}.png"
-
-            self.og_image.save(filename, png_filelike, save=False)
+    def write_og_image(self, force=False) -> bool:
+        """
+        Write the Open Graph image to the storage as a PNG named after a hash
+        of the title and template, skipping it when that image already exists.
+        Returns True if a new image was written.
+        """
+        return og_images.write_og_image(self, force=force)
 
 
 class Year(BaseModel):
@@ -274,6 +260,27 @@ class Resource(SEOModel):
         max_length=500,
         help_text="Backup of original file before watermarking"
     )
+    WATERMARK_STATUS_CHOICES = (
+        ("", "Not watermarked"),
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+    WATERMARK_STYLE_CHOICES = (
+        ("text", "Text"),
+        ("logo", "Logo"),
+    )
+    watermark_status = models.CharField(
+        max_length=20, choices=WATERMARK_STATUS_CHOICES, blank=True, default="", db_index=True
+    )
+    watermark_style = models.CharField(
+        max_length=10, choices=WATERMARK_STYLE_CHOICES, blank=True, default=""
+    )
+    content_hash = models.CharField(
+        max_length=64, blank=True, default="", db_index=True, editable=False,
+        help_text="SHA-256 of the original (un-watermarked) file"
+    )
 
     privacy = MultiSelectField(choices=RESOURCE_PRIVACY_CHOICES, default=["view"])
 
@@ -313,6 +320,21 @@ class Resource(SEOModel):
         if not self.slug:
             self.slug = slugify(self.name)
 
+        if self.file and not self.file._committed:
+            # A new upload: the backup and watermark state belonged to the old file
+            if self.original_file:
+                self.release_file(self.original_file)
+            self.original_file = None
+            self.watermark_status = ""
+            self.content_hash = sha256_file(self.file.file)
+            # Identical content is stored once and shared between resources
+            shared = self.duplicates().filter(
+                # Never share a file that was watermarked in place without a backup
+                Q(original_file__gt="") | (Q(file__gt="") & ~Q(watermark_status="done"))
+            ).first()
+            if shared:
+                self.file = shared.original_file.name if shared.original_file else shared.file.name
+
         super(Resource, self).save(*args, **kwargs)
         if self.pk:
             self.search_vector = (
@@ -328,6 +350,43 @@ class Resource(SEOModel):
     def type(self):
         return self.resource_type
 
+    def duplicates(self):
+        """Other resources whose original file has the same content"""
+        if not self.content_hash:
+            return Resource.objects.none()
+        return Resource.objects.filter(content_hash=self.content_hash).exclude(pk=self.pk)
+
+    def document_text(self):
+        """Text extracted from the file by extract_resource_text, or "" """
+        if not self.content_hash:
+            return ""
+        return ResourceText.objects.filter(content_hash=self.content_hash).values_list('body', flat=True).first() or ""
+
+    def preview_info(self):
+        """(widths, contact sheet width) of the rendered previews, or None"""
+        if hasattr(self, 'preview_widths'):
+            return (self.preview_widths, self.preview_sheet_width) if self.preview_widths else None
+        if not self.content_hash:
+            return None
+        return ResourcePreview.objects.filter(content_hash=self.content_hash, error='').values_list(
+            'widths', 'contact_sheet_width'
+        ).first()
+
+    def release_file(self, field_file):
+        """
+        Delete a stored file this resource no longer uses, unless another
+        resource still references the same blob (uploads are deduplicated by
+        content hash, so the reference count is found through that index).
+        """
+        if not field_file:
+            return
+        name = field_file.name
+        references = Resource.objects.exclude(pk=self.pk).filter(Q(file=name) | Q(original_file=name))
+        if self.content_hash:
+            references = references.filter(content_hash=self.content_hash)
+        if not references.exists():
+            field_file.storage.delete(name)
+
     def get_last_updated_at(self):
         if self.updated_at:
             last_updated = self.updated_at.astimezone()
@@ -355,6 +414,75 @@ class Resource(SEOModel):
         return None
 
 
+class ResourceText(models.Model):
+    """
+    Plain text extracted from a resource's PDF, keyed by content hash so
+    duplicate uploads share one row and unchanged files are never re-parsed.
+    Filled by the extract_resource_text command.
+    """
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    pages = models.JSONField(default=list, help_text="Text of each page, in order")
+    body = models.TextField(blank=True, default="")
+    page_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    search_vector = SearchVectorField(null=True, blank=True)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=['search_vector'])]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.page_count} pages)"
+
+    @classmethod
+    def matching_hashes(cls, search_query):
+        """Content hashes whose text matches search_query, for content_hash__in filters"""
+        return cls.objects.filter(search_vector=search_query).values('content_hash')
+
+    @classmethod
+    def rank(cls, search_query):
+        """
+        Rank of a Resource's document text against search_query, as an
+        expression for Resource.objects.annotate() (0 when nothing matches).
+        """
+        return Coalesce(
+            Subquery(
+                cls.objects.filter(content_hash=OuterRef('content_hash'), search_vector=search_query)
+                .annotate(rank=SearchRank(F('search_vector'), search_query, cover_density=True, normalization=2))
+                .values('rank')[:1]
+            ),
+            Value(0.0),
+        )
+
+
+class ResourcePreview(models.Model):
+    """
+    Record of the WebP previews rendered for a content hash by the
+    generate_previews command (the images live in PublicMediaStorage).
+    """
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    widths = models.JSONField(default=list, help_text="Widths of the first-page previews")
+    contact_sheet_width = models.PositiveIntegerField(null=True, blank=True)
+    page_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    generated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} {self.widths}"
+
+    @classmethod
+    def annotations(cls):
+        """
+        preview_widths / preview_sheet_width for Resource.objects.annotate(),
+        so a page of cards gets its previews in the same query.
+        """
+        previews = cls.objects.filter(content_hash=OuterRef('content_hash'), error='')
+        return {
+            'preview_widths': Subquery(previews.values('widths')[:1]),
+            'preview_sheet_width': Subquery(previews.values('contact_sheet_width')[:1]),
+        }
+
+
 class Advertisement(SEOModel):
     title = models.CharField(max_length=100)
     content = models.TextField()
@@ -4,25 +4,216 @@ Adds branded watermark to PDF resources
 """
 import io
 import os
-from typing import BinaryIO
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from datetime import datetime
-from pathlib import Path
 
 try:
     from pypdf import PdfReader, PdfWriter, Transformation
-    from pypdf.generic import RectangleObject
 except ImportError:
     from PyPDF2 import PdfReader, PdfWriter
-    from PyPDF2.generic import RectangleObject
     Transformation = None
 
 from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
 from reportlab.lib.colors import Color
 from reportlab.lib.utils import ImageReader
-from django.core.files.base import ContentFile
+from django.core.files import File
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .utils import sha256_file
+
+
+# Rendered overlay PDFs shared across calls, keyed by (watermarker config, width, height).
+# Pages in a document almost always share one or two mediabox sizes, so a
+# document renders its overlay once per size instead of once per page.
+OVERLAY_CACHE_SIZE = 64
+
+
+class OverlayCache:
+    """Thread-safe bounded LRU of rendered watermark overlay PDF bytes"""
+
+    def __init__(self, maxsize=OVERLAY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        # Render outside the lock; a duplicate render on a race is harmless
+        value = render()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+overlay_cache = OverlayCache()
+
+
+@lru_cache(maxsize=8)
+def _load_logo(logo_path):
+    """Decode the logo image once per process instead of once per overlay"""
+    return ImageReader(logo_path)
+
+
+def merge_cached_overlays(watermarker, pdf_reader):
+    """
+    Merge the watermarker's overlay into every page of pdf_reader.
+    
+    Args:
+        watermarker: PDFWatermarker or PDFLogoWatermarker
+        pdf_reader: PdfReader object
+        
+    Returns:
+        PdfWriter containing the watermarked pages
+    """
+    pdf_writer = PdfWriter()
+    # Parsed overlay page per size, local to this document
+    overlay_pages = {}
+    
+    for page in pdf_reader.pages:
+        size = (round(float(page.mediabox.width), 2), round(float(page.mediabox.height), 2))
+        if size not in overlay_pages:
+            overlay_bytes = overlay_cache.get_or_render(
+                (watermarker.overlay_config(),) + size,
+                lambda: watermarker.create_watermark_page(*size).getvalue(),
+            )
+            overlay_pages[size] = PdfReader(io.BytesIO(overlay_bytes)).pages[0]
+        
+        page.merge_page(overlay_pages[size])
+        pdf_writer.add_page(page)
+    
+    return pdf_writer
+
+
+# Documents larger than this spill from memory to a temp file on disk
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+def spool_stored_file(field_file):
+    """
+    Copy a stored file into a SpooledTemporaryFile chunk by chunk.
+    
+    Args:
+        field_file: FieldFile to read
+        
+    Returns:
+        SpooledTemporaryFile positioned at the start (caller closes it)
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            spooled.write(chunk)
+    finally:
+        field_file.close()
+    spooled.seek(0)
+    return spooled
+
+
+def copy_stored_file(source, target, filename):
+    """
+    Copy source into the target file field under filename.
+    On S3 this is a server-side copy, so the bytes never pass through Django;
+    other storages stream it in chunks.
+    
+    Args:
+        source: FieldFile to copy from
+        target: FieldFile to copy into (its name is updated, the model is not saved)
+        filename: Base filename for the copy
+    """
+    from storages.backends.s3boto3 import S3Boto3Storage
+    from storages.utils import clean_name
+    
+    storage = target.storage
+    name = target.field.generate_filename(target.instance, filename)
+    name = storage.get_available_name(name, max_length=target.field.max_length)
+    
+    if isinstance(storage, S3Boto3Storage) and isinstance(source.storage, S3Boto3Storage):
+        key = storage._normalize_name(clean_name(name))
+        storage.bucket.Object(key).copy(
+            {
+                'Bucket': source.storage.bucket_name,
+                'Key': source.storage._normalize_name(clean_name(source.name)),
+            },
+            ExtraArgs=storage._get_write_parameters(key),
+        )
+    else:
+        source.open('rb')
+        try:
+            name = storage.save(name, source, max_length=target.field.max_length)
+        finally:
+            source.close()
+    
+    target.name = name
+
+
+def watermarked_filename(file_name, tag):
+    """Timestamped name so CDN/browser caches never serve the old file"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    name_without_ext = os.path.splitext(os.path.basename(file_name))[0]
+    return f"{name_without_ext}_{tag}_{timestamp}.pdf"
+
+
+def watermark_stored_resource(watermarker, resource, tag, backup_original=True):
+    """
+    Watermark a Resource's stored PDF with bounded memory: the input and
+    output are SpooledTemporaryFiles, the backup is a storage-side copy and
+    the result is streamed straight to storage.
+    
+    Args:
+        watermarker: PDFWatermarker or PDFLogoWatermarker
+        resource: Resource model instance with file field
+        tag: Marker added to the watermarked filename
+        backup_original: If True, saves original file to original_file field
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not resource.file:
+        return False
+    
+    # Check if it's a PDF
+    file_name = resource.file.name
+    if not file_name.lower().endswith('.pdf'):
+        return False
+    
+    try:
+        # Backup original file if requested and not already backed up
+        if backup_original and not resource.original_file:
+            original_filename = os.path.basename(file_name)
+            copy_stored_file(resource.file, resource.original_file, original_filename)
+            print(f"✅ Backed up original file: {original_filename}")
+        
+        new_filename = watermarked_filename(file_name, tag)
+        with spool_stored_file(resource.file) as source, \
+                tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as watermarked:
+            watermarker.add_watermark_to_pdf(source, watermarked)
+            
+            # Save the watermarked PDF back to the resource
+            resource.file.save(new_filename, File(watermarked), save=True)
+        
+        print(f"✅ Watermarked file: {new_filename}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error watermarking PDF {resource.name}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
 
 
 class PDFWatermarker:
@@ -52,6 +243,13 @@ class PDFWatermarker:
         self.font_size = font_size
         self.position = position
     
+    def overlay_config(self):
+        """Everything that affects the rendered overlay, used as the cache key"""
+        return (
+            type(self).__name__, self.watermark_text, self.opacity,
+            self.font_name, self.font_size, self.position,
+        )
+    
     def create_watermark_page(self, page_width, page_height):
         """
         Create a watermark page using ReportLab
@@ -114,57 +312,44 @@ class PDFWatermarker:
         packet.seek(0)
         return packet
     
-    def add_watermark_to_pdf(self, input_pdf_path_or_file):
+    def add_watermark_to_pdf(self, input_pdf_path_or_file, output=None):
         """
         Add watermark to PDF file
         
         Args:
             input_pdf_path_or_file: Path to PDF file or file-like object
+            output: Optional file-like object to write into (default: new BytesIO)
             
         Returns:
-            BytesIO object containing watermarked PDF
+            File-like object containing watermarked PDF, rewound
         """
         # Read the input PDF
         if isinstance(input_pdf_path_or_file, str):
             with open(input_pdf_path_or_file, 'rb') as file:
                 pdf_reader = PdfReader(file)
-                return self._process_pdf(pdf_reader)
+                return self._process_pdf(pdf_reader, output)
         else:
             # It's a file-like object
             input_pdf_path_or_file.seek(0)
             pdf_reader = PdfReader(input_pdf_path_or_file)
-            return self._process_pdf(pdf_reader)
+            return self._process_pdf(pdf_reader, output)
     
-    def _process_pdf(self, pdf_reader):
+    def _process_pdf(self, pdf_reader, output=None):
         """
         Process PDF and add watermark to each page
         
         Args:
             pdf_reader: PdfReader object
+            output: Optional file-like object to write into (default: new BytesIO)
             
         Returns:
-            BytesIO object containing watermarked PDF
+            File-like object containing watermarked PDF, rewound
         """
-        pdf_writer = PdfWriter()
-        
-        # Process each page
-        for page_num, page in enumerate(pdf_reader.pages):
-            # Get page dimensions
-            page_box = page.mediabox
-            page_width = float(page_box.width)
-            page_height = float(page_box.height)
-            
-            # Create watermark for this page size
-            watermark_pdf = self.create_watermark_page(page_width, page_height)
-            watermark_reader = PdfReader(watermark_pdf)
-            watermark_page = watermark_reader.pages[0]
-            
-            # Merge watermark with original page
-            page.merge_page(watermark_page)
-            pdf_writer.add_page(page)
+        pdf_writer = merge_cached_overlays(self, pdf_reader)
         
         # Write to output
-        output = io.BytesIO()
+        if output is None:
+            output = io.BytesIO()
         pdf_writer.write(output)
         output.seek(0)
         return output
@@ -180,60 +365,7 @@ class PDFWatermarker:
         Returns:
             bool: True if successful, False otherwise
         """
-        if not resource.file:
-            return False
-        
-        # Check if it's a PDF
-        file_name = resource.file.name
-        if not file_name.lower().endswith('.pdf'):
-            return False
-        
-        try:
-            # Backup original file if requested and not already backed up
-            if backup_original and not resource.original_file:
-                resource.file.seek(0)
-                original_content = resource.file.read()
-                original_filename = os.path.basename(file_name)
-                
-                # Save to original_file field
-                resource.original_file.save(
-                    original_filename,
-                    ContentFile(original_content),
-                    save=False
-                )
-                print(f"✅ Backed up original file: {original_filename}")
-            
-            # Get the file content for watermarking
-            resource.file.seek(0)
-            file_content = resource.file.read()
-            
-            # Create file-like object
-            input_file = io.BytesIO(file_content)
-            
-            # Add watermark
-            watermarked_pdf = self.add_watermark_to_pdf(input_file)
-            
-            # Generate new filename with timestamp to avoid caching issues
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            original_name = os.path.basename(file_name)
-            name_without_ext = os.path.splitext(original_name)[0]
-            new_filename = f"{name_without_ext}_watermarked_{timestamp}.pdf"
-            
-            # Save the watermarked PDF back to the resource
-            resource.file.save(
-                new_filename,
-                ContentFile(watermarked_pdf.read()),
-                save=True
-            )
-            
-            print(f"✅ Watermarked file: {new_filename}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error watermarking PDF {resource.name}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False
+        return watermark_stored_resource(self, resource, "watermarked", backup_original)
 
 
 class PDFLogoWatermarker:
@@ -273,6 +405,13 @@ class PDFLogoWatermarker:
         self.font_name = font_name
         self.font_size = font_size
     
+    def overlay_config(self):
+        """Everything that affects the rendered overlay, used as the cache key"""
+        return (
+            type(self).__name__, self.logo_path, self.opacity, self.logo_width,
+            self.logo_height, self.text, self.font_name, self.font_size,
+        )
+    
     def create_watermark_page(self, page_width, page_height):
         """
         Create a watermark page with logo and text using ReportLab
@@ -302,7 +441,7 @@ class PDFLogoWatermarker:
             
             # Draw the logo
             can.drawImage(
-                self.logo_path,
+                _load_logo(self.logo_path),
                 logo_x,
                 logo_y,
                 width=self.logo_width,
@@ -325,15 +464,16 @@ class PDFLogoWatermarker:
         packet.seek(0)
         return packet
     
-    def add_watermark_to_pdf(self, input_pdf_path_or_file):
+    def add_watermark_to_pdf(self, input_pdf_path_or_file, output=None):
         """
         Add logo watermark to PDF file
         
         Args:
             input_pdf_path_or_file: Path to PDF file or file-like object
+            output: Optional file-like object to write into (default: new BytesIO)
             
         Returns:
-            BytesIO object containing watermarked PDF
+            File-like object containing watermarked PDF, rewound
         """
         # Open the input PDF
         if isinstance(input_pdf_path_or_file, str):
@@ -341,25 +481,11 @@ class PDFLogoWatermarker:
         else:
             pdf_reader = PdfReader(input_pdf_path_or_file)
         
-        pdf_writer = PdfWriter()
+        pdf_writer = merge_cached_overlays(self, pdf_reader)
         
-        # Process each page
-        for page_num, page in enumerate(pdf_reader.pages):
-            # Get page dimensions
-            page_width = float(page.mediabox.width)
-            page_height = float(page.mediabox.height)
-            
-            # Create watermark for this page size
-            watermark_pdf = self.create_watermark_page(page_width, page_height)
-            watermark_reader = PdfReader(watermark_pdf)
-            watermark_page = watermark_reader.pages[0]
-            
-            # Merge watermark with page
-            page.merge_page(watermark_page)
-            pdf_writer.add_page(page)
-        
-        # Save to BytesIO
-        output = io.BytesIO()
+        # Save to output
+        if output is None:
+            output = io.BytesIO()
         pdf_writer.write(output)
         output.seek(0)
         
@@ -376,170 +502,175 @@ class PDFLogoWatermarker:
         Returns:
             bool: True if successful, False otherwise
         """
-        if not resource.file:
-            return False
-        
-        # Check if it's a PDF
-        file_name = resource.file.name
-        if not file_name.lower().endswith('.pdf'):
-            return False
+        return watermark_stored_resource(self, resource, "logo_wm", backup_original)
+
+
+# Watermark styles used by the batch command / admin actions: (class, kwargs, filename tag)
+WATERMARK_STYLES = {
+    "text": (
+        PDFWatermarker,
+        dict(
+            watermark_text="Visit GyanAangan.in For More Such Content",
+            opacity=0.3,
+            font_size=20,
+            position="both",
+        ),
+        "watermarked",
+    ),
+    "logo": (
+        PDFLogoWatermarker,
+        dict(
+            opacity=0.15,
+            logo_width=200,
+            logo_height=200,
+            text="GyanAangan",
+            font_size=24,
+        ),
+        "logo_wm",
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def get_watermarker(style):
+    """One watermarker per style per process (keeps its overlay cache warm)"""
+    watermarker_class, kwargs, _ = WATERMARK_STYLES[style]
+    return watermarker_class(**kwargs)
+
+
+def watermark_pdf_file(style, input_path, output_path):
+    """
+    Watermark the PDF at input_path into output_path. Works on paths so it can
+    run in a process pool without shipping document bytes between processes.
+    
+    Args:
+        style: Key of WATERMARK_STYLES
+        input_path: Path of the original PDF
+        output_path: Path to write the watermarked PDF to
+    """
+    with open(output_path, 'wb') as output:
+        get_watermarker(style).add_watermark_to_pdf(input_path, output)
+
+
+# Watermarked variants served by WATERMARK_ON_DOWNLOAD, named
+# <content hash>-<style>-v<config version>.pdf
+WATERMARKED_VARIANTS_DIR = "resources/watermarked"
+
+
+def download_watermark_style():
+    """Style applied when serving PDFs, or None if on-demand watermarking is off"""
+    style = getattr(settings, "WATERMARK_ON_DOWNLOAD", "")
+    return style if style in WATERMARK_STYLES else None
+
+
+def pristine_file(resource):
+    """The un-watermarked source: the backup if the file was watermarked in place"""
+    return resource.original_file if resource.original_file else resource.file
+
+
+def resource_content_hash(resource):
+    """
+    SHA-256 of the resource's original file, computed by streaming it once
+    and stored on the row.
+    
+    Args:
+        resource: Resource model instance
         
+    Returns:
+        str: Hex digest
+    """
+    if not resource.content_hash:
+        source = pristine_file(resource)
+        source.open('rb')
         try:
-            # Backup original file if requested and not already backed up
-            if backup_original and not resource.original_file:
-                resource.file.seek(0)
-                original_content = resource.file.read()
-                original_filename = os.path.basename(file_name)
-                
-                # Save to original_file field
-                resource.original_file.save(
-                    original_filename,
-                    ContentFile(original_content),
-                    save=False
-                )
-                print(f"✅ Backed up original file: {original_filename}")
-            
-            # Get the file content for watermarking
-            resource.file.seek(0)
-            file_content = resource.file.read()
-            
-            # Create file-like object
-            input_file = io.BytesIO(file_content)
-            
-            # Add logo watermark
-            watermarked_pdf = self.add_watermark_to_pdf(input_file)
-            
-            # Generate new filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            original_name = os.path.basename(file_name)
-            name_without_ext = os.path.splitext(original_name)[0]
-            new_filename = f"{name_without_ext}_logo_wm_{timestamp}.pdf"
-            
-            # Save the watermarked PDF back to the resource
-            resource.file.save(
-                new_filename,
-                ContentFile(watermarked_pdf.read()),
-                save=True
-            )
-            
-            print(f"✅ Added logo watermark: {new_filename}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error adding logo watermark to {resource.name}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False
+            resource.content_hash = sha256_file(source)
+        finally:
+            source.close()
+        type(resource).objects.filter(pk=resource.pk).update(content_hash=resource.content_hash)
+    return resource.content_hash
 
 
-def add_logo_watermark_to_resources(resources_queryset, request=None, backup_original=True):
+def get_watermarked_variant(resource, style):
     """
-    Add logo watermark to multiple resources (admin action helper)
+    Storage name of the watermarked copy of a resource's original PDF,
+    rendering and storing it on first use. The name derives from the
+    original's content hash and WATERMARK_CONFIG_VERSION, so the original is
+    never touched and re-uploads or config changes simply miss the cache.
     
     Args:
-        resources_queryset: QuerySet of Resource objects
-        request: Django request object (optional, for messages)
-        backup_original: If True, backup original files before watermarking
+        resource: Resource model instance with a PDF file
+        style: Key of WATERMARK_STYLES
         
     Returns:
-        dict: Statistics about the operation
+        str: Name of the variant in resource.file.storage
     """
-    watermarker = PDFLogoWatermarker(
-        opacity=0.15,  # 15% opacity for subtle branding
-        logo_width=200,
-        logo_height=200,
-        text="GyanAangan",
-        font_size=24
-    )
+    storage = resource.file.storage
+    version = getattr(settings, "WATERMARK_CONFIG_VERSION", "1")
+    name = f"{WATERMARKED_VARIANTS_DIR}/{resource_content_hash(resource)}-{style}-v{version}.pdf"
     
-    stats = {
-        'total': resources_queryset.count(),
-        'processed': 0,
-        'backed_up': 0,
-        'skipped': 0,
-        'failed': 0,
-        'not_pdf': 0,
-        'no_file': 0
-    }
+    # Remember which variants exist so a hit costs no storage round trip
+    cache_key = f"watermark:variant:{name}"
+    stored_name = cache.get(cache_key)
+    if stored_name:
+        return stored_name
     
-    for resource in resources_queryset:
-        if not resource.file:
-            stats['no_file'] += 1
-            stats['skipped'] += 1
-            continue
-        
-        file_name = resource.file.name
-        if not file_name.lower().endswith('.pdf'):
-            stats['not_pdf'] += 1
-            stats['skipped'] += 1
-            continue
-        
-        # Track if backup was created
-        had_backup_before = bool(resource.original_file)
-        
-        success = watermarker.watermark_resource_file(resource, backup_original=backup_original)
-        if success:
-            stats['processed'] += 1
-            # Check if backup was created during this operation
-            if backup_original and not had_backup_before and resource.original_file:
-                stats['backed_up'] += 1
-        else:
-            stats['failed'] += 1
+    if storage.exists(name):
+        stored_name = name
+    else:
+        with spool_stored_file(pristine_file(resource)) as source, \
+                tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as watermarked:
+            get_watermarker(style).add_watermark_to_pdf(source, watermarked)
+            # Two concurrent first requests both render; the loser's copy gets a
+            # suffixed name and is simply never looked up again
+            stored_name = storage.save(name, File(watermarked))
+    
+    cache.set(cache_key, stored_name, None)
+    return stored_name
+
+
+def serves_watermarked_variant(resource):
+    """True when resource_served_file hands out a watermarked variant (no I/O)"""
+    return bool(download_watermark_style()) and resource.file.name.lower().endswith(".pdf")
+
+
+def resource_served_file(resource):
+    """
+    The file to hand out for a resource: the watermarked variant for PDFs
+    when WATERMARK_ON_DOWNLOAD is set, otherwise resource.file itself.
+    May render the variant, so only call it from the endpoint serving the
+    file; pages and serializers link to that endpoint instead.
     
-    return stats
+    Args:
+        resource: Resource model instance with a file
+        
+    Returns:
+        tuple: (storage, name)
+    """
+    if serves_watermarked_variant(resource):
+        return resource.file.storage, get_watermarked_variant(resource, download_watermark_style())
+    return resource.file.storage, resource.file.name
 
 
-def add_watermark_to_resources(resources_queryset, request=None, backup_original=True):
+def enqueue_watermark(resources_queryset, style, force=False):
     """
-    Add watermark to multiple resources (admin action helper)
+    Mark PDF resources as pending for the watermark_resources command, which
+    runs from cron (or a worker) rather than from the request.
     
     Args:
         resources_queryset: QuerySet of Resource objects
-        request: Django request object (optional, for messages)
-        backup_original: If True, backup original files before watermarking
+        style: Key of WATERMARK_STYLES
+        force: Also re-queue resources already watermarked, if they have a
+            backup to start again from
         
     Returns:
-        dict: Statistics about the operation
+        int: Number of resources queued
     """
-    watermarker = PDFWatermarker(
-        watermark_text="Visit GyanAangan.in For More Such Content",
-        opacity=0.3,  # 30% opacity for better visibility
-        font_size=20,  # Larger font size
-        position="both"  # Both top and bottom
+    queryset = resources_queryset.filter(file__iendswith=".pdf").exclude(
+        watermark_status__in=["pending", "processing"]
     )
-    
-    stats = {
-        'total': resources_queryset.count(),
-        'processed': 0,
-        'backed_up': 0,
-        'skipped': 0,
-        'failed': 0,
-        'not_pdf': 0,
-        'no_file': 0
-    }
-    
-    for resource in resources_queryset:
-        if not resource.file:
-            stats['no_file'] += 1
-            stats['skipped'] += 1
-            continue
-        
-        file_name = resource.file.name
-        if not file_name.lower().endswith('.pdf'):
-            stats['not_pdf'] += 1
-            stats['skipped'] += 1
-            continue
-        
-        # Track if backup was created
-        had_backup_before = bool(resource.original_file)
-        
-        success = watermarker.watermark_resource_file(resource, backup_original=backup_original)
-        if success:
-            stats['processed'] += 1
-            # Check if backup was created during this operation
-            if backup_original and not had_backup_before and resource.original_file:
-                stats['backed_up'] += 1
-        else:
-            stats['failed'] += 1
-    
-    return stats
+    if force:
+        # Without a backup the file already carries a watermark; don't stack another
+        queryset = queryset.exclude(Q(watermark_status="done") & (Q(original_file="") | Q(original_file__isnull=True)))
+    else:
+        queryset = queryset.exclude(watermark_status="done")
+    return queryset.update(watermark_status="pending", watermark_style=style)
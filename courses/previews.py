@@ -0,0 +1,148 @@
+"""
+First-page WebP previews (and an optional contact sheet) for PDF resources.
+
+Previews are named after the resource's content hash in PublicMediaStorage,
+so they are generated once per distinct file and served without signing:
+    previews/<hash>/page1-<width>.webp
+    previews/<hash>/sheet-<width>.webp
+"""
+import io
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from PIL import Image
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    # Without a rasterizer only scanned PDFs (a page-sized image per page) get previews
+    pdfium = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    from PyPDF2 import PdfReader
+
+PREVIEW_DIR = "previews"
+PREVIEW_QUALITY = 75
+CONTACT_SHEET_PAGES = 6
+CONTACT_SHEET_COLUMNS = 3
+
+
+class PreviewUnavailable(Exception):
+    """The PDF has no page that can be turned into an image"""
+
+
+@lru_cache(maxsize=None)
+def preview_storage():
+    from gyanaangan.settings import PublicMediaStorage
+    return PublicMediaStorage()
+
+
+def preview_widths():
+    return tuple(getattr(settings, "RESOURCE_PREVIEW_WIDTHS", (320, 640)))
+
+
+def preview_name(content_hash, kind, width):
+    return f"{PREVIEW_DIR}/{content_hash}/{kind}-{width}.webp"
+
+
+def preview_urls(resource, storage=None):
+    """
+    {"320": url, "640": url, "sheet": url} for a resource whose previews
+    exist (None otherwise), built without touching storage.
+
+    Args:
+        resource: Resource, ideally annotated with ResourcePreview.annotations()
+        storage: Storage the previews live in (default: PublicMediaStorage)
+    """
+    info = resource.preview_info()
+    if not info:
+        return None
+    storage = storage or preview_storage()
+    widths, sheet_width = info
+    urls = {str(width): storage.url(preview_name(resource.content_hash, "page1", width)) for width in widths}
+    if sheet_width:
+        urls["sheet"] = storage.url(preview_name(resource.content_hash, "sheet", sheet_width))
+    return urls
+
+
+def _render_pages(path, page_count, width):
+    """Renders the first page_count pages of the PDF as PIL images about width px wide"""
+    if pdfium is not None:
+        document = pdfium.PdfDocument(path)
+        try:
+            images = []
+            for index in range(min(page_count, len(document))):
+                page = document[index]
+                scale = width / page.get_width()
+                images.append(page.render(scale=scale).to_pil().convert("RGB"))
+                page.close()
+            return images, len(document)
+        finally:
+            document.close()
+
+    # Scanned papers are one big image per page: use it directly
+    reader = PdfReader(path)
+    images = []
+    for page in reader.pages[:page_count]:
+        embedded = [image.image for image in page.images if image.image is not None]
+        if not embedded:
+            break
+        images.append(max(embedded, key=lambda im: im.width * im.height).convert("RGB"))
+    return images, len(reader.pages)
+
+
+def _webp(image, width):
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, "WEBP", quality=PREVIEW_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _contact_sheet(pages, width):
+    columns = min(CONTACT_SHEET_COLUMNS, len(pages))
+    cell_width = width // columns
+    cells = [page.resize((cell_width, round(page.height * cell_width / page.width)), Image.LANCZOS) for page in pages]
+    cell_height = max(cell.height for cell in cells)
+    rows = (len(cells) + columns - 1) // columns
+    sheet = Image.new("RGB", (cell_width * columns, cell_height * rows), "white")
+    for index, cell in enumerate(cells):
+        sheet.paste(cell, ((index % columns) * cell_width, (index // columns) * cell_height))
+    return sheet
+
+
+def render_previews(input_path, output_dir, widths, contact_sheet_width=None):
+    """
+    Render the previews of the PDF at input_path into output_dir. Works on
+    paths so it can run in a process pool.
+
+    Args:
+        input_path: Path of the PDF
+        output_dir: Directory to write the WebP files to
+        widths: Widths of the first-page preview
+        contact_sheet_width: Width of the contact sheet, or None to skip it
+
+    Returns:
+        tuple: ([(kind, width, path), ...], page count)
+    """
+    page_count = CONTACT_SHEET_PAGES if contact_sheet_width else 1
+    pages, total_pages = _render_pages(input_path, page_count, max(widths))
+    if not pages:
+        raise PreviewUnavailable("no renderable page (install pypdfium2 for text PDFs)")
+
+    outputs = []
+    for width in widths:
+        path = os.path.join(output_dir, f"page1-{width}.webp")
+        with open(path, "wb") as f:
+            f.write(_webp(pages[0], width))
+        outputs.append(("page1", width, path))
+
+    if contact_sheet_width and len(pages) > 1:
+        path = os.path.join(output_dir, f"sheet-{contact_sheet_width}.webp")
+        with open(path, "wb") as f:
+            f.write(_webp(_contact_sheet(pages, contact_sheet_width), contact_sheet_width))
+        outputs.append(("sheet", contact_sheet_width, path))
+    return outputs, total_pages
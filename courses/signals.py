@@ -1,6 +1,6 @@
 # signals.py
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Resource, Subject
 
@@ -10,3 +10,10 @@ def update_subject_last_resource_updated(sender, instance, **kwargs):
         subject = instance.subject
         subject.update_last_resource_updated()
         subject.save()
+
+
+@receiver(post_delete, sender=Resource)
+def release_resource_files(sender, instance, **kwargs):
+    # Stored blobs are shared between duplicate uploads, so only the last reference deletes them
+    instance.release_file(instance.file)
+    instance.release_file(instance.original_file)
@@ -0,0 +1,43 @@
+"""
+Plain text extraction from resource PDFs, used by the extract_resource_text
+command to feed resource search and PYQ topic extraction.
+"""
+import re
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    from PyPDF2 import PdfReader
+
+# Postgres text columns reject NUL, and runs of layout whitespace only bloat the index
+_NUL_RE = re.compile('\x00')
+_SPACES_RE = re.compile(r'[ \t\r\f\v]+')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def clean_text(text):
+    text = _NUL_RE.sub('', text or '')
+    text = _SPACES_RE.sub(' ', text)
+    return _BLANK_LINES_RE.sub('\n\n', text).strip()
+
+
+def extract_pdf_pages(path):
+    """
+    Extract the text of each page of the PDF at path. Takes a path (not
+    bytes) so it can run in a process pool cheaply.
+    
+    Args:
+        path: Path of the PDF
+        
+    Returns:
+        list: Cleaned text of each page, "" for pages without a text layer
+    """
+    reader = PdfReader(path)
+    pages = []
+    for page in reader.pages:
+        try:
+            pages.append(clean_text(page.extract_text()))
+        except Exception:
+            # One malformed page shouldn't lose the rest of the document
+            pages.append("")
+    return pages
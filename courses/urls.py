@@ -10,11 +10,13 @@ from .views import (
     resource_view,
     search,
     year_detail,
+    og_image,
 )
 
 urlpatterns = [
     path("", home, name="home"),
     path("search/", search, name="search"),
+    path("og/<str:kind>/<slug:slug>.png", og_image, name="og_image"),
     path("subjects/", subject_list, name="subject_list"),
     path("courses/", course_list, name="course_list"),
     path("resources/", resource_list, name="resource_list"),
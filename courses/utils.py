@@ -1,9 +1,38 @@
 # utils.py
 from django.db.models.signals import post_save
 from contextlib import contextmanager
+import hashlib
+import multiprocessing
 
 @contextmanager
 def disable_signal(signal, sender, receiver):
     signal.disconnect(receiver, sender=sender)
     yield
     signal.connect(receiver, sender=sender)
+
+
+def sha256_file(f):
+    """
+    Streaming SHA-256 of a Django File/UploadedFile/FieldFile.
+    The digest is remembered on the file object so a form and the model's
+    save() don't hash the same upload twice.
+    """
+    digest = getattr(f, '_sha256', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in f.chunks():
+            hasher.update(chunk)
+        f.seek(0)
+        digest = f._sha256 = hasher.hexdigest()
+    return digest
+
+
+def worker_process_context():
+    """
+    multiprocessing context for the process pools of the batch commands.
+    Their workers start lazily, from inside I/O threads; a plain fork there
+    can copy a lock another thread holds and deadlock the child, so workers
+    come from a fresh interpreter (forkserver, or spawn where it's missing).
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
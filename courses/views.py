@@ -1,4 +1,10 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
 from django.db.models import Q, F
@@ -7,13 +13,28 @@ from django.db.models.functions import Greatest
 from blog.models import BlogPost
 from core.models import SEODetail
 from .models import Notification, SpecialPage, Subject, Course, Resource, Stream
+from .og_images import (
+    OG_MODELS,
+    og_hash,
+    og_image_is_current,
+    og_image_is_custom,
+    og_image_url,
+    og_model,
+    write_og_image,
+)
+from .pdf_watermark import serves_watermarked_variant
+from .previews import preview_urls
 from django.urls import reverse
 from django.db.models import Q
 from django.templatetags.static import static
 from urllib.parse import urlparse, parse_qs
 
+logger = logging.getLogger(__name__)
+
 # default_og_image_url = static('images/default-og-image.jpg')
 
+OG_RENDER_LOCK_TIMEOUT = 60
+
 
 def search(request):
     query = request.GET.get("q", "")
@@ -294,15 +315,30 @@ def resource_view(
             site_name="Gyan Aangan",
         )
 
+    file_url = None
+    if resource.file:
+        if serves_watermarked_variant(resource):
+            # The API endpoint renders the variant on first request, not this page
+            file_url = request.build_absolute_uri(reverse("resource-file", kwargs={"slug": resource.slug}))
+        else:
+            file_url = resource.file.url
+    previews = (preview_urls(resource) if "view" in resource.privacy else None) or {}
+    # Largest first-page preview: shown while the viewer loads and used when there is no OG image
+    page_widths = [key for key in previews if key.isdigit()]
+    preview_image = previews[max(page_widths, key=int)] if page_widths else None
+
     context = {
         "resource": resource,
+        "file_url": file_url,
         "title": seo_detail.title,
         "meta_description": seo_detail.meta_description,
+        # A stored OG card wins; otherwise the page preview beats a card rendered on demand
         "og_image": (
-            resource.og_image.url
-            if resource.og_image
-            else static("images/default-og-image.jpg")
+            preview_image
+            if preview_image and not (og_image_is_custom(resource) or og_image_is_current(resource))
+            else og_image_url(resource) or static("images/default-og-image.jpg")
         ),
+        "preview_image": preview_image,
         "site_name": seo_detail.site_name,
     }
 
@@ -427,3 +463,41 @@ def year_detail(request, course_slug, stream_slug, year_slug):
     }
 
     return render(request, "courses/year_detail.html", context)
+
+
+def _og_redirect(url, max_age):
+    response = redirect(url)
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def og_image(request, kind, slug):
+    """
+    /og/<kind>/<slug>.png: redirects to the entity's OG image, rendering and
+    storing it inline first if it's missing or outdated. Only one request
+    (across workers when the cache is shared) renders a given title and
+    template; concurrent ones get the default image instead of waiting. Bulk
+    rebuilds go through generate_og_images.
+    """
+    if kind not in OG_MODELS:
+        raise Http404
+    model = og_model(kind)
+    obj = get_object_or_404(model.objects.filter(status="published"), slug=slug)
+    max_age = getattr(settings, "OG_IMAGE_MAX_AGE", 86400)
+
+    if og_image_is_custom(obj) or og_image_is_current(obj):
+        return _og_redirect(obj.og_image.url, max_age)
+
+    lock_key = f"og:render:{kind}:{slug}:{og_hash(obj)}"
+    if cache.add(lock_key, 1, timeout=OG_RENDER_LOCK_TIMEOUT):
+        try:
+            write_og_image(obj)
+            model.objects.filter(pk=obj.pk).update(og_image=obj.og_image.name)
+            return _og_redirect(obj.og_image.url, max_age)
+        except Exception:
+            logger.exception("Rendering the OG image of %s %s failed", kind, slug)
+        finally:
+            cache.delete(lock_key)
+
+    # Not rendered (yet): short-lived fallback so the next crawl gets the real card
+    return _og_redirect(static("images/default-og-image.jpg"), 60)
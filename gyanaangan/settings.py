@@ -118,6 +118,18 @@ DATABASES = {
 
 DATABASES["default"] = DATABASES["prod"]
 
+# One cache shared by every process when REDIS_URL is set, so invalidations
+# (results, schemes, statistics) reach all workers; otherwise Django's
+# per-process LocMem default
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        },
+    }
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -242,6 +254,64 @@ STORAGES = {
 
 GOOGLE_ANALYTICS_GTAG_PROPERTY_ID = os.getenv("G_TAG")
 
+# Tracking: fraction of bot beacons (crawlers, uptime monitors) still recorded
+TRACKING_BOT_SAMPLE_RATE = float(os.getenv("TRACKING_BOT_SAMPLE_RATE", "0"))
+# ...and of beacons without a User-Agent (privacy tools, some in-app browsers)
+TRACKING_EMPTY_UA_SAMPLE_RATE = float(os.getenv("TRACKING_EMPTY_UA_SAMPLE_RATE", "1"))
+# Per event type keep-rate, applied once that type exceeds
+# TRACKING_SAMPLING_THRESHOLD beacons/minute. Unlisted types are always kept.
+TRACKING_SAMPLE_RATES = {
+    "page_view": 0.1,
+    "click": 0.5,
+}
+TRACKING_SAMPLING_THRESHOLD = int(os.getenv("TRACKING_SAMPLING_THRESHOLD", "600"))
+# Token bucket per visitor_id: burst size and refill (tokens/second)
+TRACKING_VISITOR_BURST = int(os.getenv("TRACKING_VISITOR_BURST", "60"))
+TRACKING_VISITOR_RATE = float(os.getenv("TRACKING_VISITOR_RATE", "1"))
+# Disk spool for tracking beacons: "off", "fallback" (only while the DB is
+# failing or slow) or "always". Load segments with `manage.py load_spooled_events`.
+TRACKING_SPOOL_MODE = os.getenv("TRACKING_SPOOL_MODE", "fallback")
+TRACKING_SPOOL_DIR = os.getenv("TRACKING_SPOOL_DIR", str(BASE_DIR / "spool" / "tracking"))
+
+# Watermark PDFs when they are served ("text" or "logo", empty to disable)
+# instead of rewriting Resource.file. Variants are cached in storage per
+# original content hash; bump the version after changing WATERMARK_STYLES.
+WATERMARK_ON_DOWNLOAD = os.getenv("WATERMARK_ON_DOWNLOAD", "")
+WATERMARK_CONFIG_VERSION = os.getenv("WATERMARK_CONFIG_VERSION", "1")
+
+# How ResourceViewSet.download hands out files: "stream" (chunked, with Range
+# support), "redirect" (presigned URL) or "accel" (X-Accel-Redirect to an
+# internal nginx location that proxies the bucket)
+RESOURCE_DOWNLOAD_MODE = os.getenv("RESOURCE_DOWNLOAD_MODE", "stream")
+RESOURCE_DOWNLOAD_URL_EXPIRE = int(os.getenv("RESOURCE_DOWNLOAD_URL_EXPIRE", "300"))
+RESOURCE_DOWNLOAD_ACCEL_PREFIX = os.getenv("RESOURCE_DOWNLOAD_ACCEL_PREFIX", "/protected-media/")
+# Widths of the first-page WebP previews rendered by `manage.py generate_previews`
+RESOURCE_PREVIEW_WIDTHS = (320, 640)
+# Bump to re-render every generated OG image (`manage.py generate_og_images`)
+# after changing something the template hash doesn't cover, like the logo
+OG_IMAGE_VERSION = os.getenv("OG_IMAGE_VERSION", "1")
+# Cache lifetime of the /og/<kind>/<slug>.png redirect to the stored image
+OG_IMAGE_MAX_AGE = int(os.getenv("OG_IMAGE_MAX_AGE", "86400"))
+# Result search: seconds of loading animation the page shows before revealing
+# a result (run in the browser), and how long a reveal link stays valid
+RESULT_REVEAL_DELAY = int(os.getenv("RESULT_REVEAL_DELAY", "10"))
+RESULT_REVEAL_TOKEN_MAX_AGE = int(os.getenv("RESULT_REVEAL_TOKEN_MAX_AGE", "600"))
+# Result lookups are logged in batches: every N rows or every N seconds, whichever comes first
+RESULT_QUERY_LOG_FLUSH_EVERY = int(os.getenv("RESULT_QUERY_LOG_FLUSH_EVERY", "100"))
+RESULT_QUERY_LOG_FLUSH_INTERVAL = float(os.getenv("RESULT_QUERY_LOG_FLUSH_INTERVAL", "5"))
+# Upper bound on how long the cohort statistics/rank endpoints are cached
+# (they're also invalidated whenever the statistics are recomputed)
+RESULT_STATS_CACHE_SECONDS = int(os.getenv("RESULT_STATS_CACHE_SECONDS", "300"))
+# Bump to re-render every stored marksheet (results/marksheet.svg changes are picked up automatically)
+MARKSHEET_VERSION = os.getenv("MARKSHEET_VERSION", "1")
+# Subject rows (summed over all students) accepted per /api/results/calculate/ request
+RESULT_CALCULATE_MAX_ROWS = int(os.getenv("RESULT_CALCULATE_MAX_ROWS", "10000"))
+# Result lookups are cached by roll number; unknown roll numbers for a shorter
+# time, and only with a shared cache: a per-process cache never sees an
+# import's invalidation, so new roll numbers would stay hidden until expiry
+RESULT_CACHE_SECONDS = int(os.getenv("RESULT_CACHE_SECONDS", "300"))
+RESULT_NEGATIVE_CACHE_SECONDS = int(os.getenv("RESULT_NEGATIVE_CACHE_SECONDS", "60" if REDIS_URL else "0"))
+
 # oauth.py
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_OAUTH_CLIENT_SECRET")
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ResultQuery, StudentResult, ManualResultEntry
+from .models import ResultCohortStats, ResultQuery, ResultRank, ResultScheme, StudentResult, ManualResultEntry
 from django.utils.html import format_html
 
 
@@ -77,10 +77,10 @@ class ResultQueryAdmin(admin.ModelAdmin):
 
 @admin.register(StudentResult)
 class StudentResultAdmin(admin.ModelAdmin):
-    list_display = ['roll_number', 'name', 'father_name', 'total_marks', 'percentage', 'created_at']
+    list_display = ['roll_number', 'name', 'father_name', 'sgpa', 'total_marks', 'percentage', 'created_at']
     list_filter = ['created_at', 'updated_at']
     search_fields = ['roll_number', 'name', 'father_name']
-    readonly_fields = ['total_marks', 'percentage', 'created_at', 'updated_at']
+    readonly_fields = ['sgpa', 'total_marks', 'percentage', 'grade_points', 'created_at', 'updated_at']
     
     def get_readonly_fields(self, request, obj=None):
         if obj:  # Editing existing object
@@ -88,6 +88,28 @@ class StudentResultAdmin(admin.ModelAdmin):
         return self.readonly_fields
 
 
+@admin.register(ResultScheme)
+class ResultSchemeAdmin(admin.ModelAdmin):
+    list_display = ['semester', 'branch', 'college', 'roll_start', 'roll_end', 'is_default', 'grading_rule', 'updated_at']
+    list_filter = ['semester', 'branch', 'grading_rule', 'is_default']
+    search_fields = ['semester', 'branch', 'college']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(ResultCohortStats)
+class ResultCohortStatsAdmin(admin.ModelAdmin):
+    list_display = ['scheme', 'student_count', 'ranked_count', 'sgpa_mean', 'sgpa_median', 'sgpa_stddev', 'computed_at']
+    readonly_fields = ['computed_at']
+
+
+@admin.register(ResultRank)
+class ResultRankAdmin(admin.ModelAdmin):
+    list_display = ['result', 'scheme', 'rank', 'cohort_size', 'percentile']
+    list_filter = ['scheme']
+    search_fields = ['result__roll_number', 'result__name']
+    raw_id_fields = ['result']
+
+
 @admin.register(ManualResultEntry)
 class ManualResultEntryAdmin(admin.ModelAdmin):
     list_display = ['roll_number', 'name', 'user', 'total_marks', 'percentage', 'created_at']
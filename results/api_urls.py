@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .api_views import SGPACalculateView
+
+urlpatterns = [
+    path('calculate/', SGPACalculateView.as_view(), name='results_calculate_api'),
+]
@@ -0,0 +1,90 @@
+import math
+
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .grading import grade_batch
+from .models import ManualResultEntry
+from .serializers import SGPACalculationSerializer
+from .views import log_result_query
+
+
+def _number_or_none(value, digits=2):
+    return None if math.isnan(value) else round(float(value), digits)
+
+
+class SGPACalculateView(APIView):
+    """
+    Stateless SGPA calculator: grades every subject row of every student in
+    one vectorized pass (results.grading.grade_batch). With "save": true a
+    logged-in user's calculations are stored as ManualResultEntry rows in a
+    single bulk insert.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = SGPACalculationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if data['save'] and not request.user.is_authenticated:
+            return Response({'detail': 'Log in to save calculations.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        students, rows = data['students'], data['rows']
+        graded = grade_batch(
+            rows['marks'], rows['max_marks'], rows['credit'], rows['owner'], len(students), rows['rule'],
+        )
+
+        results = [
+            {
+                **student,
+                'sgpa': _number_or_none(graded['sgpa'][i]),
+                'total_marks': float(graded['total_marks'][i]),
+                'max_marks': float(graded['max_total'][i]),
+                'percentage': _number_or_none(graded['percentage'][i]),
+                'subjects': [],
+            }
+            for i, student in enumerate(students)
+        ]
+        percents = graded['percent'].tolist()
+        grade_points = graded['grade_point'].tolist()
+        for k, owner in enumerate(rows['owner']):
+            results[owner]['subjects'].append({
+                'name': rows['name'][k],
+                'code': rows['code'][k],
+                'marks': rows['marks'][k],
+                'max_marks': rows['max_marks'][k],
+                'credit': rows['credit'][k],
+                'percent': round(percents[k], 2),
+                'grade_point': int(grade_points[k]),
+            })
+
+        saved = self.save_results(request, results) if data['save'] else 0
+        return Response({'results': results, 'saved': saved})
+
+    def save_results(self, request, results):
+        user = request.user
+        entries = []
+        for result in results:
+            roll_number = result['roll_number'] or f"manual-{user.id}"
+            entries.append(ManualResultEntry(
+                user=user,
+                roll_number=roll_number,
+                name=result['name'] or user.get_full_name() or user.username,
+                marks_data={
+                    subject['name']: {
+                        'total': subject['marks'],
+                        'credit': subject['credit'],
+                        'max_marks': subject['max_marks'],
+                        'percent': subject['percent'],
+                        'grade_point': subject['grade_point'],
+                    }
+                    for subject in result['subjects']
+                },
+                # bulk_create skips save(), so the totals are set here
+                total_marks=round(result['total_marks']),
+                percentage=result['percentage'],
+            ))
+            log_result_query(request, roll_number, True, semester='manual', branch='manual')
+        ManualResultEntry.objects.bulk_create(entries, batch_size=500)
+        return len(entries)
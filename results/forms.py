@@ -1,5 +1,5 @@
 from django import forms
-from .models import StudentResult, ManualResultEntry
+from .models import ManualResultEntry
 
 
 class RollNumberSearchForm(forms.Form):
@@ -41,11 +41,11 @@ class ManualMarksEntryForm(forms.ModelForm):
             })
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, subjects=(), **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Add form fields for each subject
-        subjects = StudentResult.SUBJECTS_DATA['subjects']
+        # Add form fields for each subject of the result scheme (results.schemes)
+        self.subjects = subjects
         
         for i, subject in enumerate(subjects):
             subject_code = subject['code']
@@ -98,9 +98,8 @@ class ManualMarksEntryForm(forms.ModelForm):
         
         # Process marks data
         marks_data = {}
-        subjects = StudentResult.SUBJECTS_DATA['subjects']
         
-        for subject in subjects:
+        for subject in self.subjects:
             subject_code = subject['code']
             credit = subject['credit']
             
@@ -0,0 +1,147 @@
+"""
+Grading engine for student results: one definition of grade points, SGPA
+and totals, used when a result is saved, when it's shown, by
+`manage.py recompute_results` and by the /api/results/calculate/ endpoint.
+
+A subject counts once both its theory and internal marks are known. Its
+grade point comes from its percentage (total / max_marks), or its raw total
+under the "marks" rule, through GRADE_THRESHOLDS; SGPA is the
+credit-weighted mean over credited subjects. Subjects and rules come from
+the ResultScheme of the roll number (results.schemes).
+
+grade_result grades one result; grade_batch grades any number of subject
+rows of any number of students in a few NumPy operations.
+"""
+from bisect import bisect_right
+
+import numpy as np
+
+from .schemes import scheme_for_roll
+
+# Percentage lower bounds and the grade point from each bound upwards
+GRADE_THRESHOLDS = (40, 50, 60, 70, 80, 90)
+GRADE_POINTS = (0, 5, 6, 7, 8, 9, 10)
+
+_GRADE_POINTS_ARRAY = np.array(GRADE_POINTS)
+
+# StudentResult fields grade_result fills in
+GRADED_FIELDS = ['sgpa', 'total_marks', 'percentage', 'grade_points']
+
+
+def get_subjects_data_by_roll(roll_number):
+    """Scheme (semester, branch, college, grading_rule, subjects) of a roll number"""
+    return scheme_for_roll(roll_number)
+
+
+def get_grade_point_by_percentage(percent):
+    return GRADE_POINTS[bisect_right(GRADE_THRESHOLDS, percent)]
+
+
+def grade_points_for_percentages(percentages):
+    """Vectorized get_grade_point_by_percentage over a NumPy array"""
+    return _GRADE_POINTS_ARRAY[np.searchsorted(GRADE_THRESHOLDS, percentages, side="right")]
+
+
+def grading_score(subject_total, max_marks, rule="percentage"):
+    """What the grade thresholds apply to under a scheme's grading rule"""
+    if rule == "marks":
+        return subject_total
+    return (subject_total / max_marks) * 100 if max_marks else 0
+
+
+def grade_result(marks_data, subjects, rule="percentage"):
+    """
+    Grade one result.
+
+    Args:
+        marks_data: StudentResult.marks_data ({code: {"theory": .., "internal": ..}})
+        subjects: Subject list of the result's scheme
+        rule: The scheme's grading_rule
+
+    Returns:
+        dict: sgpa (None without credited marks), total_marks, percentage and
+        grade_points ({code: grade point} for every subject with both marks)
+    """
+    total_points = total_credits = total_marks = max_total = 0
+    grade_points = {}
+    for subject in subjects:
+        code = subject['code']
+        credit = subject['credit']
+        max_marks = subject.get('max_marks', 100)
+        marks = (marks_data or {}).get(code) or {}
+        theory = marks.get('theory')
+        internal = marks.get('internal')
+        if theory is None or internal is None:
+            continue
+        subject_total = theory + internal
+        grade_point = get_grade_point_by_percentage(grading_score(subject_total, max_marks, rule))
+        grade_points[code] = grade_point
+        if credit == 0:
+            continue
+        total_points += grade_point * credit
+        total_credits += credit
+        total_marks += subject_total
+        max_total += max_marks
+    return {
+        'sgpa': round(total_points / total_credits, 2) if total_credits > 0 else None,
+        'total_marks': total_marks,
+        'percentage': (total_marks / max_total) * 100 if max_total else None,
+        'grade_points': grade_points,
+    }
+
+
+def grade_batch(marks, max_marks, credits, owners, count, rules=None):
+    """
+    Vectorized grading of many students' subjects at once, same rules as
+    grade_result (subjects without both marks are simply not passed in).
+
+    Args:
+        marks: Total marks of each subject row
+        max_marks: Max marks of each row
+        credits: Credit of each row
+        owners: Index (0..count-1) of the student each row belongs to
+        count: Number of students
+        rules: Optional grading rule of each row ("percentage" by default)
+
+    Returns:
+        dict of arrays: per row "percent" and "grade_point"; per student
+        "sgpa" (NaN without credited subjects), "total_marks", "max_total"
+        and "percentage" (NaN without credited subjects)
+    """
+    marks = np.asarray(marks, dtype=float)
+    max_marks = np.asarray(max_marks, dtype=float)
+    credits = np.asarray(credits, dtype=float)
+    owners = np.asarray(owners, dtype=np.intp)
+
+    percent = np.divide(marks * 100, max_marks, out=np.zeros(len(marks)), where=max_marks != 0)
+    score = percent if rules is None else np.where(np.asarray(rules) == "marks", marks, percent)
+    grade_point = grade_points_for_percentages(score)
+
+    credited = credits > 0
+    points = np.bincount(owners, weights=grade_point * credits, minlength=count)
+    credit_sums = np.bincount(owners, weights=credits * credited, minlength=count)
+    total_marks = np.bincount(owners, weights=marks * credited, minlength=count)
+    max_total = np.bincount(owners, weights=max_marks * credited, minlength=count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sgpa = np.where(credit_sums > 0, np.round(points / credit_sums, 2), np.nan)
+        percentage = np.where(max_total > 0, total_marks * 100 / max_total, np.nan)
+    return {
+        "percent": percent,
+        "grade_point": grade_point,
+        "sgpa": sgpa,
+        "total_marks": total_marks,
+        "max_total": max_total,
+        "percentage": percentage,
+    }
+
+
+def result_grading(result, scheme):
+    """Stored grading of a StudentResult, graded on the fly for rows saved before it was stored"""
+    if result.grade_points:
+        return {
+            'sgpa': result.sgpa,
+            'total_marks': result.total_marks,
+            'percentage': result.percentage,
+            'grade_points': result.grade_points,
+        }
+    return grade_result(result.marks_data, scheme['subjects'], scheme['grading_rule'])
@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from results.grading import grade_batch, grade_result
+
+
+class Command(BaseCommand):
+    help = 'Measure grading throughput: per-result grade_result against the vectorized grade_batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help='Students to grade')
+        parser.add_argument('--subjects', type=int, default=9, help='Subjects per student')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per engine (best is reported)')
+
+    def handle(self, *args, **options):
+        students, per_student = options['students'], options['subjects']
+        rng = np.random.default_rng(0)
+        theory = rng.integers(0, 71, size=(students, per_student))
+        internal = rng.integers(0, 31, size=(students, per_student))
+        credits = rng.choice([0, 1, 3, 4], size=per_student)
+        subjects = [
+            {'code': f'S{j}', 'name': f'Subject {j}', 'credit': int(credits[j]), 'max_marks': 100}
+            for j in range(per_student)
+        ]
+        marks_data = [
+            {f'S{j}': {'theory': int(theory[i, j]), 'internal': int(internal[i, j])} for j in range(per_student)}
+            for i in range(students)
+        ]
+
+        def per_result():
+            return [grade_result(data, subjects)['sgpa'] for data in marks_data]
+
+        def batched():
+            return grade_batch(
+                (theory + internal).ravel(), np.full(theory.size, 100), np.tile(credits, students),
+                np.repeat(np.arange(students), per_student), students,
+            )['sgpa']
+
+        expected = np.array([np.nan if sgpa is None else sgpa for sgpa in per_result()])
+        if not np.allclose(expected, batched(), equal_nan=True):
+            self.stdout.write(self.style.ERROR('grade_batch and grade_result disagree'))
+            return
+
+        rows = students * per_student
+        for label, engine in (('grade_result', per_result), ('grade_batch', batched)):
+            best = min(self._time(engine) for _ in range(max(1, options['repeat'])))
+            self.stdout.write(
+                f'{label:>12}: {best * 1000:8.1f} ms  {students / best:12,.0f} students/s  {rows / best:14,.0f} rows/s'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Graded {students} student(s) x {per_student} subject(s)'))
+
+    @staticmethod
+    def _time(engine):
+        started = time.perf_counter()
+        engine()
+        return time.perf_counter() - started
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from results.stats import refresh_result_stats, result_stats_are_stale
+
+
+class Command(BaseCommand):
+    help = 'Recompute cohort statistics and every result\'s rank and percentile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-stale', action='store_true',
+                            help='Only if a result changed since the last run (meant for cron)')
+
+    def handle(self, *args, **options):
+        if options['if_stale'] and not result_stats_are_stale():
+            self.stdout.write('Statistics are up to date')
+            return
+        started = time.monotonic()
+        cohorts, ranked = refresh_result_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed statistics of {cohorts} cohort(s) and ranked {ranked} result(s) '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,44 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from results.marksheets import write_marksheets
+from results.models import StudentResult
+
+
+class Command(BaseCommand):
+    help = 'Render the PNG/PDF marksheets of results that lack a current one (rasterized in a process pool)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('roll_numbers', nargs='*', help='Only these roll numbers (default: all results)')
+        parser.add_argument('--pending', action='store_true',
+                            help='Only results queued by bulk uploads (meant for cron)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Rasterizing processes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Results loaded per batch')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        started = time.monotonic()
+
+        queryset = StudentResult.objects.all()
+        if options['roll_numbers']:
+            queryset = queryset.filter(roll_number__in=options['roll_numbers'])
+        if options['pending']:
+            queryset = queryset.filter(marksheet_pending=True)
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+        written = skipped = 0
+        for i in range(0, len(pks), batch_size):
+            batch_pks = pks[i:i + batch_size]
+            if options['pending']:
+                # Claimed before rendering, so an upload arriving meanwhile queues the result again
+                StudentResult.objects.filter(pk__in=batch_pks).update(marksheet_pending=False)
+            batch = StudentResult.objects.filter(pk__in=batch_pks).order_by('pk')
+            w, s = write_marksheets(batch, workers=workers)
+            written += w
+            skipped += s
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {written} marksheet(s) rendered, {skipped} already current in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,76 @@
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from results.grading import get_subjects_data_by_roll, grade_batch
+from results.models import StudentResult
+from results.result_cache import invalidate_result_cache, warm_result_cache
+from results.stats import refresh_result_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored SGPA, totals and grade points of every StudentResult in one vectorized pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk_update')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = list(StudentResult.objects.values_list('pk', 'roll_number', 'marks_data'))
+        if not rows:
+            self.stdout.write('No results')
+            return
+
+        # One row per (result, subject of its scheme)
+        records = []
+        for pk, roll_number, marks_data in rows:
+            marks_data = marks_data or {}
+            scheme = get_subjects_data_by_roll(roll_number)
+            for subject in scheme['subjects']:
+                marks = marks_data.get(subject['code']) or {}
+                records.append((
+                    pk, subject['code'], subject['credit'], subject['max_marks'],
+                    marks.get('theory'), marks.get('internal'), scheme['grading_rule'],
+                ))
+        df = pd.DataFrame(records, columns=['pk', 'code', 'credit', 'max_marks', 'theory', 'internal', 'rule'])
+        df['theory'] = pd.to_numeric(df['theory'], errors='coerce')
+        df['internal'] = pd.to_numeric(df['internal'], errors='coerce')
+
+        # Subjects count once both marks are known, as in results.grading.grade_result
+        df = df[df['theory'].notna() & df['internal'].notna()]
+        owners, graded_pks = pd.factorize(df['pk'])
+        graded_pks = graded_pks.tolist()
+        graded = grade_batch(
+            df['theory'] + df['internal'], df['max_marks'], df['credit'], owners, len(graded_pks), df['rule'],
+        )
+        grade_points = {}
+        for owner, code, point in zip(owners.tolist(), df['code'], graded['grade_point'].tolist()):
+            grade_points.setdefault(graded_pks[owner], {})[code] = int(point)
+        positions = {pk: i for i, pk in enumerate(graded_pks)}
+
+        results = []
+        for pk, _, _ in rows:
+            result = StudentResult(pk=pk, grade_points=grade_points.get(pk, {}), total_marks=0)
+            result.sgpa = result.percentage = None
+            i = positions.get(pk)
+            if i is not None:
+                sgpa, percentage = graded['sgpa'][i], graded['percentage'][i]
+                result.sgpa = None if np.isnan(sgpa) else float(sgpa)
+                result.total_marks = int(graded['total_marks'][i])
+                result.percentage = None if np.isnan(percentage) else float(percentage)
+            results.append(result)
+
+        StudentResult.objects.bulk_update(
+            results, ['sgpa', 'total_marks', 'percentage', 'grade_points'], batch_size=options['batch_size']
+        )
+        # bulk writes skip save(), so cached results are dropped wholesale
+        invalidate_result_cache()
+        warmed = warm_result_cache()
+        self.stdout.write(f'Cached {warmed} result(s)' if warmed is not None else 'Per-process cache: results are cached on demand')
+        cohorts, ranked = refresh_result_stats()
+        self.stdout.write(f'Statistics refreshed for {cohorts} cohort(s), {ranked} ranked result(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed {len(results)} result(s) in {time.monotonic() - started:.1f}s'
+        ))
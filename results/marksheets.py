@@ -0,0 +1,210 @@
+"""
+Server-rendered marksheets (PNG and PDF) for student results.
+
+A marksheet is rendered from the results/marksheet.svg template: cairosvg
+rasterizes it to PNG and ReportLab wraps that PNG in a one-page PDF. Both
+files are stored in PrivateMediaStorage under a name derived from the
+rendered SVG and MARKSHEET_VERSION:
+    marksheets/<roll_number>/<hash>.png
+    marksheets/<roll_number>/<hash>.pdf
+so new marks, a scheme or grading change (even one applied by
+recompute_results, which leaves updated_at alone) and template changes all
+simply miss the cache, and downloads are redirects to the stored file.
+`manage.py generate_marksheets` renders them in bulk in a process pool
+(after imports, and `--pending` from cron for bulk uploads); anything not
+pre-rendered is rendered on first download.
+"""
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import cairosvg
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.template.loader import get_template
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from .grading import get_subjects_data_by_roll, result_grading
+
+MARKSHEET_DIR = "marksheets"
+MARKSHEET_TEMPLATE_NAME = "results/marksheet.svg"
+MARKSHEET_FORMATS = ("png", "pdf")
+MARKSHEET_WIDTH = 1000
+# PNG pixels per SVG unit
+MARKSHEET_SCALE = 2
+
+_ROWS_TOP = 298
+_ROW_HEIGHT = 34
+
+
+@lru_cache(maxsize=None)
+def marksheet_storage():
+    # Full marks are only shown to logged-in users, so the files aren't public
+    from gyanaangan.settings import PrivateMediaStorage
+    return PrivateMediaStorage()
+
+
+@lru_cache(maxsize=None)
+def marksheet_template():
+    """The parsed marksheet template"""
+    return get_template(MARKSHEET_TEMPLATE_NAME)
+
+
+def marksheet_hash(result, svg=None):
+    """
+    Hash of everything a result's marksheet depends on: its rendered SVG
+    (marks, scheme, grading and template) and MARKSHEET_VERSION.
+    """
+    svg = render_marksheet_svg(result) if svg is None else svg
+    version = getattr(settings, "MARKSHEET_VERSION", "1")
+    return hashlib.sha256(f"{version}\0{svg}".encode()).hexdigest()[:16]
+
+
+def marksheet_name(result, fmt, svg=None):
+    return f"{MARKSHEET_DIR}/{result.roll_number}/{marksheet_hash(result, svg)}.{fmt}"
+
+
+def marksheet_context(result):
+    scheme = get_subjects_data_by_roll(result.roll_number)
+    graded = result_grading(result, scheme)
+    marks_data = result.marks_data or {}
+    rows = []
+    for i, subject in enumerate(scheme["subjects"]):
+        marks = marks_data.get(subject["code"]) or {}
+        theory, internal = marks.get("theory"), marks.get("internal")
+        grade_point = graded["grade_points"].get(subject["code"])
+        rows.append({
+            "code": subject["code"],
+            "name": subject["name"],
+            "credit": subject["credit"],
+            "theory": theory,
+            "internal": internal,
+            "total": theory + internal if theory is not None and internal is not None else None,
+            "grade_point": grade_point,
+            "credit_points": grade_point * subject["credit"] if grade_point is not None and subject["credit"] else None,
+            "y": _ROWS_TOP + i * _ROW_HEIGHT,
+        })
+    table_height = 40 + len(rows) * _ROW_HEIGHT + 16
+    summary_y = 234 + table_height + 24
+    return {
+        "result": result,
+        "scheme": scheme,
+        "rows": rows,
+        "sgpa": graded["sgpa"],
+        "total_marks": graded["total_marks"],
+        "width": MARKSHEET_WIDTH,
+        "table_height": table_height,
+        "summary_y": summary_y,
+        "height": summary_y + 56 + 70,
+    }
+
+
+def render_marksheet_svg(result):
+    return marksheet_template().render(marksheet_context(result))
+
+
+def rasterize_marksheet(svg):
+    """
+    SVG string to (PNG bytes, PDF bytes). Module-level so it can run in a
+    process pool.
+    """
+    png = cairosvg.svg2png(bytestring=svg.encode(), scale=MARKSHEET_SCALE)
+    image = ImageReader(io.BytesIO(png))
+    width, height = image.getSize()
+    # 1 SVG unit = 1 CSS px = 0.75 pt
+    page_size = (width / MARKSHEET_SCALE * 0.75, height / MARKSHEET_SCALE * 0.75)
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=page_size)
+    pdf.setTitle("Marksheet - GyanAangan")
+    pdf.drawImage(image, 0, 0, *page_size)
+    pdf.showPage()
+    pdf.save()
+    return png, buffer.getvalue()
+
+
+def _cache_key(name):
+    return f"marksheet:{name}"
+
+
+def marksheet_exists(result, svg=None):
+    """True when both files of the result's current marksheet are stored"""
+    names = [marksheet_name(result, fmt, svg) for fmt in MARKSHEET_FORMATS]
+    # Remember stored marksheets so a hit costs no storage round trip
+    if all(cache.get(_cache_key(name)) for name in names):
+        return True
+    storage = marksheet_storage()
+    if all(storage.exists(name) for name in names):
+        for name in names:
+            cache.set(_cache_key(name), name, None)
+        return True
+    return False
+
+
+def store_marksheet(result, png, pdf, svg=None):
+    """Store both files under the result's current names and delete older renders"""
+    storage = marksheet_storage()
+    directory = f"{MARKSHEET_DIR}/{result.roll_number}"
+    names = []
+    for fmt, content in zip(MARKSHEET_FORMATS, (png, pdf)):
+        name = marksheet_name(result, fmt, svg)
+        if not storage.exists(name):
+            # Two concurrent first renders both save; the loser's copy gets a
+            # suffixed name and is removed with the other stale files below
+            storage.save(name, ContentFile(content))
+        cache.set(_cache_key(name), name, None)
+        names.append(name)
+    _, files = storage.listdir(directory)
+    for filename in files:
+        if f"{directory}/{filename}" not in names:
+            storage.delete(f"{directory}/{filename}")
+
+
+def get_marksheet(result, fmt):
+    """
+    Storage name of the result's marksheet in the given format, rendering
+    and storing it on first use.
+    """
+    svg = render_marksheet_svg(result)
+    if not marksheet_exists(result, svg):
+        store_marksheet(result, *rasterize_marksheet(svg), svg=svg)
+    return marksheet_name(result, fmt, svg)
+
+
+def marksheet_url(result, fmt):
+    return marksheet_storage().url(get_marksheet(result, fmt))
+
+
+def write_marksheets(results, workers=None):
+    """
+    Render the marksheets of many results that don't have a current one yet,
+    rasterizing in a process pool. (Bump MARKSHEET_VERSION to re-render all.)
+
+    Args:
+        results: Iterable of StudentResult
+        workers: Process pool size (default: CPU count)
+
+    Returns:
+        tuple: (written, skipped)
+    """
+    rendered = [(result, render_marksheet_svg(result)) for result in results]
+    stale = [(result, svg) for result, svg in rendered if not marksheet_exists(result, svg)]
+    skipped = len(rendered) - len(stale)
+    if not stale:
+        return 0, skipped
+
+    svgs = [svg for _, svg in stale]
+    if len(stale) == 1 or workers == 1:
+        files = map(rasterize_marksheet, svgs)
+        for (result, svg), (png, pdf) in zip(stale, files):
+            store_marksheet(result, png, pdf, svg=svg)
+    else:
+        # Forked workers must not inherit open DB connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (result, svg), (png, pdf) in zip(stale, pool.map(rasterize_marksheet, svgs, chunksize=8)):
+                store_marksheet(result, png, pdf, svg=svg)
+    return len(stale), skipped
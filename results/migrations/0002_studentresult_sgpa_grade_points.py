@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentresult',
+            name='grade_points',
+            field=models.JSONField(blank=True, default=dict, help_text='Grade point per subject code'),
+        ),
+        migrations.AddField(
+            model_name='studentresult',
+            name='sgpa',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
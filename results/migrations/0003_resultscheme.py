@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-19 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0002_studentresult_sgpa_grade_points'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultScheme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(max_length=10)),
+                ('branch', models.CharField(max_length=20)),
+                ('college', models.CharField(default='SCRIET', max_length=100)),
+                ('roll_start', models.BigIntegerField(blank=True, help_text='First roll number (inclusive)', null=True)),
+                ('roll_end', models.BigIntegerField(blank=True, help_text='Last roll number (inclusive)', null=True)),
+                ('is_default', models.BooleanField(default=False, help_text='Used for roll numbers no range matches')),
+                ('subjects', models.JSONField(help_text='[{"code": "BT-612", "name": "...", "credit": 4, "max_marks": 100}, ...]')),
+                ('grading_rule', models.CharField(choices=[('percentage', 'Grade point from percentage of max marks'), ('marks', 'Grade point from raw total marks')], default='percentage', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Result Scheme',
+                'verbose_name_plural': 'Result Schemes',
+                'ordering': ['roll_start'],
+            },
+        ),
+    ]
@@ -0,0 +1,170 @@
+from django.db import migrations
+
+# Roll number ranges and subjects previously hard-coded in results.views,
+# StudentResult and the import_results command
+SCHEMES = [
+    {
+        'semester': '8th',
+        'branch': 'IT',
+        'college': 'SCRIET',
+        'roll_start': 100210500,
+        'roll_end': 100210600,
+        'is_default': False,
+        'subjects': [
+            {'code': 'BT-801', 'name': 'Rural Development: Administration and Planning', 'credit': 3, 'max_marks': 150},
+            {'code': 'BT-816', 'name': 'Cloud Computing', 'credit': 3, 'max_marks': 150},
+            {'code': 'BT-817', 'name': 'Data Warehousing & Data Mining', 'credit': 3, 'max_marks': 150},
+            {'code': 'BT-866', 'name': 'Project', 'credit': 9, 'max_marks': 400},
+        ],
+    },
+    {
+        'semester': '8th',
+        'branch': 'CS',
+        'college': 'SCRIET',
+        'roll_start': 100210100,
+        'roll_end': 100210200,
+        'is_default': False,
+        'subjects': [
+            {'code': 'BT-801', 'name': 'Rural Development: Administration and Planning', 'credit': 3, 'max_marks': 150},
+            {'code': 'BT-811', 'name': 'Natural Language Processing', 'credit': 3, 'max_marks': 150},
+            {'code': 'BT-812', 'name': 'Big Data', 'credit': 3, 'max_marks': 150},
+            {'code': 'BT-861', 'name': 'Project', 'credit': 9, 'max_marks': 400},
+        ],
+    },
+    {
+        'semester': '6th',
+        'branch': 'IT',
+        'college': 'SCRIET Meerut',
+        'roll_start': 100220500,
+        'roll_end': 100220600,
+        'is_default': False,
+        'subjects': [
+            {'code': 'BT-609', 'name': 'Essence of Indian Traditional Knowledge', 'credit': 0, 'max_marks': 100},
+            {'code': 'BT-612', 'name': 'Software Engineering', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-613', 'name': 'Computer Networks', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-617', 'name': 'Data Analytics', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-615', 'name': 'Software Project Management', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-618', 'name': 'Augmented & Virtual Reality', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-662', 'name': 'Software Engineering Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-663', 'name': 'Computer Networks Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-667', 'name': 'Data Analytics Lab', 'credit': 1, 'max_marks': 100},
+        ],
+    },
+    {
+        'semester': '4th',
+        'branch': 'IT',
+        'college': 'SCRIET',
+        'roll_start': 100230500,
+        'roll_end': 100230600,
+        'is_default': False,
+        'subjects': [
+            {'code': 'BT-405', 'name': 'Mathematics - IV', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-406', 'name': 'Operating Systems', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-407', 'name': 'Theory of Automata and Formal Languages', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-408', 'name': 'Object Oriented Programming with Java', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-410', 'name': 'Python Programming', 'credit': 2, 'max_marks': 100},
+            {'code': 'BT-414', 'name': 'Universal Human Values', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-454', 'name': 'Sports and Yoga - II', 'credit': 0, 'max_marks': 100},
+            {'code': 'BT-456', 'name': 'Operating Systems Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-458', 'name': 'Object Oriented Programming with Java Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-459', 'name': 'Cyber Security Workshop', 'credit': 1, 'max_marks': 100},
+        ],
+    },
+    {
+        'semester': '4th',
+        'branch': 'CS',
+        'college': 'SCRIET',
+        'roll_start': 100230100,
+        'roll_end': 100230200,
+        'is_default': False,
+        'subjects': [
+            {'code': 'BT-405', 'name': 'Mathematics - IV', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-406', 'name': 'Operating Systems', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-407', 'name': 'Theory of Automata and Formal Languages', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-408', 'name': 'Object Oriented Programming with Java', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-410', 'name': 'Python Programming', 'credit': 2, 'max_marks': 100},
+            {'code': 'BT-414', 'name': 'Universal Human Values', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-454', 'name': 'Sports and Yoga - II', 'credit': 0, 'max_marks': 100},
+            {'code': 'BT-456', 'name': 'Operating Systems Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-458', 'name': 'Object Oriented Programming with Java Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-459', 'name': 'Cyber Security Workshop', 'credit': 1, 'max_marks': 100},
+        ],
+    },
+    {
+        'semester': '2nd',
+        'branch': 'IT',
+        'college': 'SCRIET',
+        'roll_start': 100240500,
+        'roll_end': 100240600,
+        'is_default': False,
+        'subjects': [
+            {'code': 'BT-201', 'name': 'Fundamentals of Electrical Engineering', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-203', 'name': 'Engineering Chemistry', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-205', 'name': 'Engineering Mathematics - II', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-206', 'name': 'Fundamentals of Mechanical Engineering', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-209', 'name': 'Soft Skill', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-251', 'name': 'Basic Electrical Engineering Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-253', 'name': 'Engineering Chemistry Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-255', 'name': 'Workshop Practices Lab', 'credit': 2, 'max_marks': 100},
+            {'code': 'BT-259', 'name': 'English Language Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-260', 'name': 'Sports and Yoga', 'credit': 0, 'max_marks': 100},
+        ],
+    },
+    {
+        'semester': '2nd',
+        'branch': 'CS',
+        'college': 'SCRIET',
+        'roll_start': 100240100,
+        'roll_end': 100240200,
+        'is_default': False,
+        'subjects': [
+            {'code': 'BT-201', 'name': 'Fundamentals of Electrical Engineering', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-203', 'name': 'Engineering Chemistry', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-205', 'name': 'Engineering Mathematics - II', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-206', 'name': 'Fundamentals of Mechanical Engineering', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-209', 'name': 'Soft Skill', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-251', 'name': 'Basic Electrical Engineering Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-253', 'name': 'Engineering Chemistry Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-255', 'name': 'Workshop Practices Lab', 'credit': 2, 'max_marks': 100},
+            {'code': 'BT-259', 'name': 'English Language Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-260', 'name': 'Sports and Yoga', 'credit': 0, 'max_marks': 100},
+        ],
+    },
+    {
+        'semester': '6th',
+        'branch': 'CSE',
+        'college': 'SCRIET',
+        'roll_start': None,
+        'roll_end': None,
+        'is_default': True,
+        'subjects': [
+            {'code': 'BT-609', 'name': 'Non-Credit Subject', 'credit': 0, 'max_marks': 100},
+            {'code': 'BT-612', 'name': 'Software Engineering', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-613', 'name': 'Computer Networks', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-614', 'name': 'Compiler Design', 'credit': 4, 'max_marks': 100},
+            {'code': 'BT-615', 'name': 'Software Project Management', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-616', 'name': 'Big Data', 'credit': 3, 'max_marks': 100},
+            {'code': 'BT-662', 'name': 'Software Engineering Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-663', 'name': 'Computer Networks Lab', 'credit': 1, 'max_marks': 100},
+            {'code': 'BT-664', 'name': 'Compiler Design Lab', 'credit': 1, 'max_marks': 100},
+        ],
+    },
+]
+
+
+def seed_schemes(apps, schema_editor):
+    ResultScheme = apps.get_model('results', 'ResultScheme')
+    if ResultScheme.objects.exists():
+        return
+    ResultScheme.objects.bulk_create(ResultScheme(**scheme) for scheme in SCHEMES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0003_resultscheme'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_schemes, migrations.RunPython.noop),
+    ]
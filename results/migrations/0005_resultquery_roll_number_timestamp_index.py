@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 01:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0004_seed_result_schemes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resultquery',
+            index=models.Index(fields=['roll_number', 'timestamp'], name='results_res_roll_nu_a08328_idx'),
+        ),
+    ]
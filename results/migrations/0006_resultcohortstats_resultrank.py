@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-19 01:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0005_resultquery_roll_number_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultCohortStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_count', models.PositiveIntegerField(default=0)),
+                ('ranked_count', models.PositiveIntegerField(default=0, help_text='Results with an SGPA')),
+                ('sgpa_mean', models.FloatField(blank=True, null=True)),
+                ('sgpa_median', models.FloatField(blank=True, null=True)),
+                ('sgpa_stddev', models.FloatField(blank=True, null=True)),
+                ('sgpa_histogram', models.JSONField(blank=True, default=dict, help_text='{"bins": [edges], "counts": [...]}')),
+                ('subjects', models.JSONField(blank=True, default=dict, help_text='Per subject code: name, count, mean/median/stddev of total marks and a percentage histogram')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('scheme', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='results.resultscheme')),
+            ],
+            options={
+                'verbose_name': 'Result Cohort Statistics',
+                'verbose_name_plural': 'Result Cohort Statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResultRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(help_text='1 is the highest SGPA; equal SGPAs share a rank')),
+                ('percentile', models.FloatField(help_text='Share of the cohort with the same or a lower SGPA')),
+                ('cohort_size', models.PositiveIntegerField()),
+                ('result', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rank', to='results.studentresult')),
+                ('scheme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranks', to='results.resultscheme')),
+            ],
+            options={
+                'ordering': ['scheme', 'rank'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0006_resultcohortstats_resultrank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentresult',
+            name='marksheet_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
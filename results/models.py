@@ -1,4 +1,7 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
@@ -21,136 +24,82 @@ class ResultQuery(models.Model):
         ordering = ['-timestamp']
         verbose_name = 'Result Query'
         verbose_name_plural = 'Result Queries'
+        indexes = [
+            models.Index(fields=['roll_number', 'timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.roll_number} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 
+class ResultScheme(models.Model):
+    """
+    Subjects and grading of one exam (semester + branch) and the roll numbers
+    it applies to. Looked up through results.schemes, not queried per request.
+    """
+    
+    GRADING_RULES = [
+        ('percentage', 'Grade point from percentage of max marks'),
+        ('marks', 'Grade point from raw total marks'),
+    ]
+    
+    semester = models.CharField(max_length=10)
+    branch = models.CharField(max_length=20)
+    college = models.CharField(max_length=100, default='SCRIET')
+    roll_start = models.BigIntegerField(null=True, blank=True, help_text="First roll number (inclusive)")
+    roll_end = models.BigIntegerField(null=True, blank=True, help_text="Last roll number (inclusive)")
+    is_default = models.BooleanField(default=False, help_text="Used for roll numbers no range matches")
+    subjects = models.JSONField(help_text='[{"code": "BT-612", "name": "...", "credit": 4, "max_marks": 100}, ...]')
+    grading_rule = models.CharField(max_length=20, choices=GRADING_RULES, default='percentage')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['roll_start']
+        verbose_name = 'Result Scheme'
+        verbose_name_plural = 'Result Schemes'
+    
+    def __str__(self):
+        if self.is_default:
+            return f"{self.semester} {self.branch} (default)"
+        return f"{self.semester} {self.branch} ({self.roll_start}-{self.roll_end})"
+    
+    def clean(self):
+        if (self.roll_start is None) != (self.roll_end is None):
+            raise ValidationError("Set both ends of the roll number range, or neither.")
+        if self.roll_start is None:
+            if not self.is_default:
+                raise ValidationError("A scheme without a roll number range must be the default.")
+        elif self.roll_start > self.roll_end:
+            raise ValidationError("The roll number range ends before it starts.")
+        else:
+            overlapping = ResultScheme.objects.filter(
+                roll_start__lte=self.roll_end, roll_end__gte=self.roll_start
+            ).exclude(pk=self.pk).first()
+            if overlapping:
+                raise ValidationError(f"The roll number range overlaps {overlapping}.")
+        if self.is_default and ResultScheme.objects.filter(is_default=True).exclude(pk=self.pk).exists():
+            raise ValidationError("Another scheme is already the default.")
+        for subject in self.subjects or []:
+            if not isinstance(subject, dict) or not {'code', 'name', 'credit'} <= subject.keys():
+                raise ValidationError("Each subject needs a code, name and credit.")
+
+
+@receiver([post_save, post_delete], sender=ResultScheme)
+def scheme_changed(sender, **kwargs):
+    from .schemes import invalidate_scheme_index
+    invalidate_scheme_index()
+
+
 class StudentResult(models.Model):
     """Model to store student results"""
     
-    # Updated subject list with BT-609 as first subject (0 credit)
-    SUBJECTS_DATA = {
-        "semester": "6th",
-        "branch": "CSE", 
-        "college": "SCRIET",
-        "subjects": [
-            {
-                "code": "BT-609",
-                "name": "Non-Credit Subject",
-                "credit": 0
-            },
-            {
-                "code": "BT-612", 
-                "name": "Software Engineering",
-                "credit": 4
-            },
-            {
-                "code": "BT-613",
-                "name": "Computer Networks", 
-                "credit": 4
-            },
-            {
-                "code": "BT-614",
-                "name": "Compiler Design",
-                "credit": 4
-            },
-            {
-                "code": "BT-615",
-                "name": "Software Project Management",
-                "credit": 3
-            },
-            {
-                "code": "BT-616",
-                "name": "Big Data",
-                "credit": 3
-            },
-            {
-                "code": "BT-662",
-                "name": "Software Engineering Lab",
-                "credit": 1
-            },
-            {
-                "code": "BT-663", 
-                "name": "Computer Networks Lab",
-                "credit": 1
-            },
-            {
-                "code": "BT-664",
-                "name": "Compiler Design Lab", 
-                "credit": 1
-            }
-        ]
-    }
-    
-    # IT Branch subject data
-    IT_SUBJECTS_DATA = {
-        "semester": "6th",
-        "branch": "IT", 
-        "college": "SCRIET Meerut",
-        "subjects": [
-            {
-                "code": "BT-609",
-                "name": "Essence of Indian Traditional Knowledge",
-                "credit": 0
-            },
-            {
-                "code": "BT-612", 
-                "name": "Software Engineering",
-                "credit": 4
-            },
-            {
-                "code": "BT-613",
-                "name": "Computer Networks", 
-                "credit": 4
-            },
-            {
-                "code": "BT-617",
-                "name": "Data Analytics",
-                "credit": 4
-            },
-            {
-                "code": "BT-615",
-                "name": "Software Project Management",
-                "credit": 3
-            },
-            {
-                "code": "BT-618",
-                "name": "Augmented & Virtual Reality",
-                "credit": 3
-            },
-            {
-                "code": "BT-662",
-                "name": "Software Engineering Lab",
-                "credit": 1
-            },
-            {
-                "code": "BT-663", 
-                "name": "Computer Networks Lab",
-                "credit": 1
-            },
-            {
-                "code": "BT-667",
-                "name": "Data Analytics Lab", 
-                "credit": 1
-            }
-        ]
-    }
-    
     @classmethod
     def get_subjects_data(cls, roll_number):
         """Get appropriate subject data based on roll number"""
-        try:
-            roll_int = int(roll_number)
-            # IT Branch (100220500-600)
-            if 100220500 <= roll_int <= 100220600:
-                return cls.IT_SUBJECTS_DATA
-            # CSE Branch (default)
-            elif 100220100 <= roll_int <= 100220200:
-                return cls.SUBJECTS_DATA
-        except (ValueError, TypeError):
-            # Default to CSE if roll number parsing fails
-            return cls.SUBJECTS_DATA
+        from .schemes import scheme_for_roll
+        return scheme_for_roll(roll_number)
     
     roll_number = models.CharField(max_length=20, unique=True, db_index=True)
     name = models.CharField(max_length=100)
@@ -159,9 +108,14 @@ class StudentResult(models.Model):
     # Subject marks - storing as JSON field for flexibility
     marks_data = models.JSONField(help_text="Stores theory, internal, and viva marks for all subjects")
     
-    # Calculated fields
+    # Calculated fields (results.grading), refreshed on save and by `manage.py recompute_results`
     total_marks = models.IntegerField(null=True, blank=True)
     percentage = models.FloatField(null=True, blank=True)
+    sgpa = models.FloatField(null=True, blank=True)
+    grade_points = models.JSONField(default=dict, blank=True, help_text="Grade point per subject code")
+    
+    # Set by bulk uploads, cleared by `manage.py generate_marksheets --pending` (run from cron)
+    marksheet_pending = models.BooleanField(default=False, db_index=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -174,99 +128,71 @@ class StudentResult(models.Model):
     def __str__(self):
         return f"{self.roll_number} - {self.name}"
     
-    @classmethod
-    def get_subject_by_index(cls, index):
-        """Get subject info by index"""
-        try:
-            return cls.SUBJECTS_DATA['subjects'][index]
-        except IndexError:
-            return None
-    
-    def parse_marks_from_raw_data(self, raw_marks_list):
-        """
-        Parse marks from the raw data format:
-        [['Marks obtained (In Theory)', '', '', '', '', '', '', '', '', '57', '47', '52', '31', '51', '56', '44', '39', '42', ...],
-         ['Marks Obtained (In Internal/ Practical)', '', '', '', '', '', '', '', '', '22', '28', '17', '26', '27', '27', '45', '41', '43', ...],
-         ['Marks Obtained (Viva Voce)', '', '', '', '', '', '', '', '', '+++', '+', '+', '', '', '', '', '', '', ...]]
-        """
-        if not raw_marks_list or len(raw_marks_list) < 2:
-            return {}
-        
-        theory_marks = raw_marks_list[0][9:18]  # Extract marks for 9 subjects
-        internal_marks = raw_marks_list[1][9:18]  # Extract marks for 9 subjects
-        viva_marks = raw_marks_list[2][9:18] if len(raw_marks_list) > 2 else [''] * 9
-        
-        parsed_data = {}
-        subjects = self.SUBJECTS_DATA['subjects']
-        
-        for i, subject in enumerate(subjects):
-            subject_code = subject['code']
-            credit = subject['credit']
-            
-            # Parse theory marks (convert empty strings to 0)
-            theory = 0
-            if i < len(theory_marks) and theory_marks[i] and theory_marks[i].strip():
-                try:
-                    theory = int(theory_marks[i].strip())
-                except ValueError:
-                    theory = 0
-            
-            # Parse internal marks
-            internal = 0
-            if i < len(internal_marks) and internal_marks[i] and internal_marks[i].strip():
-                try:
-                    internal = int(internal_marks[i].strip())
-                except ValueError:
-                    internal = 0
-            
-            # Parse viva marks (usually +++ or + for pass)
-            viva = viva_marks[i] if i < len(viva_marks) else ''
-            
-            # Calculate total for subject
-            if credit == 0:  # Non-credit subject
-                total = theory + internal
-            elif credit == 1:  # Lab subjects (50-50 distribution)
-                total = theory + internal
-            else:  # Theory subjects (30-70 distribution)
-                total = theory + internal
-            
-            parsed_data[subject_code] = {
-                'theory': theory,
-                'internal': internal,
-                'viva': viva,
-                'total': total,
-                'credit': credit
-            }
-        
-        return parsed_data
-    
     def calculate_totals(self):
-        """Calculate total marks and percentage"""
-        if not self.marks_data:
-            return
-        
-        total_marks = 0
-        total_credits = 0
-        
-        for subject_code, marks in self.marks_data.items():
-            total_marks += marks.get('total', 0)
-            total_credits += marks.get('credit', 0)
-        
-        self.total_marks = total_marks
-        if total_credits > 0:
-            # Calculate percentage based on total possible marks
-            # Assuming max marks per credit is 100 for simplicity
-            max_possible = sum([
-                100 if s['credit'] > 0 else 100 
-                for s in self.SUBJECTS_DATA['subjects']
-            ])
-            self.percentage = (total_marks / max_possible) * 100 if max_possible > 0 else 0
+        """Grade the result: SGPA, total marks, percentage and grade point per subject"""
+        from .grading import grade_result
+
+        scheme = self.get_subjects_data(self.roll_number)
+        graded = grade_result(self.marks_data, scheme['subjects'], scheme['grading_rule'])
+        self.sgpa = graded['sgpa']
+        self.total_marks = graded['total_marks']
+        self.percentage = graded['percentage']
+        self.grade_points = graded['grade_points']
     
     def save(self, *args, **kwargs):
         self.calculate_totals()
         super().save(*args, **kwargs)
 
 
+@receiver([post_save, post_delete], sender=StudentResult)
+def student_result_changed(sender, instance, **kwargs):
+    from .result_cache import forget_result
+    forget_result(instance.roll_number)
+
+
+class ResultCohortStats(models.Model):
+    """
+    Statistics of every result graded under one scheme, precomputed by
+    results.stats.refresh_result_stats after imports.
+    """
+    
+    scheme = models.OneToOneField(ResultScheme, on_delete=models.CASCADE, related_name='stats')
+    student_count = models.PositiveIntegerField(default=0)
+    ranked_count = models.PositiveIntegerField(default=0, help_text="Results with an SGPA")
+    sgpa_mean = models.FloatField(null=True, blank=True)
+    sgpa_median = models.FloatField(null=True, blank=True)
+    sgpa_stddev = models.FloatField(null=True, blank=True)
+    sgpa_histogram = models.JSONField(default=dict, blank=True, help_text='{"bins": [edges], "counts": [...]}')
+    subjects = models.JSONField(
+        default=dict, blank=True,
+        help_text="Per subject code: name, count, mean/median/stddev of total marks and a percentage histogram",
+    )
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Result Cohort Statistics'
+        verbose_name_plural = 'Result Cohort Statistics'
+    
+    def __str__(self):
+        return f"{self.scheme} - {self.student_count} students"
+
+
+class ResultRank(models.Model):
+    """A result's SGPA rank within its scheme's cohort (results.stats)"""
+    
+    result = models.OneToOneField(StudentResult, on_delete=models.CASCADE, related_name='rank')
+    scheme = models.ForeignKey(ResultScheme, on_delete=models.CASCADE, related_name='ranks')
+    rank = models.PositiveIntegerField(help_text="1 is the highest SGPA; equal SGPAs share a rank")
+    percentile = models.FloatField(help_text="Share of the cohort with the same or a lower SGPA")
+    cohort_size = models.PositiveIntegerField()
+    
+    class Meta:
+        ordering = ['scheme', 'rank']
+    
+    def __str__(self):
+        return f"{self.result_id}: {self.rank}/{self.cohort_size}"
+
+
 class ManualResultEntry(models.Model):
     """Model for users to manually enter their marks"""
     
@@ -0,0 +1,100 @@
+"""
+Buffered ResultQuery logging.
+
+Lookups only append an unsaved ResultQuery to an in-memory queue; a
+background thread per process bulk-inserts the queue every
+RESULT_QUERY_LOG_FLUSH_INTERVAL seconds, or as soon as
+RESULT_QUERY_LOG_FLUSH_EVERY rows are waiting. Whatever is still queued is
+flushed at interpreter exit. Query logs are analytics: if the database
+rejects a batch it is logged and dropped rather than retried.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLogBuffer:
+    """
+    Thread-safe queue of unsaved ResultQuery rows, flushed with bulk_create.
+    At most max_pending rows are held; beyond that the oldest are dropped.
+    """
+
+    def __init__(self, flush_every=100, flush_interval=5.0, max_pending=10000):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, query):
+        with self._lock:
+            self._pending.append(query)
+            full = len(self._pending) >= self.flush_every
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='result-query-log', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Insert everything queued so far. Returns the number of rows written."""
+        from .models import ResultQuery
+
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+        if not batch:
+            return 0
+        try:
+            ResultQuery.objects.bulk_create(batch, batch_size=self.flush_every)
+        except Exception:
+            logger.exception('Dropped %d result query log row(s)', len(batch))
+            return 0
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            # Don't keep an idle connection open for this thread between flushes
+            connections.close_all()
+
+
+_buffer = None
+_buffer_pid = None
+
+
+def get_query_log():
+    """
+    Returns this process's buffer. Re-created after a fork, since the
+    flushing thread doesn't survive it.
+    """
+    global _buffer, _buffer_pid
+    if _buffer is None or _buffer_pid != os.getpid():
+        _buffer = QueryLogBuffer(
+            flush_every=getattr(settings, 'RESULT_QUERY_LOG_FLUSH_EVERY', 100),
+            flush_interval=getattr(settings, 'RESULT_QUERY_LOG_FLUSH_INTERVAL', 5),
+        )
+        _buffer_pid = os.getpid()
+    return _buffer
+
+
+def log_query(**fields):
+    """Queue a ResultQuery row (fields as for the model; timestamp defaults to now)"""
+    from .models import ResultQuery
+    get_query_log().add(ResultQuery(**fields))
+
+
+@atexit.register
+def _flush_at_exit():
+    if _buffer is not None and _buffer_pid == os.getpid():
+        _buffer.flush()
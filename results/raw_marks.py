@@ -0,0 +1,57 @@
+"""
+Marks cells of result sheets -> StudentResult.marks_data.
+
+A cell holds the theory, internal and viva rows of one student, each
+starting with a label; the marks are read against the subjects of the
+roll number's ResultScheme (results.schemes), one column per subject.
+Shared by `manage.py import_results` and the bulk CSV upload.
+"""
+import ast
+
+
+def parse_mark(value):
+    """Integer mark from a sheet cell, None when blank or not a number"""
+    value = str(value).strip()
+    if not value or value == 'nan':
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def parse_marks_cell(cell):
+    """
+    Theory, internal and viva rows of a marks cell such as
+    "[['Marks obtained (In Theory)', '', '57', ...], [...], [...]]", with the
+    row labels stripped.
+    """
+    marks_array = ast.literal_eval(cell) if isinstance(cell, str) else cell
+    if not isinstance(marks_array, (list, tuple)):
+        raise ValueError("invalid marks data format")
+    rows = []
+    for row in list(marks_array[:3]) + [[]] * (3 - len(marks_array[:3])):
+        rows.append(list(row[1:]) if len(row) > 1 else list(row))
+    return rows
+
+
+def build_marks_data(marks_rows, subjects):
+    """marks_data of one student from parse_marks_cell rows and the scheme's subjects"""
+    theory_marks, internal_marks, viva_marks = marks_rows
+    # Marks start at the first non-empty theory cell, one column per subject
+    data_start_index = next((idx for idx, val in enumerate(theory_marks) if val and val != ''), 0)
+    marks_data = {}
+    for i, subject in enumerate(subjects):
+        marks_idx = data_start_index + i
+        theory = parse_mark(theory_marks[marks_idx]) if marks_idx < len(theory_marks) else None
+        internal = parse_mark(internal_marks[marks_idx]) if marks_idx < len(internal_marks) else None
+        marks_data[subject['code']] = {
+            'theory': theory,
+            'internal': internal,
+            'viva': str(viva_marks[marks_idx]).strip() if marks_idx < len(viva_marks) else '',
+            'total': (theory or 0) + (internal or 0),
+            'credit': subject['credit'],
+            'name': subject['name'],
+            'max_marks': subject['max_marks'],
+        }
+    return marks_data
@@ -0,0 +1,127 @@
+"""
+Read-through cache of rendered results, keyed by roll number.
+
+A lookup returns the result's display payload (marks, SGPA, grade points,
+the scheme's subjects) from the cache, reading and grading the row only on
+a miss. With a shared cache (REDIS_URL) unknown roll numbers are cached too,
+for a shorter time, so enumeration traffic doesn't reach the database
+either.
+
+Keys carry the scheme version (results.schemes) and a results version that
+bulk writes bump, which drops every entry at once, negative ones included;
+saving or deleting a single StudentResult drops just its entry. (Keys can't
+carry the row's updated_at: a lookup only knows the roll number until it
+has read the row.) Imports then warm a shared cache in bulk; a per-process
+(LocMem) cache is filled on demand only, since warming it would just fill
+the importing command's own memory. With a per-process cache other
+processes only see changes once their entries expire, hence the short
+default timeout.
+"""
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from .grading import get_subjects_data_by_roll, result_grading
+from .schemes import SCHEME_VERSION_KEY
+
+RESULTS_VERSION_KEY = "results:result_version"
+
+# Cached for roll numbers without a result
+_MISSING = "missing"
+
+
+def _key_prefix():
+    versions = cache.get_many([SCHEME_VERSION_KEY, RESULTS_VERSION_KEY])
+    return f"results:result:{versions.get(SCHEME_VERSION_KEY, 0)}:{versions.get(RESULTS_VERSION_KEY, 0)}:"
+
+
+def result_payload(result):
+    """Everything the result pages show of a StudentResult, graded"""
+    scheme = get_subjects_data_by_roll(result.roll_number)
+    graded = result_grading(result, scheme)
+    return {
+        "id": result.pk,
+        "roll_number": result.roll_number,
+        "name": result.name,
+        "father_name": result.father_name,
+        "marks_data": result.marks_data or {},
+        "updated_at": result.updated_at,
+        "semester": scheme["semester"],
+        "branch": scheme["branch"],
+        "college": scheme["college"],
+        "subjects": scheme["subjects"],
+        "sgpa": graded["sgpa"],
+        "total_marks": graded["total_marks"],
+        "percentage": graded["percentage"],
+        "grade_points": graded["grade_points"],
+    }
+
+
+def get_result(roll_number):
+    """
+    Cached payload (see result_payload) of a roll number's result.
+
+    Returns:
+        dict or None: None when there's no result for the roll number
+    """
+    from .models import StudentResult
+
+    key = _key_prefix() + roll_number
+    payload = cache.get(key)
+    if payload == _MISSING:
+        return None
+    if payload is not None:
+        return payload
+
+    result = StudentResult.objects.filter(roll_number=roll_number).first()
+    if result is None:
+        negative_timeout = getattr(settings, "RESULT_NEGATIVE_CACHE_SECONDS", 0)
+        if negative_timeout > 0:
+            cache.set(key, _MISSING, negative_timeout)
+        return None
+    payload = result_payload(result)
+    cache.set(key, payload, getattr(settings, "RESULT_CACHE_SECONDS", 300))
+    return payload
+
+
+def warm_result_cache(queryset=None, batch_size=1000):
+    """
+    Cache the payloads of many results (default: all) with one set_many per
+    batch. Skipped with a per-process (LocMem) cache, which no other process
+    reads.
+
+    Returns:
+        int or None: Number of results cached, None when skipped
+    """
+    from .models import StudentResult
+
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        return None
+    queryset = StudentResult.objects.all() if queryset is None else queryset
+    prefix = _key_prefix()
+    timeout = getattr(settings, "RESULT_CACHE_SECONDS", 300)
+    warmed = 0
+    batch = {}
+    for result in queryset.iterator(chunk_size=batch_size):
+        batch[prefix + result.roll_number] = result_payload(result)
+        if len(batch) >= batch_size:
+            cache.set_many(batch, timeout)
+            warmed += len(batch)
+            batch = {}
+    if batch:
+        cache.set_many(batch, timeout)
+        warmed += len(batch)
+    return warmed
+
+
+def forget_result(roll_number):
+    """Drop one roll number's entry (after the row was saved or deleted)"""
+    cache.delete(_key_prefix() + roll_number)
+
+
+def invalidate_result_cache():
+    """Drop every entry, e.g. after a bulk import that skipped save()"""
+    try:
+        cache.incr(RESULTS_VERSION_KEY)
+    except ValueError:
+        cache.set(RESULTS_VERSION_KEY, 1, timeout=None)
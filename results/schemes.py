@@ -0,0 +1,106 @@
+"""
+Roll number -> ResultScheme lookup.
+
+Schemes are loaded once into a sorted interval index and looked up with
+bisect, so a lookup is O(log n) and hands back the same (read-only) scheme
+dict every time instead of building subject lists per request. Saving or
+deleting a ResultScheme bumps a version in the cache; the index is also
+rebuilt every SCHEME_INDEX_TTL seconds so processes that don't share a
+cache pick changes up too.
+"""
+import time
+from bisect import bisect_right
+
+from django.core.cache import cache
+
+SCHEME_VERSION_KEY = "results:scheme_version"
+SCHEME_INDEX_TTL = 60
+EMPTY_SCHEME = {"semester": "", "branch": "", "college": "", "grading_rule": "percentage", "subjects": []}
+
+_index = None
+
+
+class SchemeIndex:
+    """Non-overlapping roll number ranges sorted by start, plus the default scheme"""
+
+    def __init__(self, schemes, version):
+        ranged = sorted((s for s in schemes if s["roll_start"] is not None), key=lambda s: s["roll_start"])
+        self.starts = [s["roll_start"] for s in ranged]
+        self.ends = [s["roll_end"] for s in ranged]
+        self.schemes = ranged
+        self.default = next((s for s in schemes if s["is_default"]), None)
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def lookup(self, roll_number):
+        try:
+            roll = int(roll_number)
+        except (TypeError, ValueError):
+            return self.default
+        i = bisect_right(self.starts, roll) - 1
+        if i >= 0 and roll <= self.ends[i]:
+            return self.schemes[i]
+        return self.default
+
+
+def _scheme_dict(scheme):
+    return {
+        "id": scheme.pk,
+        "semester": scheme.semester,
+        "branch": scheme.branch,
+        "college": scheme.college,
+        "roll_start": scheme.roll_start,
+        "roll_end": scheme.roll_end,
+        "is_default": scheme.is_default,
+        "grading_rule": scheme.grading_rule,
+        "subjects": [
+            {**subject, "max_marks": subject.get("max_marks", 100)} for subject in scheme.subjects
+        ],
+    }
+
+
+def scheme_index():
+    global _index
+    version = cache.get(SCHEME_VERSION_KEY, 0)
+    if (
+        _index is None
+        or _index.version != version
+        or time.monotonic() - _index.built_at > SCHEME_INDEX_TTL
+    ):
+        from .models import ResultScheme
+        _index = SchemeIndex([_scheme_dict(s) for s in ResultScheme.objects.all()], version)
+    return _index
+
+
+def invalidate_scheme_index():
+    global _index
+    _index = None
+    try:
+        cache.incr(SCHEME_VERSION_KEY)
+    except ValueError:
+        cache.set(SCHEME_VERSION_KEY, 1, timeout=None)
+
+
+def scheme_for_roll(roll_number):
+    """
+    The scheme of a roll number as a dict (semester, branch, college,
+    grading_rule, subjects, ...). Shared between callers: don't modify it.
+
+    Raises:
+        LookupError: No range matches and there is no default scheme
+    """
+    scheme = scheme_index().lookup(roll_number)
+    if scheme is None:
+        raise LookupError(f"No result scheme for roll number {roll_number}")
+    return scheme
+
+
+def scheme_or_default(roll_number=None):
+    """
+    Like scheme_for_roll (the default scheme without a roll number), but an
+    empty scheme instead of LookupError, for pages that only list subjects.
+    """
+    try:
+        return scheme_for_roll(roll_number)
+    except LookupError:
+        return EMPTY_SCHEME
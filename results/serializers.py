@@ -0,0 +1,95 @@
+import math
+
+from django.conf import settings
+from rest_framework import serializers
+
+GRADING_RULES = ('percentage', 'marks')
+# Upper bounds for one subject row; they keep totals (and SGPA) well inside float range
+MAX_MARKS = 1000
+MAX_CREDIT = 50
+
+
+def _number(row, key, path, default=None, maximum=MAX_MARKS):
+    value = row.get(key, default)
+    if value is None or isinstance(value, bool):
+        raise serializers.ValidationError({path: f"'{key}' must be a number."})
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise serializers.ValidationError({path: f"'{key}' must be a number."})
+    # float() also accepts "nan" and "inf"
+    if not math.isfinite(value):
+        raise serializers.ValidationError({path: f"'{key}' must be a finite number."})
+    if value < 0:
+        raise serializers.ValidationError({path: f"'{key}' can't be negative."})
+    if value > maximum:
+        raise serializers.ValidationError({path: f"'{key}' can't be more than {maximum}."})
+    return value
+
+
+class SGPACalculationSerializer(serializers.Serializer):
+    """
+    Body of /api/results/calculate/: the "subjects" of one student, or
+    "students" each with their own "subjects" (and optional roll_number,
+    name and grading_rule). A subject row is
+    {"name", "code"?, "credit", "max_marks"? (100), "marks"} or has
+    "theory" and "internal" instead of "marks".
+
+    validated_data["rows"] holds the subject rows as columns ready for
+    results.grading.grade_batch.
+    """
+    subjects = serializers.ListField(child=serializers.DictField(), required=False)
+    students = serializers.ListField(child=serializers.DictField(), required=False)
+    save = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if 'students' in data:
+            students = data['students']
+        elif 'subjects' in data:
+            students = [{'subjects': data['subjects']}]
+        else:
+            raise serializers.ValidationError("Provide 'subjects' or 'students'.")
+        if not students:
+            raise serializers.ValidationError({'students': "Provide at least one student."})
+
+        max_rows = getattr(settings, 'RESULT_CALCULATE_MAX_ROWS', 10000)
+        if sum(len(student.get('subjects') or ()) for student in students) > max_rows:
+            raise serializers.ValidationError(f"At most {max_rows} subject rows per request.")
+
+        rows = {'name': [], 'code': [], 'marks': [], 'max_marks': [], 'credit': [], 'owner': [], 'rule': []}
+        parsed = []
+        for i, student in enumerate(students):
+            subjects = student.get('subjects')
+            if not isinstance(subjects, list) or not subjects:
+                raise serializers.ValidationError({f'students[{i}].subjects': "Provide at least one subject."})
+            rule = student.get('grading_rule') or 'percentage'
+            if rule not in GRADING_RULES:
+                raise serializers.ValidationError({f'students[{i}].grading_rule': f"One of {', '.join(GRADING_RULES)}."})
+            for j, row in enumerate(subjects):
+                path = f'students[{i}].subjects[{j}]'
+                if not isinstance(row, dict):
+                    raise serializers.ValidationError({path: "Expected an object."})
+                if 'marks' in row:
+                    marks = _number(row, 'marks', path)
+                else:
+                    marks = _number(row, 'theory', path) + _number(row, 'internal', path)
+                max_marks = _number(row, 'max_marks', path, default=100)
+                if max_marks == 0:
+                    raise serializers.ValidationError({path: "'max_marks' must be more than 0."})
+                if marks > max_marks:
+                    raise serializers.ValidationError({path: f"Marks can't be more than max_marks ({max_marks:g})."})
+                rows['name'].append(str(row.get('name') or row.get('code') or f'Subject {j + 1}'))
+                rows['code'].append(str(row.get('code') or ''))
+                rows['marks'].append(marks)
+                rows['max_marks'].append(max_marks)
+                rows['credit'].append(_number(row, 'credit', path, maximum=MAX_CREDIT))
+                rows['owner'].append(i)
+                rows['rule'].append(rule)
+            parsed.append({
+                'roll_number': str(student.get('roll_number') or '')[:20],
+                'name': str(student.get('name') or '')[:100],
+                'grading_rule': rule,
+            })
+        data['students'] = parsed
+        data['rows'] = rows
+        return data
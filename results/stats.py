@@ -0,0 +1,190 @@
+"""
+Cohort statistics: results are grouped by their ResultScheme, and each
+cohort's SGPA and per-subject distributions plus every student's rank and
+percentile are computed with NumPy in one pass, then stored in
+ResultCohortStats / ResultRank. Showing a rank is then a single indexed
+row instead of sorting the cohort per view.
+
+Refreshed by `manage.py compute_result_stats` and after every import;
+bulk uploads leave it to `compute_result_stats --if-stale` from cron.
+Served (cached per stats version) by the results:stats endpoints.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .schemes import scheme_for_roll
+
+STATS_VERSION_KEY = "results:stats_version"
+
+SGPA_BINS = np.arange(0, 11)  # 0-1, 1-2, ... 9-10
+PERCENT_BINS = np.arange(0, 101, 10)
+
+
+def _summary(values):
+    """count, mean, median and stddev of a 1-D array, NaNs ignored"""
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return {"count": 0, "mean": None, "median": None, "stddev": None}
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 2),
+        "median": round(float(np.median(values)), 2),
+        "stddev": round(float(values.std()), 2),
+    }
+
+
+def _histogram(values, bins):
+    values = values[~np.isnan(values)]
+    counts, _ = np.histogram(np.clip(values, bins[0], bins[-1]), bins=bins)
+    return {"bins": bins.tolist(), "counts": counts.tolist()}
+
+
+def rank_sgpas(sgpas):
+    """
+    Competition ranks ("1224") and percentiles of an array of SGPAs, highest
+    first. Percentile is the share of the array at or below each SGPA.
+    """
+    ordered = np.sort(sgpas)
+    at_or_below = np.searchsorted(ordered, sgpas, side="right")
+    ranks = len(sgpas) - at_or_below + 1
+    percentiles = np.round(at_or_below * 100 / len(sgpas), 2)
+    return ranks, percentiles
+
+
+def cohort_stats(scheme, rows):
+    """
+    Statistics of one scheme's results.
+
+    Args:
+        scheme: Scheme dict from results.schemes
+        rows: [(pk, sgpa, marks_data), ...] of the results graded under it
+
+    Returns:
+        tuple: (stats dict with ResultCohortStats fields, [(pk, rank, percentile), ...])
+    """
+    subjects = scheme["subjects"]
+    # Subject totals (theory + internal) and max marks, NaN where a mark is missing
+    totals = np.full((len(rows), len(subjects)), np.nan)
+    for i, (_, _, marks_data) in enumerate(rows):
+        marks_data = marks_data or {}
+        for j, subject in enumerate(subjects):
+            marks = marks_data.get(subject["code"]) or {}
+            theory, internal = marks.get("theory"), marks.get("internal")
+            if isinstance(theory, (int, float)) and isinstance(internal, (int, float)):
+                totals[i, j] = theory + internal
+    max_marks = np.array([subject["max_marks"] or 100 for subject in subjects], dtype=float)
+    percents = totals * 100 / max_marks
+
+    subject_stats = {}
+    for j, subject in enumerate(subjects):
+        subject_stats[subject["code"]] = {
+            "name": subject["name"],
+            "max_marks": subject["max_marks"],
+            **_summary(totals[:, j]),
+            "histogram": _histogram(percents[:, j], PERCENT_BINS),
+        }
+
+    sgpas = np.array([np.nan if sgpa is None else sgpa for _, sgpa, _ in rows], dtype=float)
+    sgpa_summary = _summary(sgpas)
+    ranked = ~np.isnan(sgpas)
+    ranks = []
+    if ranked.any():
+        pks = [pk for (pk, _, _), has_sgpa in zip(rows, ranked) if has_sgpa]
+        rank, percentile = rank_sgpas(sgpas[ranked])
+        ranks = list(zip(pks, rank.tolist(), percentile.tolist()))
+
+    stats = {
+        "student_count": len(rows),
+        "ranked_count": sgpa_summary["count"],
+        "sgpa_mean": sgpa_summary["mean"],
+        "sgpa_median": sgpa_summary["median"],
+        "sgpa_stddev": sgpa_summary["stddev"],
+        "sgpa_histogram": _histogram(sgpas, SGPA_BINS),
+        "subjects": subject_stats,
+    }
+    return stats, ranks
+
+
+def refresh_result_stats():
+    """
+    Recompute and store the statistics and ranks of every cohort.
+
+    Returns:
+        tuple: (cohorts, ranked results)
+    """
+    from .models import ResultCohortStats, ResultRank, StudentResult
+
+    # Taken before reading, so results changed during the refresh count as stale
+    computed_at = timezone.now()
+    schemes = {}
+    cohorts = defaultdict(list)
+    rows = StudentResult.objects.values_list("pk", "roll_number", "sgpa", "marks_data")
+    for pk, roll_number, sgpa, marks_data in rows.iterator(chunk_size=2000):
+        try:
+            scheme = scheme_for_roll(roll_number)
+        except LookupError:
+            continue
+        schemes[scheme["id"]] = scheme
+        cohorts[scheme["id"]].append((pk, sgpa, marks_data))
+
+    stats_rows, rank_rows = [], []
+    for scheme_id, cohort in cohorts.items():
+        stats, ranks = cohort_stats(schemes[scheme_id], cohort)
+        cohort_size = len(ranks)
+        stats_rows.append(ResultCohortStats(scheme_id=scheme_id, computed_at=computed_at, **stats))
+        rank_rows.extend(
+            ResultRank(result_id=pk, scheme_id=scheme_id, rank=rank, percentile=percentile, cohort_size=cohort_size)
+            for pk, rank, percentile in ranks
+        )
+
+    with transaction.atomic():
+        ResultRank.objects.all().delete()
+        ResultCohortStats.objects.all().delete()
+        ResultCohortStats.objects.bulk_create(stats_rows)
+        ResultRank.objects.bulk_create(rank_rows, batch_size=2000)
+    invalidate_stats_cache()
+    return len(stats_rows), len(rank_rows)
+
+
+def result_stats_are_stale():
+    """True when a result changed (or none were ranked yet) since the last refresh"""
+    from .models import ResultCohortStats, StudentResult
+
+    computed_at = ResultCohortStats.objects.aggregate(computed_at=Min("computed_at"))["computed_at"]
+    if computed_at is None:
+        return StudentResult.objects.exists()
+    return StudentResult.objects.filter(updated_at__gt=computed_at).exists()
+
+
+def stats_version():
+    return cache.get(STATS_VERSION_KEY, 0)
+
+
+def invalidate_stats_cache():
+    try:
+        cache.incr(STATS_VERSION_KEY)
+    except ValueError:
+        cache.set(STATS_VERSION_KEY, 1, timeout=None)
+
+
+def cohort_payload(stats):
+    """JSON-ready dict of a ResultCohortStats row (scheme loaded)"""
+    scheme = stats.scheme
+    return {
+        "scheme": {"id": scheme.pk, "semester": scheme.semester, "branch": scheme.branch, "college": scheme.college},
+        "student_count": stats.student_count,
+        "ranked_count": stats.ranked_count,
+        "sgpa": {
+            "mean": stats.sgpa_mean,
+            "median": stats.sgpa_median,
+            "stddev": stats.sgpa_stddev,
+            "histogram": stats.sgpa_histogram,
+        },
+        "subjects": stats.subjects,
+        "computed_at": stats.computed_at.isoformat(),
+    }
@@ -6,6 +6,10 @@ app_name = 'results'
 urlpatterns = [
     path('', views.result_home, name='home'),
     path('search/', views.search_result, name='search_result'),
+    path('lookup/', views.lookup_result, name='lookup_result'),
+    path('marksheet/<str:roll_number>.<str:fmt>', views.download_marksheet, name='marksheet'),
+    path('stats/', views.cohort_statistics, name='cohort_statistics'),
+    path('stats/<str:roll_number>/', views.result_rank, name='result_rank'),
     path('manual-calculator/', views.manual_calculator, name='manual_calculator'),
     # path('manual-entry/', views.manual_entry, name='manual_entry'),
     # path('manual-result/<int:pk>/', views.view_manual_result, name='view_manual_result'),
@@ -1,191 +1,35 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.core import signing
+from django.http import Http404, JsonResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 from django.views.generic import View
 from django.core.paginator import Paginator
 from django.forms import formset_factory, Form, CharField, IntegerField, FloatField, BooleanField
-import json
+import ast
 import csv
 import io
+import numpy as np
+from urllib.parse import urlencode
 from django.templatetags.static import static
 from core.models import SEODetail
-from .models import StudentResult, ManualResultEntry, ResultQuery
+from django.core.cache import cache
+from .models import StudentResult, ManualResultEntry, ResultQuery, ResultCohortStats, ResultRank
 from .forms import RollNumberSearchForm, ManualMarksEntryForm
+from .grading import GRADED_FIELDS, get_subjects_data_by_roll, grade_batch, grade_result
+from .marksheets import MARKSHEET_FORMATS, marksheet_url
+from .query_log import log_query
+from .raw_marks import build_marks_data, parse_marks_cell
+from .result_cache import get_result, invalidate_result_cache
+from .schemes import scheme_or_default
+from .stats import cohort_payload, stats_version
 
-
-def get_8th_sem_subjects_v2():
-    return [
-        {"code": "BT-801", "name": "Rural Development: Administration and Planning", "credit": 3, "max_marks": 150},
-        {"code": "BT-816", "name": "Cloud Computing", "credit": 3, "max_marks": 150},
-        {"code": "BT-817", "name": "Data Warehousing & Data Mining", "credit": 3, "max_marks": 150},
-        {"code": "BT-866", "name": "Project", "credit": 9, "max_marks": 400}
-    ]
-
-
-def get_8th_sem_cse_subjects_v2():
-    return [
-        {"code": "BT-801", "name": "Rural Development: Administration and Planning", "credit": 3, "max_marks": 150},
-        {"code": "BT-811", "name": "Natural Language Processing", "credit": 3, "max_marks": 150},
-        {"code": "BT-812", "name": "Big Data", "credit": 3, "max_marks": 150},
-        {"code": "BT-861", "name": "Project", "credit": 9, "max_marks": 400}
-    ]
-
-
-def get_4th_sem_csit_subjects_v2():
-    return [
-        {"code": "BT-405", "name": "Mathematics - IV", "credit": 4, "max_marks": 100},
-        {"code": "BT-406", "name": "Operating Systems", "credit": 4, "max_marks": 100},
-        {"code": "BT-407", "name": "Theory of Automata and Formal Languages", "credit": 4, "max_marks": 100},
-        {"code": "BT-408", "name": "Object Oriented Programming with Java", "credit": 3, "max_marks": 100},
-        {"code": "BT-410", "name": "Python Programming", "credit": 2, "max_marks": 100},
-        {"code": "BT-414", "name": "Universal Human Values", "credit": 3, "max_marks": 100},
-        {"code": "BT-454", "name": "Sports and Yoga - II", "credit": 0, "max_marks": 100},
-        {"code": "BT-456", "name": "Operating Systems Lab", "credit": 1, "max_marks": 100},
-        {"code": "BT-458", "name": "Object Oriented Programming with Java Lab", "credit": 1, "max_marks": 100},
-        {"code": "BT-459", "name": "Cyber Security Workshop", "credit": 1, "max_marks": 100},
-    ]
-
-
-def get_2nd_sem_csit_subjects_v2():
-    """Returns the list of subjects for 2nd Semester CS/IT."""
-    return [
-        {'code': 'BT-201', 'name': 'Fundamentals of Electrical Engineering', 'credit': 3, 'max_marks': 100},
-        {'code': 'BT-203', 'name': 'Engineering Chemistry', 'credit': 4, 'max_marks': 100},
-        {'code': 'BT-205', 'name': 'Engineering Mathematics - II', 'credit': 4, 'max_marks': 100},
-        {'code': 'BT-206', 'name': 'Fundamentals of Mechanical Engineering', 'credit': 3, 'max_marks': 100},
-        {'code': 'BT-209', 'name': 'Soft Skill', 'credit': 3, 'max_marks': 100},
-        {'code': 'BT-251', 'name': 'Basic Electrical Engineering Lab', 'credit': 1, 'max_marks': 100},
-        {'code': 'BT-253', 'name': 'Engineering Chemistry Lab', 'credit': 1, 'max_marks': 100},
-        {'code': 'BT-255', 'name': 'Workshop Practices Lab', 'credit': 2, 'max_marks': 100},
-        {'code': 'BT-259', 'name': 'English Language Lab', 'credit': 1, 'max_marks': 100},
-        {'code': 'BT-260', 'name': 'Sports and Yoga', 'credit': 0, 'max_marks': 100}
-    ]
-
-def get_grade_point_by_percentage(percent):
-    if percent >= 90:
-        return 10
-    elif percent >= 80:
-        return 9
-    elif percent >= 70:
-        return 8
-    elif percent >= 60:
-        return 7
-    elif percent >= 50:
-        return 6
-    elif percent >= 40:
-        return 5
-    else:
-        return 0
-
-
-def get_subjects_data_by_roll(roll_number):
-    try:
-        roll_int = int(roll_number)
-        if 100210500 <= roll_int <= 100210600:
-            return {
-                "semester": "8th",
-                "branch": "IT",
-                "college": "SCRIET",
-                "subjects": get_8th_sem_subjects_v2()
-            }
-        elif 100210100 <= roll_int <= 100210200:
-            return {
-                "semester": "8th",
-                "branch": "CS",
-                "college": "SCRIET",
-                "subjects": get_8th_sem_cse_subjects_v2()
-            }
-        elif 100230500 <= roll_int <= 100230600:
-            return {
-                "semester": "4th",
-                "branch": "IT",
-                "college": "SCRIET",
-                "subjects": get_4th_sem_csit_subjects_v2()
-            }
-        elif 100230100 <= roll_int <= 100230200:
-            return {
-                "semester": "4th",
-                "branch": "CS",
-                "college": "SCRIET",
-                "subjects": get_4th_sem_csit_subjects_v2()
-            }
-        elif 100240500 <= roll_int <= 100240600:
-            return {
-                "semester": "2nd",
-                "branch": "IT",
-                "college": "SCRIET",
-                "subjects": get_2nd_sem_csit_subjects_v2()
-            }
-        elif 100240100 <= roll_int <= 100240200:
-            return {
-                "semester": "2nd",
-                "branch": "CS",
-                "college": "SCRIET",
-                "subjects": get_2nd_sem_csit_subjects_v2()
-            }
-        elif 100220500 <= roll_int <= 100220600:
-            # IT 6th sem
-            return StudentResult.IT_SUBJECTS_DATA
-        else:
-            return StudentResult.SUBJECTS_DATA
-    except Exception:
-        return StudentResult.SUBJECTS_DATA
-
-
-def calculate_sgpa(result, subjects):
-    """Calculate SGPA based on marks and credits, with 8th sem IT support"""
-    total_points = 0
-    total_credits = 0
-    total_marks = 0
-    roll_number = getattr(result, 'roll_number', None)
-    is_8th_it = False
-    try:
-        roll_int = int(roll_number)
-        if 100210500 <= roll_int <= 100210600:
-            is_8th_it = True
-        if 100210100 <= roll_int <= 100210200:
-            is_8th_it = True
-    except Exception:
-        pass
-
-    for subject in subjects:
-        code = subject['code']
-        credit = subject['credit']
-        max_marks = subject.get('max_marks', 100)
-        if credit == 0:
-            continue
-        marks = result.marks_data.get(code, {})
-        theory = marks.get('theory')
-        internal = marks.get('internal')
-        if theory is not None and internal is not None:
-            subject_total = theory + internal
-            total_marks += subject_total
-            if is_8th_it:
-                percent = (subject_total / max_marks) * 100 if max_marks else 0
-                grade_point = get_grade_point_by_percentage(percent)
-            else:
-                # AKTU grade point mapping (10-point scale)
-                if subject_total >= 90:
-                    grade_point = 10
-                elif subject_total >= 80:
-                    grade_point = 9
-                elif subject_total >= 70:
-                    grade_point = 8
-                elif subject_total >= 60:
-                    grade_point = 7
-                elif subject_total >= 50:
-                    grade_point = 6
-                elif subject_total >= 40:
-                    grade_point = 5
-                else:
-                    grade_point = 0
-            total_points += grade_point * credit
-            total_credits += credit
-    sgpa = round(total_points / total_credits, 2) if total_credits > 0 else None
-    return sgpa, total_marks
+REVEAL_TOKEN_SALT = 'results.reveal'
 
 
 def get_client_ip(request):
@@ -200,20 +44,70 @@ def get_client_ip(request):
 
 def result_home(request):
     """Main result page with options to search or manually enter marks"""
-    # Get default subjects (CSE) for the home page
-    default_subjects = StudentResult.SUBJECTS_DATA
+    # Subjects of the default result scheme
+    scheme = scheme_or_default()
     
     context = {
-        'subjects': default_subjects['subjects'],
-        'semester': default_subjects['semester'],
-        'branch': default_subjects['branch'],
-        'college': default_subjects['college'],
-        'title': 'Result Checker - 6th Semester CSE',
-        'meta_description': 'Check your 6th semester CSE results from AKTU. Enter roll number or manually add marks.',
+        'subjects': scheme['subjects'],
+        'semester': scheme['semester'],
+        'branch': scheme['branch'],
+        'college': scheme['college'],
+        'title': f"Result Checker - {scheme['semester']} Semester {scheme['branch']}",
+        'meta_description': f"Check your {scheme['semester']} semester {scheme['branch']} results from AKTU. Enter roll number or manually add marks.",
     }
     return render(request, 'results/result_home.html', context)
 
 
+def log_result_query(request, roll_number, result_found, **fields):
+    """Queue the query for the buffered writer; nothing is written on the request path"""
+    log_query(
+        roll_number=roll_number,
+        user_id=request.user.pk if request.user.is_authenticated else None,
+        ip_address=get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        result_found=result_found,
+        **fields,
+    )
+
+
+def make_reveal_token(roll_number):
+    """Signed, short-lived token that lets the search page show this roll number's result"""
+    return signing.dumps(roll_number, salt=REVEAL_TOKEN_SALT)
+
+
+def read_reveal_token(token):
+    """Roll number of a reveal token, or None if it's invalid or expired"""
+    try:
+        return signing.loads(
+            token, salt=REVEAL_TOKEN_SALT, max_age=getattr(settings, 'RESULT_REVEAL_TOKEN_MAX_AGE', 600)
+        )
+    except signing.BadSignature:
+        return None
+
+
+@require_POST
+def lookup_result(request):
+    """
+    JSON lookup behind the search form. Answers immediately; the page runs the
+    loading countdown itself and then opens reveal_url, so no worker is held
+    for the duration of the animation.
+    """
+    form = RollNumberSearchForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'found': False, 'errors': form.errors}, status=400)
+
+    roll_number = form.cleaned_data['roll_number'].upper().strip()
+    found = get_result(roll_number) is not None
+    log_result_query(request, roll_number, found)
+    if not found:
+        return JsonResponse({'found': False, 'message': f'No result found for roll number: {roll_number}'})
+    return JsonResponse({
+        'found': True,
+        'reveal_url': f"{reverse('results:search_result')}?{urlencode({'reveal': make_reveal_token(roll_number)})}",
+        'reveal_after': getattr(settings, 'RESULT_REVEAL_DELAY', 10),
+    })
+
+
 def search_result(request):
     """Search for result by roll number"""
     seo_detail = SEODetail.objects.filter(page_name="search_result").first()
@@ -229,112 +123,68 @@ def search_result(request):
     show_preview = False
     sgpa = None
     total_marks = None
+    grade_points = {}
+    rank = None
     
     # Check if this is a redirect from login with a roll number
     redirect_roll_number = request.GET.get('roll_number')
+    reveal_token = request.GET.get('reveal')
     
     if request.method == 'POST':
+        # Without JavaScript the form posts here directly
         form = RollNumberSearchForm(request.POST)
         if form.is_valid():
             roll_number = form.cleaned_data['roll_number'].upper().strip()
-            
-            # Log the query
-            ResultQuery.objects.create(
-                roll_number=roll_number,
-                user=request.user if request.user.is_authenticated else None,
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                result_found=False  # Will update this below
-            )
-            
-            try:
-                result = StudentResult.objects.get(roll_number=roll_number)
-                
-                # 15 second delay for loading experience
-                import time
-                time.sleep(10)
-                
-                # Get appropriate subject data for this roll number
-                subjects_data = get_subjects_data_by_roll(result.roll_number)
-                print(subjects_data)
-                
-                # Calculate SGPA and total marks
-                sgpa, total_marks = calculate_sgpa(result, subjects_data['subjects'])
-                
-                # Update query log
-                ResultQuery.objects.filter(
-                    roll_number=roll_number
-                ).update(result_found=True)
-                
-                # Show preview (partial result) to non-authenticated users
-                if not request.user.is_authenticated:
-                    show_preview = True
-                    messages.info(request, 'Login to view complete result details.')
-                
-            except StudentResult.DoesNotExist:
+            result = get_result(roll_number)
+            log_result_query(request, roll_number, result is not None)
+            if not result:
                 messages.error(request, f'No result found for roll number: {roll_number}')
+
+    # Reveal after the client-side countdown (already logged by lookup_result)
+    elif reveal_token:
+        roll_number = read_reveal_token(reveal_token)
+        if roll_number:
+            result = get_result(roll_number)
+            form = RollNumberSearchForm(initial={'roll_number': roll_number, 'terms_accepted': True})
+        else:
+            messages.error(request, 'This result link has expired. Please search again.')
     
     # Handle redirect from login with roll number
     elif redirect_roll_number and request.user.is_authenticated:
         roll_number = redirect_roll_number.upper().strip()
-        try:
-            result = StudentResult.objects.get(roll_number=roll_number)
-            
-            # Log the query for authenticated user redirect
-            ResultQuery.objects.create(
-                roll_number=roll_number,
-                user=request.user,
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                result_found=True
-            )
-            
-            # 15 second delay for loading experience
-            import time
-            time.sleep(8)
-            
-            # Get appropriate subject data for this roll number
-            subjects_data = get_subjects_data_by_roll(result.roll_number)
-            sgpa, total_marks = calculate_sgpa(result, subjects_data['subjects'])
-            
+        result = get_result(roll_number)
+        log_result_query(request, roll_number, result is not None)
+        if result:
             # Pre-populate the form with the roll number
             form = RollNumberSearchForm(initial={'roll_number': roll_number, 'terms_accepted': True})
-            
             messages.success(request, 'Login successful! Here is your complete result.')
-            
-        except StudentResult.DoesNotExist:
-            # Log the query even if result is not found
-            ResultQuery.objects.create(
-                roll_number=roll_number,
-                user=request.user,
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                result_found=False
-            )
+        else:
             messages.error(request, f'No result found for roll number: {roll_number}')
     
-    # Get appropriate subject data based on result (if found) or default to CSE
+    # Subjects of the result (if found) or of the default scheme
     if result:
-        subjects_data = get_subjects_data_by_roll(result.roll_number)
+        # result is the cached payload (results.result_cache), graded already
+        subjects = result['subjects']
+        sgpa, total_marks, grade_points = result['sgpa'], result['total_marks'], result['grade_points']
+        # Show preview (partial result) to non-authenticated users
+        if not request.user.is_authenticated:
+            show_preview = True
+            messages.info(request, 'Login to view complete result details.')
+        else:
+            rank = ResultRank.objects.filter(result_id=result['id']).first()
     else:
-        subjects_data = StudentResult.SUBJECTS_DATA  # Default to CSE
+        subjects = scheme_or_default()['subjects']
     
     context = {
         'form': form,
         'result': result,
         'show_preview': show_preview,
-        'subjects': subjects_data['subjects'],
+        'subjects': subjects,
         'sgpa': sgpa,
         'total_marks': total_marks,
-        'subjects_json': json.dumps(subjects_data['subjects']),
-        'marks_json': json.dumps(result.marks_data) if result else '{}',
-        'result_json': json.dumps({
-            'roll_number': result.roll_number,
-            'name': result.name,
-            'father_name': result.father_name,
-            'sgpa': str(sgpa) if sgpa else 'N/A',
-            'total_marks': str(total_marks) if total_marks else 'N/A'
-        }) if result else '{}',
+        'grade_points': grade_points,
+        'rank': rank,
+        'reveal_delay': getattr(settings, 'RESULT_REVEAL_DELAY', 10),
         "title": seo_detail.title,
         "meta_description": seo_detail.meta_description,
         "og_image": (
@@ -347,10 +197,21 @@ def search_result(request):
     return render(request, 'results/search_result.html', context)
 
 
+@login_required
+def download_marksheet(request, roll_number, fmt):
+    """Redirect to the stored PNG/PDF marksheet of a result, rendering it on first request"""
+    if fmt not in MARKSHEET_FORMATS:
+        raise Http404
+    result = get_object_or_404(StudentResult, roll_number=roll_number.upper().strip())
+    return redirect(marksheet_url(result, fmt))
+
+
 def manual_entry(request):
     """Manual marks entry form"""
+    # Subjects of the entered roll number's scheme, the default scheme until one is entered
+    scheme = scheme_or_default(request.POST.get('roll_number', '').strip() or None)
     if request.method == 'POST':
-        form = ManualMarksEntryForm(request.POST)
+        form = ManualMarksEntryForm(request.POST, subjects=scheme['subjects'])
         if form.is_valid():
             manual_entry = form.save(commit=False)
             if request.user.is_authenticated:
@@ -361,13 +222,13 @@ def manual_entry(request):
             messages.success(request, 'Marks saved successfully!')
             return redirect('results:view_manual_result', pk=manual_entry.pk)
     else:
-        form = ManualMarksEntryForm()
+        form = ManualMarksEntryForm(subjects=scheme['subjects'])
     
     context = {
         'form': form,
-        'subjects': StudentResult.SUBJECTS_DATA['subjects'],
+        'subjects': scheme['subjects'],
         'title': 'Manual Marks Entry',
-        'meta_description': 'Manually enter your marks for 6th semester CSE subjects.',
+        'meta_description': f"Manually enter your marks for {scheme['semester']} semester {scheme['branch']} subjects.",
     }
     print(context)
     return render(request, 'results/manual_entry.html', context)
@@ -384,7 +245,7 @@ def view_manual_result(request, pk):
     
     context = {
         'result': manual_result,
-        'subjects': StudentResult.SUBJECTS_DATA['subjects'],
+        'subjects': scheme_or_default(manual_result.roll_number)['subjects'],
         'title': f'Result for {manual_result.roll_number}',
         'meta_description': f'View result for roll number {manual_result.roll_number}',
     }
@@ -398,7 +259,7 @@ def view_full_result(request, roll_number):
     
     context = {
         'result': result,
-        'subjects': StudentResult.SUBJECTS_DATA['subjects'],
+        'subjects': scheme_or_default(result.roll_number)['subjects'],
         'show_full': True,
         'title': f'Full Result - {result.name}',
         'meta_description': f'Complete result details for {result.name} - {roll_number}',
@@ -417,6 +278,10 @@ class BulkUploadView(View):
         }
         return render(request, 'results/bulk_upload.html', context)
     
+    # Rows per upsert, and how many row errors the report lists in full
+    batch_size = 500
+    max_reported_errors = 1000
+
     def post(self, request):
         if not request.user.is_staff:
             return JsonResponse({'error': 'Permission denied'}, status=403)
@@ -425,56 +290,138 @@ class BulkUploadView(View):
             return JsonResponse({'error': 'No file uploaded'}, status=400)
         
         csv_file = request.FILES['csv_file']
+        self.created_count = 0
+        self.updated_count = 0
+        self.error_count = 0
+        self.errors = []
         
         try:
-            # Read CSV file
-            decoded_file = csv_file.read().decode('utf-8')
-            csv_data = csv.reader(io.StringIO(decoded_file))
-            
-            created_count = 0
-            updated_count = 0
-            
-            for row in csv_data:
-                if len(row) >= 4:  # roll_number, name, father_name, marks_data
-                    roll_number = row[0].strip()
-                    name = row[1].strip()
-                    father_name = row[2].strip()
-                    marks_data_str = row[3]
-                    
-                    try:
-                        # Parse marks data from string representation
-                        marks_data = eval(marks_data_str)  # Be careful with eval in production
-                        
-                        # Create or update student result
-                        result, created = StudentResult.objects.get_or_create(
-                            roll_number=roll_number,
-                            defaults={
-                                'name': name,
-                                'father_name': father_name,
-                            }
-                        )
-                        
-                        # Parse and save marks
-                        parsed_marks = result.parse_marks_from_raw_data(marks_data)
-                        result.marks_data = parsed_marks
-                        result.save()
-                        
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                            
-                    except Exception as e:
-                        continue  # Skip invalid rows
-            
-            return JsonResponse({
-                'success': True,
-                'created': created_count,
-                'updated': updated_count
-            })
-            
+            # Decode and parse incrementally: the upload is never held in memory as one string
+            csv_file.seek(0)
+            text = io.TextIOWrapper(csv_file, encoding='utf-8-sig', newline='')
+            batch = []
+            for line_number, row in enumerate(csv.reader(text), start=1):
+                if not row or not any(cell.strip() for cell in row):
+                    continue
+                try:
+                    batch.append(self.parse_row(row))
+                except Exception as e:
+                    self.report_error(line_number, row[0].strip() if row else '', e)
+                    continue
+                if len(batch) >= self.batch_size:
+                    self.upsert(batch)
+                    batch = []
+            if batch:
+                self.upsert(batch)
+            text.detach()
+            if self.created_count or self.updated_count:
+                # Statistics follow from `compute_result_stats --if-stale` (cron), not this request
+                invalidate_result_cache()
+        except (UnicodeDecodeError, csv.Error) as e:
+            return JsonResponse({'error': f'Could not read CSV: {e}'}, status=400)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
+        
+        return JsonResponse({
+            'success': True,
+            'created': self.created_count,
+            'updated': self.updated_count,
+            'failed': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+        })
+    
+    def parse_row(self, row):
+        """StudentResult (graded, unsaved) from a roll_number, name, father_name, marks_data row"""
+        if len(row) < 4:
+            raise ValueError('expected roll_number, name, father_name, marks_data')
+        roll_number = row[0].strip()
+        if not roll_number:
+            raise ValueError('missing roll number')
+        # literal_eval only accepts literals, unlike eval
+        raw_marks = ast.literal_eval(row[3].strip())
+        if not isinstance(raw_marks, (list, tuple)) or not all(isinstance(r, (list, tuple)) for r in raw_marks):
+            raise ValueError('marks_data must be a list of lists')
+        
+        # Marks are read against the roll number's scheme, like `manage.py import_results` does
+        scheme = get_subjects_data_by_roll(roll_number)
+        marks_data = build_marks_data(parse_marks_cell(raw_marks), scheme['subjects'])
+        graded = grade_result(marks_data, scheme['subjects'], scheme['grading_rule'])
+        # Marksheets are pre-rendered by `generate_marksheets --pending`, not by this request
+        return StudentResult(
+            roll_number=roll_number, name=row[1].strip(), father_name=row[2].strip(), marks_data=marks_data,
+            marksheet_pending=True, **{field: graded[field] for field in GRADED_FIELDS},
+        )
+    
+    def upsert(self, batch):
+        # Later rows for the same roll number win, as they did with one save() per row
+        by_roll = {result.roll_number: result for result in batch}
+        existing = set(
+            StudentResult.objects.filter(roll_number__in=list(by_roll)).values_list('roll_number', flat=True)
+        )
+        # Existing results keep their name, as get_or_create() did
+        StudentResult.objects.bulk_create(
+            by_roll.values(),
+            update_conflicts=True,
+            unique_fields=['roll_number'],
+            update_fields=[
+                'marks_data', 'total_marks', 'percentage', 'sgpa', 'grade_points', 'marksheet_pending', 'updated_at',
+            ],
+        )
+        self.updated_count += len(existing)
+        self.created_count += len(by_roll) - len(existing)
+    
+    def report_error(self, line_number, roll_number, error):
+        self.error_count += 1
+        if len(self.errors) < self.max_reported_errors:
+            self.errors.append({'row': line_number, 'roll_number': roll_number, 'error': str(error)})
+
+
+def _cached_stats(key, build):
+    """Stats payload cached until the next refresh (or RESULT_STATS_CACHE_SECONDS)"""
+    key = f"results:stats:{stats_version()}:{key}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, getattr(settings, 'RESULT_STATS_CACHE_SECONDS', 300))
+    return payload
+
+
+def cohort_statistics(request):
+    """SGPA and subject-wise distributions of every cohort (one per result scheme)"""
+    payload = _cached_stats('cohorts', lambda: {
+        'cohorts': [cohort_payload(stats) for stats in ResultCohortStats.objects.select_related('scheme')],
+    })
+    return JsonResponse(payload)
+
+
+def result_rank(request, roll_number):
+    """
+    A result's rank and percentile plus its cohort's statistics. Like the
+    full result, the rank is only shown to logged-in users.
+    """
+    roll_number = roll_number.upper().strip()
+
+    def build():
+        rank = ResultRank.objects.select_related('result').filter(result__roll_number=roll_number).first()
+        if rank is None:
+            return None
+        stats = ResultCohortStats.objects.select_related('scheme').filter(scheme_id=rank.scheme_id).first()
+        return {
+            'roll_number': roll_number,
+            'sgpa': rank.result.sgpa,
+            'rank': rank.rank,
+            'percentile': rank.percentile,
+            'cohort_size': rank.cohort_size,
+            'cohort': cohort_payload(stats) if stats else None,
+        }
+
+    payload = _cached_stats(f'rank:{roll_number}', lambda: build() or {})
+    if not payload:
+        return JsonResponse({'message': f'No ranked result for roll number: {roll_number}'}, status=404)
+    if not request.user.is_authenticated:
+        payload = {**payload, 'sgpa': None, 'rank': None, 'percentile': None, 'login_required': True}
+    return JsonResponse(payload)
 
 
 def result_statistics(request):
@@ -513,13 +460,9 @@ def manual_calculator(request):
         formset = ManualSubjectFormSet(request.POST)
         if formset.is_valid():
             subjects = []
-            total_points = 0
-            total_credits = 0
             total_marks = 0
             max_total_marks = 0
             for form in formset:
-                name = form.cleaned_data['subject_name']
-                credit = form.cleaned_data['credit']
                 use_theory_internal = form.cleaned_data.get('use_theory_internal', False)
                 if use_theory_internal:
                     theory = form.cleaned_data.get('theory_marks') or 0
@@ -530,46 +473,32 @@ def manual_calculator(request):
                     theory = None
                     internal = None
                 max_marks = form.cleaned_data['total_marks']
-                percent = (marks / max_marks) * 100 if max_marks else 0
-                # AKTU 10-point scale
-                if percent >= 90:
-                    grade_point = 10
-                elif percent >= 80:
-                    grade_point = 9
-                elif percent >= 70:
-                    grade_point = 8
-                elif percent >= 60:
-                    grade_point = 7
-                elif percent >= 50:
-                    grade_point = 6
-                elif percent >= 40:
-                    grade_point = 5
-                else:
-                    grade_point = 0
-                total_points += grade_point * credit
-                total_credits += credit
                 total_marks += marks
                 max_total_marks += max_marks
                 subjects.append({
-                    'name': name,
+                    'name': form.cleaned_data['subject_name'],
                     'marks': marks,
                     'theory': theory,
                     'internal': internal,
                     'total_marks': max_marks,
-                    'credit': credit,
-                    'percent': percent,
-                    'grade_point': grade_point,
+                    'credit': form.cleaned_data['credit'],
                 })
-            sgpa = round(total_points / total_credits, 2) if total_credits > 0 else None
+            graded = grade_batch(
+                [s['marks'] for s in subjects], [s['total_marks'] for s in subjects],
+                [s['credit'] for s in subjects], [0] * len(subjects), 1,
+            )
+            for subject, percent, grade_point in zip(subjects, graded['percent'].tolist(), graded['grade_point'].tolist()):
+                subject['percent'] = percent
+                subject['grade_point'] = int(grade_point)
+            sgpa = None if np.isnan(graded['sgpa'][0]) else float(graded['sgpa'][0])
             show_result = True
             subjects_data = subjects
 
-            # Save manual entry for user only if logged in
+            # Save manual entry for user only if logged in (totals are computed on save)
             if request.user.is_authenticated:
-                from .models import ManualResultEntry
-                entry = ManualResultEntry.objects.create(
+                ManualResultEntry.objects.create(
                     user=request.user,
-                    roll_number=f"manual-{request.user.id}-{ManualResultEntry.objects.filter(user=request.user).count()+1}",
+                    roll_number=f"manual-{request.user.id}",
                     name=request.user.get_full_name() or request.user.username,
                     marks_data={s['name']: {
                         'total': s['marks'],
@@ -579,20 +508,14 @@ def manual_calculator(request):
                         'grade_point': s['grade_point'],
                     } for s in subjects}
                 )
-                entry.total_marks = total_marks
-                entry.percentage = (total_marks / max_total_marks) * 100 if max_total_marks else 0
-                entry.save()
 
             # Log query for all
-            from .models import ResultQuery
-            ResultQuery.objects.create(
-                roll_number=f"manual-{request.user.id if request.user.is_authenticated else 'anon'}",
-                user=request.user if request.user.is_authenticated else None,
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                result_found=True,
+            log_result_query(
+                request,
+                f"manual-{request.user.id if request.user.is_authenticated else 'anon'}",
+                True,
                 semester="manual",
-                branch="manual"
+                branch="manual",
             )
         else:
             show_result = False
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib import messages
+from django.db.models import Exists, OuterRef
 from .models import LLMProviderConfig, Topic, PYQTopicMap, SubjectAIProxy, ResourceAIProxy
 from .services import LLMService
+from courses.models import ResourceText
 
 @admin.action(description="Extract Topics from Syllabus (AI)")
 def extract_topics_from_syllabus(modeladmin, request, queryset):
@@ -30,11 +32,11 @@ def extract_topics_from_pyqs(modeladmin, request, queryset):
     success_count = 0
     preview_mappings = []
     for resource in queryset.filter(resource_type="pyq"):
-        # Use content field or original_file / PDF text extraction if available.
-        # Assuming resource.content holds the text for now
-        if resource.content:
+        # Hand-written content first, else the text extract_resource_text pulled from the PDF
+        text = resource.content or resource.document_text()
+        if text:
             try:
-                mappings = LLMService.extract_pyq_topics(resource, resource.content)
+                mappings = LLMService.extract_pyq_topics(resource, text)
                 if mappings:
                     success_count += len(mappings)
                     preview_mappings.extend([f"{m.topic.name} ({m.marks_type})" for m in mappings])
@@ -72,10 +74,14 @@ class ResourceAIProxyAdmin(admin.ModelAdmin):
     actions = [extract_topics_from_pyqs]
     
     def get_queryset(self, request):
-        return super().get_queryset(request).filter(resource_type="pyq")
+        return super().get_queryset(request).filter(resource_type="pyq").annotate(
+            has_document_text=Exists(
+                ResourceText.objects.filter(content_hash=OuterRef("content_hash")).exclude(body="")
+            )
+        )
         
     def has_content(self, obj):
-        return bool(obj.content)
+        return bool(obj.content) or obj.has_document_text
     has_content.boolean = True
 
 @admin.register(LLMProviderConfig)
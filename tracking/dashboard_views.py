@@ -1,11 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import permissions
+from rest_framework import permissions, status
 from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db.models.functions import TruncMinute
 from datetime import timedelta
 from .models import Visitor, Session, Event
+from .sampling import weighted_event_count
+from .export import EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, export_queryset, parse_boundary
 
 class DashboardStatsView(APIView):
     """
@@ -20,7 +23,8 @@ class DashboardStatsView(APIView):
         # 1. Key Metrics
         total_visitors = Visitor.objects.count()
         total_sessions = Session.objects.count()
-        total_events = Event.objects.count()
+        # Scaled by sample weight so sampled event types aren't undercounted
+        total_events = round(Event.objects.aggregate(total=weighted_event_count())['total'])
         active_sessions = Session.objects.filter(is_active=True).count()
         
         # 2. Charts Data (e.g., Visitors by OS)
@@ -84,15 +88,47 @@ class ActivitySeriesView(APIView):
         activity = events\
             .annotate(minute=TruncMinute('timestamp'))\
             .values('minute')\
-            .annotate(count=Count('id'))\
+            .annotate(count=weighted_event_count())\
             .order_by('minute')
             
         data = [
             {
                 "time": item['minute'], # This is a datetime
-                "count": item['count']
+                "count": round(item['count'])
             }
             for item in activity
         ]
         
         return Response(data)
+
+
+class EventExportView(APIView):
+    """
+    Streams raw events as NDJSON (default) or CSV for offline analysis.
+    Query params: start, end (date or datetime), event_type (comma separated),
+    file_format (ndjson|csv). Rows are streamed chunk by chunk, never buffered.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": f"file_format must be one of {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start = parse_boundary(request.query_params.get('start'))
+            end = parse_boundary(request.query_params.get('end'), end=True)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        event_types = [t for t in request.query_params.get('event_type', '').split(',') if t]
+
+        qs = export_queryset(start=start, end=end, event_types=event_types)
+        stream, content_type = EXPORT_FORMATS[file_format]
+
+        response = StreamingHttpResponse(stream(qs, DEFAULT_CHUNK_SIZE), content_type=content_type)
+        filename = f"events-{timezone.now():%Y%m%d-%H%M%S}.{file_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Keep nginx from buffering the whole body before sending it on
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,99 @@
+import csv
+import json
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Event
+
+# Flat projection used for exports: (output column, ORM lookup).
+# Only plain columns / single-valued joins so each row is a small dict.
+EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('timestamp', 'timestamp'),
+    ('event_type', 'event_type'),
+    ('url', 'url'),
+    ('target_resource', 'target_resource'),
+    ('metadata', 'metadata'),
+    ('session_id', 'session_id'),
+    ('visitor_id', 'session__visitor__visitor_id'),
+    ('user_id', 'session__user_id'),
+)
+
+EXPORT_COLUMNS = [column for column, _ in EXPORT_FIELDS]
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def parse_boundary(value, end=False):
+    """
+    Parses a date or datetime string used as an export boundary.
+    A bare date means the start of that day (or the end of it when end=True).
+    Returns None for empty values and raises ValueError for garbage.
+    """
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date/datetime: {value}")
+        parsed = datetime.combine(day, time.max if end else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_queryset(start=None, end=None, event_types=None):
+    """
+    Builds the flat values() queryset for an export.
+    Ordered by timestamp so consecutive exports can be stitched together.
+    """
+    qs = Event.objects.all()
+    if start:
+        qs = qs.filter(timestamp__gte=start)
+    if end:
+        qs = qs.filter(timestamp__lte=end)
+    if event_types:
+        qs = qs.filter(event_type__in=event_types)
+    return qs.order_by('timestamp', 'id').values_list(*[lookup for _, lookup in EXPORT_FIELDS])
+
+
+def iter_rows(qs, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields one dict per event. iterator() streams from a server-side cursor
+    so at most one chunk of rows is held in memory at a time.
+    """
+    for values in qs.iterator(chunk_size=chunk_size):
+        yield dict(zip(EXPORT_COLUMNS, values))
+
+
+def iter_ndjson(qs, chunk_size=DEFAULT_CHUNK_SIZE):
+    for row in iter_rows(qs, chunk_size):
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo:
+    """
+    Pseudo-buffer for csv.writer: write() just hands the line back.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(qs, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in iter_rows(qs, chunk_size):
+        row['timestamp'] = row['timestamp'].isoformat() if row['timestamp'] else ''
+        row['metadata'] = json.dumps(row['metadata'], cls=DjangoJSONEncoder)
+        yield writer.writerow([row[column] for column in EXPORT_COLUMNS])
+
+
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'csv': (iter_csv, 'text/csv'),
+}
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracking.export import EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, export_queryset, parse_boundary
+
+
+class Command(BaseCommand):
+    help = 'Stream tracking events to NDJSON/CSV for offline analysis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help='Output file (default: stdout)')
+        parser.add_argument('--file-format', default='ndjson', choices=list(EXPORT_FORMATS), help='Output format')
+        parser.add_argument('--start', help='Only events at or after this date/datetime')
+        parser.add_argument('--end', help='Only events at or before this date/datetime')
+        parser.add_argument('--event-type', action='append', default=[], help='Event type to include (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_boundary(options['start'])
+            end = parse_boundary(options['end'], end=True)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        qs = export_queryset(start=start, end=end, event_types=options['event_type'])
+        stream, _ = EXPORT_FORMATS[options['file_format']]
+
+        to_stdout = options['output'] == '-'
+        # self.stdout so call_command(..., stdout=...) can capture the export
+        out = self.stdout if to_stdout else open(options['output'], 'w', encoding='utf-8', newline='')
+
+        rows = 0
+        try:
+            for line in stream(qs, options['chunk_size']):
+                if to_stdout:
+                    out.write(line, ending='')
+                else:
+                    out.write(line)
+                rows += 1
+        finally:
+            if not to_stdout:
+                out.close()
+
+        if options['file_format'] == 'csv':
+            rows -= 1  # header
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(f'Exported {rows} events to {options["output"]}'))
@@ -0,0 +1,248 @@
+import glob
+import io
+import json
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError, connection, transaction
+
+from tracking.models import Visitor, UserVisitor, Session, Event
+from tracking.spool import OPEN_SUFFIX, SEALED_SUFFIX, LOADING_SUFFIX, FAILED_SUFFIX, seal_segment
+from tracking.utils import clean_ip_address
+
+# Each NDJSON line is COPY'd verbatim into one jsonb column: CSV mode with
+# quote/delimiter bytes that never occur in JSON text disables all escaping.
+COPY_SQL = "COPY tracking_spool_raw (doc) FROM STDIN WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+
+STAGE_SQL = [
+    "CREATE TEMP TABLE tracking_spool_raw (doc jsonb) ON COMMIT DROP",
+]
+
+RESOLVE_SQL = [
+    # Typed, length-clamped view of the raw documents
+    """
+    CREATE TEMP TABLE tracking_spool_event ON COMMIT DROP AS
+    SELECT
+        (doc->>'id')::uuid AS id,
+        doc->>'visitor_id' AS visitor_key,
+        (doc->>'user_id')::bigint AS user_id,
+        (doc->>'timestamp')::timestamptz AS ts,
+        left(doc->>'event_type', 50) AS event_type,
+        left(doc->>'url', 500) AS url,
+        left(doc->>'target_resource', 500) AS target_resource,
+        COALESCE(NULLIF(doc->'metadata', 'null'::jsonb), '{{}}'::jsonb) AS metadata,
+        COALESCE((doc->>'sample_weight')::double precision, 1.0) AS sample_weight,
+        left(doc->>'referrer', 500) AS referrer,
+        doc->>'user_agent' AS user_agent,
+        (doc->>'ip_address')::inet AS ip_address,  -- validated by read_segment
+        left(doc->>'device_type', 50) AS device_type,
+        left(doc->>'os', 50) AS os,
+        left(doc->>'browser', 50) AS browser,
+        left(doc->>'os_version', 50) AS os_version,
+        left(doc->>'device_model', 50) AS device_model,
+        left(doc->>'device_brand', 50) AS device_brand
+    FROM tracking_spool_raw
+    """,
+    # Users deleted since the beacon was spooled
+    """
+    UPDATE tracking_spool_event SET user_id = NULL
+    WHERE user_id IS NOT NULL AND user_id NOT IN (SELECT id FROM {user})
+    """,
+    # New visitors, described by their earliest event
+    """
+    INSERT INTO {visitor} (id, visitor_id, user_agent, ip_address, device_type, os, browser,
+                           os_version, device_model, device_brand, access_status, first_seen, last_seen)
+    SELECT DISTINCT ON (visitor_key)
+        gen_random_uuid(), visitor_key, user_agent, ip_address, device_type, os, browser,
+        os_version, device_model, device_brand, 'allow', ts, ts
+    FROM tracking_spool_event
+    ORDER BY visitor_key, ts
+    ON CONFLICT (visitor_id) DO NOTHING
+    """,
+    """
+    UPDATE {visitor} v SET last_seen = GREATEST(v.last_seen, e.last_ts)
+    FROM (SELECT visitor_key, max(ts) AS last_ts FROM tracking_spool_event GROUP BY visitor_key) e
+    WHERE v.visitor_id = e.visitor_key
+    """,
+    # Same 30 minute inactivity rule as TrackEventView, applied with window functions
+    """
+    CREATE TEMP TABLE tracking_spool_sessionized ON COMMIT DROP AS
+    SELECT e.*, v.id AS visitor_pk,
+           SUM(e.is_new) OVER (PARTITION BY e.visitor_key ORDER BY e.ts, e.id) AS session_no
+    FROM (
+        SELECT *,
+               CASE WHEN ts - lag(ts) OVER (PARTITION BY visitor_key ORDER BY ts, id) <= interval '30 minutes'
+                    THEN 0 ELSE 1 END AS is_new
+        FROM tracking_spool_event
+    ) e
+    JOIN {visitor} v ON v.visitor_id = e.visitor_key
+    """,
+    # Session ids derive from their first event, so reloading a segment is a no-op
+    """
+    CREATE TEMP TABLE tracking_spool_session ON COMMIT DROP AS
+    SELECT md5(visitor_key || ':' || (array_agg(id::text ORDER BY ts, id))[1])::uuid AS id,
+           visitor_pk, visitor_key, session_no,
+           min(ts) AS start_time, max(ts) AS last_activity,
+           (array_agg(user_id ORDER BY ts, id) FILTER (WHERE user_id IS NOT NULL))[1] AS user_id,
+           (array_agg(referrer ORDER BY ts, id))[1] AS referrer
+    FROM tracking_spool_sessionized
+    GROUP BY visitor_pk, visitor_key, session_no
+    """,
+    """
+    INSERT INTO {session} (id, visitor_id, user_id, start_time, last_activity, is_active, referrer)
+    SELECT id, visitor_pk, user_id, start_time, last_activity, false, referrer
+    FROM tracking_spool_session
+    ON CONFLICT (id) DO NOTHING
+    """,
+    """
+    INSERT INTO {event} (id, session_id, event_type, url, target_resource, "timestamp", metadata, sample_weight)
+    SELECT e.id, s.id, e.event_type, e.url, e.target_resource, e.ts, e.metadata, e.sample_weight
+    FROM tracking_spool_sessionized e
+    JOIN tracking_spool_session s ON s.visitor_key = e.visitor_key AND s.session_no = e.session_no
+    ON CONFLICT (id) DO NOTHING
+    """,
+    """
+    INSERT INTO {user_visitor} (user_id, visitor_id, last_used_at)
+    SELECT user_id, visitor_pk, max(ts)
+    FROM tracking_spool_sessionized
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id, visitor_pk
+    ON CONFLICT (user_id, visitor_id)
+    DO UPDATE SET last_used_at = GREATEST({user_visitor}.last_used_at, EXCLUDED.last_used_at)
+    """,
+]
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load spooled tracking events with COPY and resolve visitors/sessions set-wise'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spool-dir', default=None, help='Spool directory (default: TRACKING_SPOOL_DIR)')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Seal *.open segments idle for this many seconds (writer died or went quiet)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('load_spooled_events uses COPY and requires PostgreSQL')
+
+        directory = options['spool_dir'] or settings.TRACKING_SPOOL_DIR
+        if not os.path.isdir(directory):
+            self.stdout.write(f'No spool directory at {directory}')
+            return
+
+        self.seal_stale_segments(directory, options['stale_after'])
+
+        # *.loading leftovers come from a crashed run; loading is idempotent so retry them
+        segments = sorted(
+            glob.glob(os.path.join(directory, '*' + LOADING_SUFFIX))
+            + glob.glob(os.path.join(directory, '*' + SEALED_SUFFIX))
+        )
+        if not segments:
+            self.stdout.write('Nothing to load')
+            return
+
+        tables = {
+            'user': get_user_model()._meta.db_table,
+            'visitor': Visitor._meta.db_table,
+            'session': Session._meta.db_table,
+            'event': Event._meta.db_table,
+            'user_visitor': UserVisitor._meta.db_table,
+        }
+        resolve_sql = [sql.format(**tables) for sql in RESOLVE_SQL]
+
+        started = time.monotonic()
+        total_rows = total_events = failed = 0
+        for path in segments:
+            if path.endswith(SEALED_SUFFIX):
+                claimed = path[:-len(SEALED_SUFFIX)] + LOADING_SUFFIX
+                os.rename(path, claimed)
+                path = claimed
+            try:
+                rows, events, skipped = self.load_segment(path, resolve_sql)
+            except DataError as e:
+                # Retrying can't help: set the segment aside for inspection
+                failed += 1
+                os.rename(path, path[:-len(LOADING_SUFFIX)] + FAILED_SUFFIX)
+                self.stdout.write(self.style.ERROR(f'{os.path.basename(path)}: {str(e).strip()} (kept as {FAILED_SUFFIX})'))
+                continue
+            except Exception as e:
+                failed += 1
+                os.rename(path, path[:-len(LOADING_SUFFIX)] + SEALED_SUFFIX)
+                self.stdout.write(self.style.ERROR(f'{os.path.basename(path)}: {e}'))
+                continue
+            os.remove(path)
+            total_rows += rows
+            total_events += events
+            message = f'{os.path.basename(path)}: {rows} rows, {events} new events'
+            if skipped:
+                message += f', {skipped} malformed lines skipped'
+            self.stdout.write(message)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {total_events} events from {total_rows} rows in {len(segments) - failed} segments '
+            f'({elapsed:.1f}s, {total_rows / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
+        if failed:
+            raise CommandError(f'{failed} segment(s) failed and were left in the spool')
+
+    def seal_stale_segments(self, directory, stale_after):
+        cutoff = time.time() - stale_after
+        for path in glob.glob(os.path.join(directory, '*' + OPEN_SUFFIX)):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    # Waits for a live writer's current line; it moves on to a new segment
+                    seal_segment(path)
+            except FileNotFoundError:
+                # The writer sealed it first
+                pass
+
+    def read_segment(self, path):
+        """
+        Returns (NDJSON of the segment's well-formed records, malformed line
+        count), e.g. dropping a line cut short when its writer died. Invalid
+        IP addresses become null rather than failing the whole COPY.
+        """
+        valid = io.StringIO()
+        skipped = 0
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if not isinstance(record, dict):
+                    skipped += 1
+                    continue
+                ip_address = clean_ip_address(record.get('ip_address'))
+                if ip_address != record.get('ip_address'):
+                    record['ip_address'] = ip_address
+                    line = json.dumps(record, separators=(',', ':'))
+                valid.write(line if line.endswith('\n') else line + '\n')
+        valid.seek(0)
+        return valid, skipped
+
+    def load_segment(self, path, resolve_sql):
+        """
+        Loads one segment in a single transaction.
+        Returns (rows copied, events inserted, malformed lines skipped).
+        """
+        data, skipped = self.read_segment(path)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql in STAGE_SQL:
+                cursor.execute(sql)
+            cursor.copy_expert(COPY_SQL, data)
+            cursor.execute('SELECT count(*) FROM tracking_spool_raw')
+            rows = cursor.fetchone()[0]
+
+            events = 0
+            for sql in resolve_sql:
+                cursor.execute(sql)
+                if sql.lstrip().startswith(f'INSERT INTO {Event._meta.db_table} '):
+                    events = cursor.rowcount
+        return rows, events, skipped
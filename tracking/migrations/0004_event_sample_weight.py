@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-19 01:35
+
+import math
+
+from django.db import migrations, models
+
+
+def move_sample_weights(apps, schema_editor):
+    """Moves weights stored in metadata into the column, dropping values that aren't a finite number >= 1"""
+    Event = apps.get_model('tracking', 'Event')
+    updated = []
+    for event in Event.objects.filter(metadata__has_key='sample_weight').iterator(chunk_size=2000):
+        value = event.metadata.pop('sample_weight')
+        try:
+            weight = float(value)
+        except (TypeError, ValueError):
+            weight = 1.0
+        event.sample_weight = weight if math.isfinite(weight) and weight >= 1 else 1.0
+        updated.append(event)
+        if len(updated) >= 2000:
+            Event.objects.bulk_update(updated, ['metadata', 'sample_weight'])
+            updated = []
+    if updated:
+        Event.objects.bulk_update(updated, ['metadata', 'sample_weight'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0003_visitor_access_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='sample_weight',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.RunPython(move_sample_weights, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.utils import timezone
 import uuid
 
@@ -98,6 +101,10 @@ class Event(models.Model):
     # Store flexible JSON data for custom attributes
     metadata = models.JSONField(default=dict, blank=True)
 
+    # How many real events this row stands for when the beacon was sampled
+    # (set server-side only, never from client metadata)
+    sample_weight = models.FloatField(default=1.0)
+
     class Meta:
         ordering = ['-timestamp']
         indexes = [
@@ -107,3 +114,35 @@ class Event(models.Model):
 
     def __str__(self):
         return f"{self.event_type} at {self.timestamp}"
+
+
+LAST_USER_FIELDS = ('email', 'first_name', 'last_name', 'username')
+
+def annotate_last_user(queryset, visitor_ref='pk'):
+    """
+    Annotates each row with last_user_id, the most recent user seen on its
+    visitor, so serializers don't need two queries per row to find it.
+    Prefers the explicit UserVisitor link, falling back to the latest
+    authenticated Session. attach_last_users() then fetches the users.
+    """
+    latest_link = UserVisitor.objects.filter(
+        visitor=OuterRef(visitor_ref)
+    ).order_by('-last_used_at').values('user_id')[:1]
+    latest_session = Session.objects.filter(
+        visitor=OuterRef(visitor_ref), user__isnull=False
+    ).order_by('-last_activity').values('user_id')[:1]
+
+    return queryset.annotate(
+        last_user_id=Coalesce(Subquery(latest_link), Subquery(latest_session))
+    )
+
+
+def attach_last_users(rows):
+    """
+    Sets last_user (a User with only LAST_USER_FIELDS loaded, or None) on
+    annotate_last_user() rows, fetching all of their users in one query.
+    """
+    ids = {row.last_user_id for row in rows if row.last_user_id is not None}
+    users = get_user_model().objects.only(*LAST_USER_FIELDS).in_bulk(ids) if ids else {}
+    for row in rows:
+        row.last_user = users.get(row.last_user_id)
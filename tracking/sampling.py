@@ -0,0 +1,77 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+
+# Metadata key older rows kept the weight under (now Event.sample_weight);
+# stripped from client metadata so it can't be spoofed
+SAMPLE_WEIGHT_KEY = 'sample_weight'
+
+
+def _current_throughput(event_type):
+    """
+    Counts beacons of this type in the current minute using a cache counter.
+    """
+    key = f"tracking:throughput:{event_type}:{int(time.time() // 60)}"
+    cache.add(key, 0, timeout=120)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key expired between add() and incr()
+        cache.set(key, 1, timeout=120)
+        return 1
+
+
+def sample_weight(event_type):
+    """
+    Decides whether to keep a beacon of the given type.
+    Returns None when it should be dropped, otherwise the weight to store
+    with it (1 when sampling isn't active, 1/rate once the per-minute
+    throughput for the type exceeds TRACKING_SAMPLING_THRESHOLD).
+    """
+    rate = getattr(settings, 'TRACKING_SAMPLE_RATES', {}).get(event_type, 1.0)
+    if rate >= 1:
+        return 1
+    threshold = getattr(settings, 'TRACKING_SAMPLING_THRESHOLD', 0)
+    if _current_throughput(event_type) <= threshold:
+        return 1
+    if rate > 0 and random.random() < rate:
+        return 1 / rate
+    return None
+
+
+def allow_visitor(visitor_id):
+    """
+    Token bucket per visitor_id kept in the cache. Each beacon takes a token,
+    tokens refill at TRACKING_VISITOR_RATE per second up to
+    TRACKING_VISITOR_BURST. Returns False when the bucket is empty.
+    The read-modify-write isn't atomic; an occasional extra beacon under a
+    race is fine for rate limiting analytics.
+    """
+    capacity = getattr(settings, 'TRACKING_VISITOR_BURST', 0)
+    refill_rate = getattr(settings, 'TRACKING_VISITOR_RATE', 1.0)
+    if not capacity or refill_rate <= 0:
+        return True
+
+    now = time.time()
+    key = f"tracking:bucket:{visitor_id}"
+    tokens, updated_at = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    # Expire once the bucket would be full again anyway
+    cache.set(key, (tokens, now), timeout=int(capacity / refill_rate) + 1)
+    return allowed
+
+
+def weighted_event_count():
+    """
+    Aggregate that counts events scaled by their stored sample weight,
+    so rollups estimate real traffic rather than stored rows.
+    """
+    return Coalesce(Sum('sample_weight'), Value(0.0))
@@ -1,31 +1,53 @@
 from rest_framework import serializers
-from .models import Visitor, Session, Event
+from .models import Visitor, Session, Event, attach_last_users
+
+
+def user_summary(email, first_name, last_name, username):
+    return {
+        "email": email,
+        "name": f"{first_name} {last_name}".strip() or username
+    }
+
+class LastUserListSerializer(serializers.ListSerializer):
+    """Fetches the last users of a whole page of annotate_last_user() visitors at once"""
+
+    def to_representation(self, data):
+        visitors = list(data.all() if hasattr(data, 'all') else data)
+        if visitors and hasattr(visitors[0], 'last_user_id'):
+            attach_last_users(visitors)
+        return super().to_representation(visitors)
 
 class VisitorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Visitor
         fields = '__all__'
+        list_serializer_class = LastUserListSerializer
         read_only_fields = ('visitor_id', 'ip_address', 'device_type', 'os', 'browser') # Removed access_status to allow admin updates
 
     last_user = serializers.SerializerMethodField()
 
     def get_last_user(self, obj):
+        # Use the annotation from annotate_last_user() when the queryset has it
+        if hasattr(obj, 'last_user_id'):
+            if not hasattr(obj, 'last_user'):
+                attach_last_users([obj])
+            user = obj.last_user
+            if user is None:
+                return None
+            return user_summary(user.email, user.first_name, user.last_name, user.username)
+
         # Identify the most recent user associated with this visitor
         # Check UserVisitor for explicit link
-        last_link = obj.users.order_by('-last_used_at').first()
+        last_link = obj.users.select_related('user').order_by('-last_used_at').first()
         if last_link and last_link.user:
-            return {
-                "email": last_link.user.email,
-                "name": f"{last_link.user.first_name} {last_link.user.last_name}".strip() or last_link.user.username
-            }
+            user = last_link.user
+            return user_summary(user.email, user.first_name, user.last_name, user.username)
         
         # Fallback to Sessions
-        last_session = obj.sessions.filter(user__isnull=False).order_by('-last_activity').first()
+        last_session = obj.sessions.filter(user__isnull=False).select_related('user').order_by('-last_activity').first()
         if last_session:
-             return {
-                "email": last_session.user.email,
-                "name": f"{last_session.user.first_name} {last_session.user.last_name}".strip() or last_session.user.username
-            }
+            user = last_session.user
+            return user_summary(user.email, user.first_name, user.last_name, user.username)
         return None
 
 class SessionSerializer(serializers.ModelSerializer):
@@ -43,6 +65,69 @@ class EventSerializer(serializers.ModelSerializer):
         model = Event
         fields = '__all__'
 
+class VisitorListSerializer(VisitorSerializer):
+    """
+    Flat visitor row for list pages. Expects an annotate_last_user() queryset.
+    """
+    class Meta:
+        model = Visitor
+        list_serializer_class = LastUserListSerializer
+        fields = (
+            'id', 'visitor_id', 'access_status', 'ip_address', 'device_type',
+            'os', 'browser', 'first_seen', 'last_seen', 'last_user',
+        )
+
+class SessionListSerializer(serializers.ModelSerializer):
+    """
+    Flat session row for list pages. Expects select_related('visitor', 'user').
+    """
+    visitor_id = serializers.CharField(source='visitor.visitor_id', read_only=True)
+    ip_address = serializers.IPAddressField(source='visitor.ip_address', read_only=True)
+    device_type = serializers.CharField(source='visitor.device_type', read_only=True)
+    user_email = serializers.SerializerMethodField()
+    user_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Session
+        fields = (
+            'id', 'visitor_id', 'ip_address', 'device_type', 'user', 'user_email',
+            'user_name', 'start_time', 'last_activity', 'is_active', 'referrer',
+        )
+
+    def get_user_email(self, obj):
+        return obj.user.email if obj.user else None
+
+    def get_user_name(self, obj):
+        if not obj.user:
+            return None
+        return user_summary(obj.user.email, obj.user.first_name, obj.user.last_name, obj.user.username)["name"]
+
+class EventListSerializer(serializers.ModelSerializer):
+    """
+    Flat event row for list pages. Expects select_related('session__visitor', 'session__user').
+    """
+    visitor_id = serializers.CharField(source='session.visitor.visitor_id', read_only=True)
+    ip_address = serializers.IPAddressField(source='session.visitor.ip_address', read_only=True)
+    user_email = serializers.SerializerMethodField()
+    user_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Event
+        fields = (
+            'id', 'event_type', 'url', 'target_resource', 'timestamp', 'metadata',
+            'session', 'visitor_id', 'ip_address', 'user_email', 'user_name',
+        )
+
+    def get_user_email(self, obj):
+        user = obj.session.user
+        return user.email if user else None
+
+    def get_user_name(self, obj):
+        user = obj.session.user
+        if not user:
+            return None
+        return user_summary(user.email, user.first_name, user.last_name, user.username)["name"]
+
 class EventCreateSerializer(serializers.Serializer):
     """
     Serializer to receive tracking data from frontend.
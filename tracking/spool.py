@@ -0,0 +1,163 @@
+import fcntl
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Segment lifecycle: written as *.open, renamed to *.ndjson once sealed,
+# claimed by the loader as *.loading and deleted after a successful load.
+# Segments whose data the database rejects are set aside as *.failed.
+OPEN_SUFFIX = '.open'
+SEALED_SUFFIX = '.ndjson'
+LOADING_SUFFIX = '.loading'
+FAILED_SUFFIX = '.failed'
+
+SPOOL_MODES = ('off', 'fallback', 'always')
+
+
+class EventSpool:
+    """
+    Append-only NDJSON spool for tracking events, one active segment per
+    process. Every record is flushed to the OS immediately, fsync is batched
+    (every fsync_every records or fsync_interval seconds), and segments are
+    sealed once they reach segment_bytes or segment_seconds.
+
+    Each write holds an exclusive flock on the segment, so seal_segment()
+    in another process never renames it halfway through a line.
+    """
+
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024, segment_seconds=60,
+                 fsync_every=100, fsync_interval=1.0):
+        self.directory = str(directory)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._opened_at = 0
+        self._unsynced = 0
+        self._synced_at = 0
+        self._sequence = 0
+
+    def append(self, record):
+        line = json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+        with self._lock:
+            while True:
+                if self._file is None:
+                    self._open_segment()
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+                # The loader may have sealed an idle segment from under us
+                if os.path.exists(self._path):
+                    break
+                self._file.close()
+                self._file = None
+
+            try:
+                self._file.write(line)
+                self._file.flush()
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._unsynced += 1
+
+            now = time.monotonic()
+            if self._unsynced >= self.fsync_every or now - self._synced_at >= self.fsync_interval:
+                self._fsync(now)
+            if self._file.tell() >= self.segment_bytes or now - self._opened_at >= self.segment_seconds:
+                self._seal()
+
+    def seal(self):
+        with self._lock:
+            if self._file is not None:
+                self._seal()
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._sequence += 1
+        name = f"events-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{self._sequence}"
+        self._path = os.path.join(self.directory, name + OPEN_SUFFIX)
+        self._file = open(self._path, 'a', encoding='utf-8')
+        self._opened_at = self._synced_at = time.monotonic()
+        self._unsynced = 0
+
+    def _fsync(self, now):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = now
+
+    def _seal(self):
+        self._fsync(time.monotonic())
+        self._file.close()
+        self._file = None
+        seal_segment(self._path)
+
+
+def seal_segment(path):
+    """
+    Seals an *.open segment, waiting for any write in progress (from any
+    process) to finish. Returns False when it was already sealed.
+    """
+    try:
+        f = open(path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return False
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            os.rename(path, path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+        except FileNotFoundError:
+            # The writer sealed it first
+            return False
+    return True
+
+
+_spool = None
+_spool_pid = None
+_db_unhealthy_until = 0
+
+
+def get_spool():
+    """
+    Returns this process's spool. Re-created after a fork so gunicorn
+    workers never share a segment file.
+    """
+    global _spool, _spool_pid
+    if _spool is None or _spool_pid != os.getpid():
+        _spool = EventSpool(
+            settings.TRACKING_SPOOL_DIR,
+            segment_bytes=getattr(settings, 'TRACKING_SPOOL_SEGMENT_BYTES', 16 * 1024 * 1024),
+            segment_seconds=getattr(settings, 'TRACKING_SPOOL_SEGMENT_SECONDS', 60),
+        )
+        _spool_pid = os.getpid()
+    return _spool
+
+
+def mark_db_unhealthy():
+    """
+    Opens the circuit: beacons go to the spool for TRACKING_SPOOL_COOLDOWN seconds.
+    """
+    global _db_unhealthy_until
+    _db_unhealthy_until = time.monotonic() + getattr(settings, 'TRACKING_SPOOL_COOLDOWN', 30)
+
+
+def report_write_time(seconds):
+    # A write that technically succeeded but took this long means the DB is struggling
+    if seconds >= getattr(settings, 'TRACKING_SPOOL_SLOW_WRITE_SECONDS', 2):
+        mark_db_unhealthy()
+
+
+def should_spool():
+    mode = getattr(settings, 'TRACKING_SPOOL_MODE', 'off')
+    if mode == 'always':
+        return True
+    if mode == 'fallback':
+        return time.monotonic() < _db_unhealthy_until
+    return False
+
+
+def fallback_enabled():
+    return getattr(settings, 'TRACKING_SPOOL_MODE', 'off') != 'off'
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import TrackEventView, VisitorViewSet, SessionViewSet, EventViewSet, VisitorStatusView
-from .dashboard_views import DashboardStatsView, ActivitySeriesView
+from .dashboard_views import DashboardStatsView, ActivitySeriesView, EventExportView
 
 router = DefaultRouter()
 router.register(r'visitors', VisitorViewSet)
@@ -14,4 +14,5 @@ urlpatterns = [
     path('dashboard/', include(router.urls)),
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard_stats'),
     path('dashboard-activity-series/', ActivitySeriesView.as_view(), name='dashboard_activity_series'),
+    path('dashboard-events-export/', EventExportView.as_view(), name='dashboard_events_export'),
 ]
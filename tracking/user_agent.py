@@ -0,0 +1,87 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+ParsedUserAgent = namedtuple('ParsedUserAgent', ['is_bot', 'device_type', 'os', 'os_version', 'browser'])
+
+# Crawlers, link unfurlers, uptime monitors and HTTP libraries.
+# Compiled once into a single alternation so the bot check is one scan.
+# "bot" only counts as a whole word, a versioned product token (FooBot/1.0)
+# or a known crawler's name: device models such as CUBOT are real phones.
+BOT_PATTERNS = (
+    r'\bbot\b', r'bot/\d',
+    r'(?:google|bing|yandex|duckduck|apple|twitter|linkedin|slack|discord|telegram|'
+    r'pinterest|petal|ahrefs|dot|gpt|amazon|seznam|blex|dataforseo|facebook)bot',
+    r'crawl', r'spider', r'slurp', r'mediapartners', r'bingpreview',
+    r'facebookexternalhit', r'whatsapp', r'embedly', r'quora link preview',
+    r'skypeuripreview', r'lighthouse', r'pagespeed', r'gtmetrix', r'pingdom',
+    r'uptime', r'statuscake', r'site24x7', r'headlesschrome', r'phantomjs',
+    r'puppeteer', r'playwright', r'selenium', r'python-requests', r'python-urllib',
+    r'aiohttp', r'httpx', r'curl/', r'wget/', r'go-http-client', r'okhttp',
+    r'java/', r'libwww', r'node-fetch', r'axios/', r'scrapy', r'feedfetcher',
+    r'semrush', r'mj12', r'bytespider', r'perplexity', r'archive\.org',
+)
+BOT_RE = re.compile('|'.join(BOT_PATTERNS), re.IGNORECASE)
+
+# First match wins, so more specific entries come first.
+OS_RULES = (
+    (re.compile(r'Windows NT ([\d.]+)'), 'Windows'),
+    (re.compile(r'Android ([\d.]+)'), 'Android'),
+    (re.compile(r'(?:iPhone|CPU) OS ([\d_]+)'), 'iOS'),
+    (re.compile(r'iPad.*OS ([\d_]+)'), 'iOS'),
+    (re.compile(r'Mac OS X ([\d_.]+)'), 'Mac OS'),
+    (re.compile(r'CrOS \S+ ([\d.]+)'), 'Chrome OS'),
+    (re.compile(r'Linux()'), 'Linux'),
+)
+
+BROWSER_RULES = (
+    (re.compile(r'Edg(?:e|A|iOS)?/'), 'Edge'),
+    (re.compile(r'OPR/|Opera'), 'Opera'),
+    (re.compile(r'SamsungBrowser/'), 'Samsung Internet'),
+    (re.compile(r'UCBrowser/'), 'UC Browser'),
+    (re.compile(r'Firefox/|FxiOS/'), 'Firefox'),
+    (re.compile(r'Chrome/|CriOS/'), 'Chrome'),
+    (re.compile(r'Safari/'), 'Safari'),
+)
+
+TABLET_RE = re.compile(r'iPad|Tablet|Android(?!.*Mobile)', re.IGNORECASE)
+MOBILE_RE = re.compile(r'Mobi|iPhone|iPod|Android', re.IGNORECASE)
+
+UNKNOWN_USER_AGENT = ParsedUserAgent(is_bot=False, device_type=None, os=None, os_version=None, browser=None)
+
+
+@lru_cache(maxsize=4096)
+def parse_user_agent(user_agent):
+    """
+    Classifies a User-Agent string. Cached per string: UA cardinality is
+    low so nearly every beacon is a cache hit.
+    An empty UA isn't classified: privacy tools and some in-app browsers
+    strip it, so the caller samples those beacons instead of dropping them.
+    """
+    if not user_agent:
+        return UNKNOWN_USER_AGENT
+    if BOT_RE.search(user_agent):
+        return ParsedUserAgent(is_bot=True, device_type='bot', os=None, os_version=None, browser=None)
+
+    os_name = os_version = None
+    for pattern, name in OS_RULES:
+        match = pattern.search(user_agent)
+        if match:
+            os_name = name
+            os_version = match.group(1).replace('_', '.') or None
+            break
+
+    browser = None
+    for pattern, name in BROWSER_RULES:
+        if pattern.search(user_agent):
+            browser = name
+            break
+
+    if TABLET_RE.search(user_agent):
+        device_type = 'tablet'
+    elif MOBILE_RE.search(user_agent):
+        device_type = 'mobile'
+    else:
+        device_type = 'desktop'
+
+    return ParsedUserAgent(is_bot=False, device_type=device_type, os=os_name, os_version=os_version, browser=browser)
@@ -0,0 +1,22 @@
+import ipaddress
+
+
+def clean_ip_address(value):
+    """
+    Normalized IP address, or None if value isn't one (it usually comes from
+    the client-controlled X-Forwarded-For header). IPv4-mapped IPv6 addresses
+    (::ffff:1.2.3.4) are unwrapped like Visitor.ip_address does.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        ip = ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+    if ip.version == 6:
+        if ip.ipv4_mapped:
+            return str(ip.ipv4_mapped)
+        if ip.scope_id:
+            # Zone ids (fe80::1%eth0) aren't valid inet values
+            return None
+    return str(ip)
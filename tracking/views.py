@@ -1,13 +1,25 @@
 from rest_framework import viewsets, status, permissions, mixins
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import DatabaseError
 from django.utils import timezone
-from .models import Visitor, Session, Event
+import random
+import time
+import uuid
+from . import spool
+from .models import Visitor, Session, Event, annotate_last_user
+from .user_agent import parse_user_agent
+from .utils import clean_ip_address
+from .sampling import SAMPLE_WEIGHT_KEY, allow_visitor, sample_weight
 from .serializers import (
     VisitorSerializer, 
     SessionSerializer, 
     EventSerializer, 
-    EventCreateSerializer
+    EventCreateSerializer,
+    VisitorListSerializer,
+    SessionListSerializer,
+    EventListSerializer,
 )
 
 class TrackEventView(APIView):
@@ -18,10 +30,36 @@ class TrackEventView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request, *args, **kwargs):
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+        parsed_ua = parse_user_agent(user_agent)
+
+        # Bot fast-path: drop (or sample) crawler/monitor traffic before touching the DB.
+        # Beacons without a User-Agent are sampled at their own rate.
+        if parsed_ua.is_bot:
+            keep_rate = getattr(settings, 'TRACKING_BOT_SAMPLE_RATE', 0)
+        elif not user_agent:
+            keep_rate = getattr(settings, 'TRACKING_EMPTY_UA_SAMPLE_RATE', 1)
+        else:
+            keep_rate = 1
+        weight = 1
+        if keep_rate < 1:
+            if random.random() >= keep_rate:
+                return Response({"status": "ignored"}, status=status.HTTP_202_ACCEPTED)
+            weight = 1 / keep_rate
+
         serializer = EventCreateSerializer(data=request.data)
         if serializer.is_valid():
             data = serializer.validated_data
             visitor_id_str = data.get('visitor_id')
+
+            if not allow_visitor(visitor_id_str):
+                return Response({"status": "rate_limited"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+            # High-volume event types are sampled once their throughput spikes
+            type_weight = sample_weight(data.get('event_type'))
+            if type_weight is None:
+                return Response({"status": "sampled_out"}, status=status.HTTP_202_ACCEPTED)
+            weight *= type_weight
             
             # Decode extra info if present
             encoded_info = data.get('encoded_info')
@@ -38,96 +76,150 @@ class TrackEventView(APIView):
 
             # Extract details from decoded data or fallback to direct fields
             # Prioritize decoded data for OS/Browser as frontend parser might be better or specific
-            os_val = decoded_device_data.get('os_name') or decoded_device_data.get('parsed_os') or data.get('os')
-            browser_val = decoded_device_data.get('browser_name') or decoded_device_data.get('parsed_browser') or data.get('browser')
+            # Server-side UA parsing is the fallback when the client sends nothing
+            os_val = decoded_device_data.get('os_name') or decoded_device_data.get('parsed_os') or data.get('os') or parsed_ua.os
+            browser_val = decoded_device_data.get('browser_name') or decoded_device_data.get('parsed_browser') or data.get('browser') or parsed_ua.browser
             
             device_model = decoded_device_data.get('device_model')
             device_brand = decoded_device_data.get('device_vendor')
-            os_version = decoded_device_data.get('os_version')
-            device_type = decoded_device_data.get('device_type') or data.get('device_type')
-            
-            # 1. Get or Create Visitor
-            visitor, created = Visitor.objects.get_or_create(
-                visitor_id=visitor_id_str,
-                defaults={
-                    'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-                    'ip_address': self.get_client_ip(request),
-                    'device_type': device_type, 
-                    'os': os_val,
-                    'browser': browser_val,
-                    'device_model': device_model,
-                    'device_brand': device_brand,
-                    'os_version': os_version,
-                }
-            )
-            
-            # Update last_seen if existing
-            if not created:
-                visitor.last_seen = timezone.now()
-                # Update details if they were missing or generic
-                if not visitor.os and os_val: visitor.os = os_val
-                if not visitor.browser and browser_val: visitor.browser = browser_val
-                if not visitor.device_model and device_model: visitor.device_model = device_model
-                if not visitor.device_brand and device_brand: visitor.device_brand = device_brand
-                if not visitor.os_version and os_version: visitor.os_version = os_version
-                visitor.save()
-
-            # 1.5 Link Authenticated User to Visitor (Known Device)
-            if request.user.is_authenticated:
-                from .models import UserVisitor
-                UserVisitor.objects.update_or_create(
-                    user=request.user,
-                    visitor=visitor,
-                    defaults={'last_used_at': timezone.now()}
-                )
-
-            # 2. Get or Create Active Session
-
-            # 2. Get or Create Active Session
-            # Simple logic: Find most recent active session for this visitor. 
-            # If older than 30 mins, create new.
-            session = Session.objects.filter(visitor=visitor, is_active=True).order_by('-last_activity').first()
+            os_version = decoded_device_data.get('os_version') or parsed_ua.os_version
+            device_type = decoded_device_data.get('device_type') or data.get('device_type') or parsed_ua.device_type
+            # Sampled bots are always recorded as bots, whatever the client claims
+            if parsed_ua.is_bot:
+                device_type = parsed_ua.device_type
             
-            if session:
-                # Check timeout (e.g., 30 mins)
-                if (timezone.now() - session.last_activity).seconds > 1800:
-                    session.is_active = False
-                    session.save()
-                    session = None
-            
-            if not session:
-                session = Session.objects.create(
-                    visitor=visitor,
-                    user=request.user if request.user.is_authenticated else None,
-                    referrer=data.get('metadata', {}).get('referrer', '')
-                )
-            else:
-                # Update session activity and link user if they just logged in
-                session.last_activity = timezone.now()
-                if request.user.is_authenticated and not session.user:
-                    session.user = request.user
-                session.save()
+            metadata = data.get('metadata')
+            if isinstance(metadata, dict):
+                # The weight is ours to decide; a client-sent one would inflate counts
+                metadata.pop(SAMPLE_WEIGHT_KEY, None)
 
-            # 3. Log Event
-            Event.objects.create(
-                session=session,
-                event_type=data.get('event_type'),
-                url=data.get('url'),
-                target_resource=data.get('target_resource'),
-                metadata=data.get('metadata')
-            )
+            record = {
+                'id': str(uuid.uuid4()),
+                'timestamp': timezone.now(),
+                'visitor_id': visitor_id_str,
+                'user_id': request.user.pk if request.user.is_authenticated else None,
+                'user_agent': user_agent,
+                'ip_address': self.get_client_ip(request),
+                'device_type': device_type,
+                'os': os_val,
+                'browser': browser_val,
+                'device_model': device_model,
+                'device_brand': device_brand,
+                'os_version': os_version,
+                'event_type': data.get('event_type'),
+                'url': data.get('url'),
+                'target_resource': data.get('target_resource'),
+                'metadata': metadata,
+                'sample_weight': weight,
+                'referrer': metadata.get('referrer', '') if isinstance(metadata, dict) else '',
+            }
+
+            # Spool to disk instead of blocking the worker on a struggling DB;
+            # load_spooled_events bulk-loads the segments later
+            if spool.should_spool():
+                spool.get_spool().append(record)
+                return Response({"status": "spooled"}, status=status.HTTP_202_ACCEPTED)
+
+            started = time.monotonic()
+            try:
+                self.write_event(request, record)
+            except DatabaseError:
+                if not spool.fallback_enabled():
+                    raise
+                spool.mark_db_unhealthy()
+                spool.get_spool().append(record)
+                return Response({"status": "spooled"}, status=status.HTTP_202_ACCEPTED)
+            spool.report_write_time(time.monotonic() - started)
 
             return Response({"status": "success"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def write_event(self, request, record):
+        """
+        Writes one tracking record: visitor, known-device link, session and event.
+        """
+        # 1. Get or Create Visitor
+        visitor, created = Visitor.objects.get_or_create(
+            visitor_id=record['visitor_id'],
+            defaults={
+                'user_agent': record['user_agent'],
+                'ip_address': record['ip_address'],
+                'device_type': record['device_type'], 
+                'os': record['os'],
+                'browser': record['browser'],
+                'device_model': record['device_model'],
+                'device_brand': record['device_brand'],
+                'os_version': record['os_version'],
+            }
+        )
+        
+        # Update last_seen if existing
+        if not created:
+            visitor.last_seen = timezone.now()
+            # Update details if they were missing or generic
+            if not visitor.os and record['os']: visitor.os = record['os']
+            if not visitor.browser and record['browser']: visitor.browser = record['browser']
+            if not visitor.device_model and record['device_model']: visitor.device_model = record['device_model']
+            if not visitor.device_brand and record['device_brand']: visitor.device_brand = record['device_brand']
+            if not visitor.os_version and record['os_version']: visitor.os_version = record['os_version']
+            visitor.save()
+
+        # 1.5 Link Authenticated User to Visitor (Known Device)
+        if request.user.is_authenticated:
+            from .models import UserVisitor
+            UserVisitor.objects.update_or_create(
+                user=request.user,
+                visitor=visitor,
+                defaults={'last_used_at': timezone.now()}
+            )
+
+        # 2. Get or Create Active Session
+
+        # 2. Get or Create Active Session
+        # Simple logic: Find most recent active session for this visitor. 
+        # If older than 30 mins, create new.
+        session = Session.objects.filter(visitor=visitor, is_active=True).order_by('-last_activity').first()
+        
+        if session:
+            # Check timeout (e.g., 30 mins)
+            if (timezone.now() - session.last_activity).seconds > 1800:
+                session.is_active = False
+                session.save()
+                session = None
+        
+        if not session:
+            session = Session.objects.create(
+                visitor=visitor,
+                user=request.user if request.user.is_authenticated else None,
+                referrer=record['referrer']
+            )
+        else:
+            # Update session activity and link user if they just logged in
+            session.last_activity = timezone.now()
+            if request.user.is_authenticated and not session.user:
+                session.user = request.user
+            session.save()
+
+        # 3. Log Event
+        Event.objects.create(
+            id=record['id'],
+            session=session,
+            event_type=record['event_type'],
+            url=record['url'],
+            target_resource=record['target_resource'],
+            timestamp=record['timestamp'],
+            metadata=record['metadata'],
+            sample_weight=record['sample_weight'],
+        )
+
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
             ip = x_forwarded_for.split(',')[0]
         else:
             ip = request.META.get('REMOTE_ADDR')
-        return ip
-        return ip
+        # X-Forwarded-For is client-controlled; an invalid value is stored as NULL
+        return clean_ip_address(ip)
 
 class VisitorStatusView(APIView):
     """
@@ -155,18 +247,31 @@ class VisitorViewSet(mixins.UpdateModelMixin, AnalyticsBaseViewSet):
     lookup_field = 'visitor_id'
     filterset_fields = ['visitor_id', 'device_type']
 
+    def get_queryset(self):
+        return annotate_last_user(super().get_queryset())
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return VisitorListSerializer
+        return VisitorSerializer
+
 class SessionViewSet(AnalyticsBaseViewSet):
-    queryset = Session.objects.all().order_by('-start_time')
+    queryset = Session.objects.select_related('visitor', 'user').order_by('-start_time')
     serializer_class = SessionSerializer
     filterset_fields = ['is_active']
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return SessionListSerializer
+        return SessionSerializer
+
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
 
 # ...
 
 class EventViewSet(AnalyticsBaseViewSet):
-    queryset = Event.objects.all().order_by('-timestamp')
+    queryset = Event.objects.select_related('session__visitor', 'session__user').order_by('-timestamp')
     serializer_class = EventSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = {
@@ -175,3 +280,8 @@ class EventViewSet(AnalyticsBaseViewSet):
         'session__visitor__visitor_id': ['exact'],
     }
     search_fields = ['url', 'target_resource', 'session__user__username', 'session__visitor__ip_address', 'session__visitor__visitor_id']
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return EventListSerializer
+        return EventSerializer